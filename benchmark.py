@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Glances - An eye on your system
+#
+# SPDX-FileCopyrightText: 2022 Nicolas Hennion <nicolas@nicolargo.com>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+#
+
+"""Glances synthetic hosts benchmark suite.
+
+Run the collection pipeline against synthetic hosts (fake psutil layer):
+- GlancesStats.update()
+- GlancesProcesses.update()
+- processes_to_programs()
+- the exporters build of the names/values lists
+
+and report the throughput and the memory allocations of each step.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --processes 1000,10000 --output before.json
+    python benchmark.py --processes 1000,10000 --compare before.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from unittest import mock
+
+# Check Python version
+if sys.version_info < (3, 4):
+    print('Glances requires at least Python 3.4 to run.')
+    sys.exit(1)
+
+import psutil
+
+from glances import __version__
+from glances.exports.export import GlancesExport
+from glances.main import GlancesMain
+from glances.processes import glances_processes
+from glances.programs import processes_to_programs
+from glances.stats import GlancesStats
+
+# Plugins updated by the stats update benchmark
+# (the others read the real host and are not relevant here)
+BENCHMARK_PLUGINS = [
+    'alert',
+    'containers',
+    'core',
+    'cpu',
+    'load',
+    'mem',
+    'memswap',
+    'network',
+    'now',
+    'percpu',
+    'processcount',
+    'processlist',
+    'quicklook',
+    'system',
+    'uptime',
+]
+
+# psutil like structures
+pcputimes = namedtuple('pcputimes', ['user', 'system', 'children_user', 'children_system', 'iowait'])
+pio = namedtuple('pio', ['read_count', 'write_count', 'read_bytes', 'write_bytes', 'read_chars', 'write_chars'])
+pmem = namedtuple('pmem', ['rss', 'vms', 'shared', 'text', 'lib', 'data', 'dirty'])
+pgids = namedtuple('pgids', ['real', 'effective', 'saved'])
+scputimes = namedtuple(
+    'scputimes', ['user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal', 'guest', 'guest_nice']
+)
+snetio = namedtuple(
+    'snetio', ['bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv', 'errin', 'errout', 'dropin', 'dropout']
+)
+snicstats = namedtuple('snicstats', ['isup', 'duplex', 'speed', 'mtu'])
+
+
+class FakeProcess(object):
+
+    """A psutil.Process like object."""
+
+    def __init__(self, info):
+        self.info = info
+
+    def as_dict(self, attrs=None, ad_value=None):
+        return {a: self.info.get(a, ad_value) for a in attrs}
+
+
+class FakeDockerExtension(object):
+
+    """A Docker engine extension like object."""
+
+    def __init__(self, host):
+        self.host = host
+
+    def update(self, all_tag):
+        return {}, self.host.containers()
+
+    def stop(self):
+        pass
+
+
+class FakeHost(object):
+
+    """A synthetic host (processes, containers, network interfaces and CPUs).
+
+    Every call to the psutil like methods returns new values, as a real host.
+    The fixtures are built from a seed, so two runs use the same host.
+    """
+
+    def __init__(self, processes=1000, containers=500, interfaces=2000, cpus=256, seed=42):
+        self.nb_cpus = cpus
+        self.rand = random.Random(seed)
+        names = ['python', 'nginx', 'postgres', 'java', 'bash', 'sshd', 'node', 'redis', 'kworker', 'systemd']
+        users = ['root', 'www-data', 'postgres', 'nicolargo']
+        self._processes = []
+        for pid in range(1, processes + 1):
+            name = '{}{}'.format(names[pid % len(names)], pid % 97)
+            self._processes.append(
+                {
+                    'pid': pid,
+                    'name': name,
+                    'cmdline': ['/usr/bin/' + name, '--option', str(pid)],
+                    'username': users[pid % len(users)],
+                    'status': 'running' if pid % 10 == 0 else 'sleeping',
+                    'nice': 0,
+                    'num_threads': 1 + pid % 16,
+                    'gids': pgids(1000, 1000, 1000),
+                    'memory_percent': self.rand.random(),
+                    'memory_info': pmem(*[self.rand.randint(1 << 20, 1 << 30) for _ in range(7)]),
+                    'cpu_percent': 0.0,
+                    'cpu_times': pcputimes(0.0, 0.0, 0.0, 0.0, 0.0),
+                    'io_counters': pio(0, 0, 0, 0, 0, 0),
+                }
+            )
+        self._containers = ['container_{}'.format(i) for i in range(containers)]
+        self._interfaces = ['eth{}'.format(i) for i in range(interfaces)]
+        self._net_counters = {i: [0, 0] for i in self._interfaces}
+
+    def process_iter(self, attrs=None, ad_value=None):
+        """psutil.process_iter"""
+        for p in self._processes:
+            p['cpu_percent'] = self.rand.random() * 100
+            p['cpu_times'] = pcputimes(p['cpu_times'].user + 0.1, p['cpu_times'].system + 0.1, 0.0, 0.0, 0.0)
+            p['io_counters'] = pio(0, 0, p['io_counters'].read_bytes + 4096, p['io_counters'].write_bytes + 1024, 0, 0)
+            yield FakeProcess({a: p.get(a, ad_value) for a in attrs})
+
+    def process(self, pid=None):
+        """psutil.Process"""
+        if pid is None or pid > len(self._processes):
+            raise psutil.NoSuchProcess(pid)
+        return FakeProcess(self._processes[pid - 1])
+
+    def cpu_count(self, logical=True):
+        """psutil.cpu_count"""
+        return self.nb_cpus
+
+    def cpu_percent(self, interval=None, percpu=False):
+        """psutil.cpu_percent"""
+        if percpu:
+            return [self.rand.random() * 100 for _ in range(self.nb_cpus)]
+        return self.rand.random() * 100
+
+    def cpu_times_percent(self, interval=None, percpu=False):
+        """psutil.cpu_times_percent"""
+
+        def cpu_times():
+            user = self.rand.random() * 50
+            system = self.rand.random() * 25
+            return scputimes(user, 0.0, system, 100 - user - system, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+        if percpu:
+            return [cpu_times() for _ in range(self.nb_cpus)]
+        return cpu_times()
+
+    def net_io_counters(self, pernic=False):
+        """psutil.net_io_counters"""
+        ret = {}
+        for interface, counters in self._net_counters.items():
+            counters[0] += self.rand.randint(0, 1 << 20)
+            counters[1] += self.rand.randint(0, 1 << 20)
+            ret[interface] = snetio(counters[0], counters[1], 0, 0, 0, 0, 0, 0)
+        return ret
+
+    def net_if_stats(self):
+        """psutil.net_if_stats"""
+        return {interface: snicstats(True, 2, 10000, 1500) for interface in self._interfaces}
+
+    def containers(self):
+        """Docker containers stats (see the containers plugin)"""
+        ret = []
+        for name in self._containers:
+            cpu = self.rand.random() * 100
+            memory = self.rand.randint(1 << 20, 1 << 30)
+            ret.append(
+                {
+                    'key': 'name',
+                    'name': name,
+                    'Id': name,
+                    'Status': 'running',
+                    'Created': '2023-07-01T00:00:00',
+                    'Command': ['/entrypoint.sh'],
+                    'Image': ['image:latest'],
+                    'cpu': {'total': cpu},
+                    'memory': {'usage': memory, 'limit': 1 << 31},
+                    'io': {'ior': 0, 'iow': 0, 'time_since_update': 1},
+                    'network': {'rx': 0, 'tx': 0, 'time_since_update': 1},
+                    'cpu_percent': cpu,
+                    'memory_usage': memory,
+                    'io_r': 0,
+                    'io_w': 0,
+                    'network_rx': 0,
+                    'network_tx': 0,
+                    'Uptime': '1 day',
+                    'engine': 'docker',
+                }
+            )
+        return ret
+
+    def patch(self):
+        """Return the list of patchers replacing the psutil methods by the host ones."""
+        return [
+            mock.patch('psutil.process_iter', self.process_iter),
+            mock.patch('psutil.Process', self.process),
+            mock.patch('psutil.cpu_count', self.cpu_count),
+            mock.patch('psutil.cpu_percent', self.cpu_percent),
+            mock.patch('psutil.cpu_times_percent', self.cpu_times_percent),
+            mock.patch('psutil.net_io_counters', self.net_io_counters),
+            mock.patch('psutil.net_if_stats', self.net_if_stats),
+        ]
+
+
+def measure(fct, iterations):
+    """Run fct and return its mean duration (in seconds) and its allocations (in bytes).
+
+    The duration is measured without tracing the allocations, then one more
+    run is done with tracemalloc to get the peak and the retained memory.
+    """
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fct()
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fct()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'mean': sum(durations) / len(durations), 'min': min(durations), 'alloc_peak': peak, 'alloc_net': current}
+
+
+def init_stats():
+    """Init the Glances stats with the benchmark plugins only."""
+    sys.argv = [
+        'glances',
+        '--disable-plugin',
+        'all',
+        '--enable-plugin',
+        ','.join(BENCHMARK_PLUGINS),
+        '--disable-check-update',
+    ]
+    core = GlancesMain()
+    stats = GlancesStats(config=core.get_config(), args=core.get_args())
+    glances_processes.set_args(core.get_args())
+    return stats
+
+
+def run_host(name, host, iterations):
+    """Run the benchmarks on the given host and return the results (dict)."""
+    results = {}
+    patchers = host.patch()
+    for patcher in patchers:
+        patcher.start()
+    try:
+        stats = init_stats()
+        # Replace the Docker engine by the host one
+        stats.get_plugin('containers').docker_extension = FakeDockerExtension(host)
+        stats.get_plugin('containers').podman_client = None
+
+        def stats_update():
+            # All the plugins are due (do not wait for the refresh rates)
+            stats.scheduler.reset()
+            stats.update()
+
+        # First update (needed to compute the rates)
+        stats_update()
+        results['stats_update'] = measure(stats_update, iterations)
+        results['processes_update'] = measure(glances_processes.update, iterations)
+        processlist = glances_processes.getlist()
+        results['processes_to_programs'] = measure(lambda: processes_to_programs(processlist), iterations)
+
+        export = GlancesExport(args=stats.args)
+        all_stats = stats.getAllExportsAsDict(plugin_list=export.plugins_to_export(stats))
+
+        def build_export():
+            for plugin in all_stats:
+                export._GlancesExport__build_export(all_stats[plugin])
+
+        results['export_build'] = measure(build_export, iterations)
+        stats.end()
+    finally:
+        for patcher in patchers:
+            patcher.stop()
+    return results
+
+
+def display(results, compare=None):
+    """Display the results (and the ratio with the compare ones)."""
+    print(
+        '{:<28} {:<22} {:>12} {:>12} {:>14} {:>14}{}'.format(
+            'Host',
+            'Benchmark',
+            'Mean (ms)',
+            'Min (ms)',
+            'Peak (KiB)',
+            'Net (KiB)',
+            '  vs compare' if compare else '',
+        )
+    )
+    for host in results:
+        for bench, r in results[host].items():
+            ratio = ''
+            if compare and bench in compare.get(host, {}):
+                ratio = '  {:+.1%} time, {:+.1%} peak'.format(
+                    r['mean'] / compare[host][bench]['mean'] - 1,
+                    r['alloc_peak'] / max(1, compare[host][bench]['alloc_peak']) - 1,
+                )
+            print(
+                '{:<28} {:<22} {:>12.3f} {:>12.3f} {:>14.1f} {:>14.1f}{}'.format(
+                    host,
+                    bench,
+                    r['mean'] * 1000,
+                    r['min'] * 1000,
+                    r['alloc_peak'] / 1024,
+                    r['alloc_net'] / 1024,
+                    ratio,
+                )
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Glances synthetic hosts benchmark suite.')
+    parser.add_argument(
+        '--processes', default='1000,10000,50000', help='comma separated list of processes number (one host per value)'
+    )
+    parser.add_argument('--containers', type=int, default=500, help='number of containers')
+    parser.add_argument('--interfaces', type=int, default=2000, help='number of network interfaces')
+    parser.add_argument('--cpus', type=int, default=256, help='number of CPUs')
+    parser.add_argument('--iterations', type=int, default=5, help='number of runs for each benchmark')
+    parser.add_argument('--output', help='save the results to the given JSON file')
+    parser.add_argument('--compare', help='compare the results with the given JSON file')
+    args = parser.parse_args()
+
+    print('Glances {} synthetic hosts benchmark (Python {})'.format(__version__, sys.version.split()[0]))
+    results = {}
+    for processes in [int(p) for p in args.processes.split(',')]:
+        name = '{}p/{}c/{}i/{}cpu'.format(processes, args.containers, args.interfaces, args.cpus)
+        host = FakeHost(processes=processes, containers=args.containers, interfaces=args.interfaces, cpus=args.cpus)
+        results[name] = run_host(name, host, args.iterations)
+
+    compare = None
+    if args.compare:
+        with open(args.compare) as f:
+            compare = json.load(f)['results']
+    display(results, compare=compare)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(
+                {
+                    'version': __version__,
+                    'python': sys.version.split()[0],
+                    'platform': sys.platform,
+                    'cpu_count': os.cpu_count(),
+                    'results': results,
+                },
+                f,
+                indent=2,
+            )
+        print('Results saved to {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
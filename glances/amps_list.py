@@ -12,6 +12,7 @@
 import os
 import re
 import threading
+from importlib import import_module
 
 from glances.globals import listkeys, iteritems, amps_path
 from glances.logger import logger
@@ -67,7 +68,9 @@ class AmpsList(object):
                     # If not, use the default script
                     amp_script = os.path.join(amps_path, "glances_default.py")
                 try:
-                    amp = __import__(os.path.basename(amp_script)[:-3])
+                    # Full module path: the plugins (so the AMPs list) are loaded on first use,
+                    # when the amps folder is no longer in the system path
+                    amp = import_module('glances.amps.' + os.path.basename(amp_script)[:-3])
                 except ImportError as e:
                     logger.warning("Missing Python Lib ({}), cannot load {} AMP".format(e, amp_conf_name))
                 except Exception as e:
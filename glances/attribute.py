@@ -9,24 +9,256 @@
 
 """Attribute class."""
 
+import mmap
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_left
 from datetime import datetime
+from itertools import filterfalse
+from math import ceil, fsum, isnan
+from time import time
+
+from glances.globals import safe_makedirs
+from glances.logger import logger
+
+# Optional import (history files lock, not available on Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Aggregations available for the history statistics (plus pXX: XXth percentile)
+history_aggregations = ['min', 'max', 'mean', 'sum', 'count', 'last', 'rate']
+
+
+def ring_slice(buffer, start, max_size, nb=0):
+    """Return the last nb items of the ring buffer (all if nb=0), oldest first.
+
+    :param start: position of the oldest item (once the buffer is full)
+    :param max_size: maximum size of the buffer
+
+    No copy is done for an array if the items are contiguous and the buffer is full.
+    """
+    size = len(buffer)
+    if nb <= 0 or nb > size:
+        nb = size
+    first = (start + size - nb) % size if size else 0
+    if first + nb <= size:
+        if isinstance(buffer, array) and size == max_size:
+            # Zero-copy (the buffer will not be resized anymore)
+            return memoryview(buffer)[first : first + nb]
+        return buffer[first : first + nb]
+    if isinstance(buffer, memoryview):
+        return array('d', buffer[first:].tobytes()) + array('d', buffer[: first + nb - size].tobytes())
+    return buffer[first:] + buffer[: first + nb - size]
+
+
+class GlancesAttributeRollup(object):
+    def __init__(self, resolution, size):
+        """Init the rollup (consolidated history) of an attribute
+
+        :param resolution: Duration (in seconds) of a consolidated point
+        :param size: Maximum number of consolidated points
+
+        Values are consolidated incrementally: the min, mean and max of the
+        values added during a resolution period are stored in fixed size ring
+        buffers (arrays of float) when the period is over.
+        """
+        self.resolution = float(resolution)
+        self.size = int(size)
+        self.reset()
+
+    def reset(self):
+        # Start (epoch), mean, min and max of the consolidated periods
+        self._timestamps = array('d')
+        self._mean = array('d')
+        self._min = array('d')
+        self._max = array('d')
+        # Position of the oldest consolidated period (once the buffers are full)
+        self._start = 0
+        # Current period (not consolidated yet)
+        self._period = None
+        self._count = 0
+        self._sum = 0.0
+        self._period_min = 0.0
+        self._period_max = 0.0
+
+    def add(self, timestamp, value):
+        """Add a value (number) to the current period"""
+        if value is None or isnan(value):
+            return
+        period = timestamp - timestamp % self.resolution
+        if period != self._period:
+            self._consolidate()
+            self._period = period
+            self._count = 0
+            self._sum = 0.0
+            self._period_min = value
+            self._period_max = value
+        self._count += 1
+        self._sum += value
+        if value < self._period_min:
+            self._period_min = value
+        if value > self._period_max:
+            self._period_max = value
+
+    def _consolidate(self):
+        """Store the current period in the ring buffers"""
+        if not self._count:
+            return
+        point = (self._period, self._sum / self._count, self._period_min, self._period_max)
+        buffers = (self._timestamps, self._mean, self._min, self._max)
+        if len(self._timestamps) < self.size:
+            for buffer, v in zip(buffers, point):
+                buffer.append(v)
+        else:
+            for buffer, v in zip(buffers, point):
+                buffer[self._start] = v
+            self._start = (self._start + 1) % self.size
+
+    def get(self, nb=0):
+        """Return the last nb periods (all if nb=0), the current one included.
+
+        Return: list of tuple (timestamp, mean, min, max)
+        """
+        if self._count:
+            current = [(self._period, self._sum / self._count, self._period_min, self._period_max)]
+            nb_consolidated = nb - 1 if nb > 0 else 0
+            if nb == 1:
+                return current
+        else:
+            current = []
+            nb_consolidated = nb
+        buffers = [ring_slice(b, self._start, self.size, nb=nb_consolidated) for b in self._buffers()]
+        return list(zip(*buffers)) + current
+
+    def _buffers(self):
+        """Return the consolidated periods buffers: timestamps, mean, min and max."""
+        return self._timestamps, self._mean, self._min, self._max
+
+
+class GlancesAttributeRollupMmap(GlancesAttributeRollup):
+    # Rollup state: resolution, size, position of the oldest period, number of periods,
+    # then the current period: start, number of values, sum, min and max
+    state = struct.Struct('<dQQQdQddd')
+
+    def __init__(self, resolution, size, buffer, offset, load=False):
+        """Init the rollup stored in a memory-mapped file
+
+        :param buffer: Memory-mapped file
+        :param offset: Position of the rollup in the file (see length)
+        :param load: Read the stored rollup (default is to reset it)
+
+        The rollup state is followed by four fixed size columns of float
+        (timestamps, mean, min and max of the consolidated periods).
+        """
+        self._buffer = buffer
+        self._offset = offset
+        columns = offset + self.state.size
+        view = memoryview(buffer)
+        self._columns = [view[columns + 8 * size * i : columns + 8 * size * (i + 1)].cast('d') for i in range(4)]
+        self._length = 0
+        if load:
+            self.resolution = float(resolution)
+            self.size = int(size)
+            self._load()
+        else:
+            super(GlancesAttributeRollupMmap, self).__init__(resolution, size)
+
+    @classmethod
+    def length(cls, size):
+        """Return the length (in bytes) of a rollup of the given size in the file."""
+        return cls.state.size + 4 * 8 * size
+
+    @classmethod
+    def stored_tier(cls, buffer, offset):
+        """Return the (resolution, size) tier of the rollup stored in the buffer at the given offset."""
+        return cls.state.unpack_from(buffer, offset)[:2]
+
+    def reset(self):
+        super(GlancesAttributeRollupMmap, self).reset()
+        self._length = 0
+        self._write_state()
+
+    def _load(self):
+        """Read the rollup state from the file."""
+        (_, _, self._start, self._length, period, self._count, self._sum, self._period_min, self._period_max) = (
+            self.state.unpack_from(self._buffer, self._offset)
+        )
+        self._period = None if isnan(period) else period
+
+    def _write_state(self):
+        self.state.pack_into(
+            self._buffer,
+            self._offset,
+            self.resolution,
+            self.size,
+            self._start,
+            self._length,
+            float('nan') if self._period is None else self._period,
+            self._count,
+            self._sum,
+            self._period_min,
+            self._period_max,
+        )
+
+    def add(self, timestamp, value):
+        """Add a value (number) to the current period"""
+        super(GlancesAttributeRollupMmap, self).add(timestamp, value)
+        self._write_state()
+
+    def _consolidate(self):
+        """Store the current period in the file columns"""
+        if not self._count:
+            return
+        point = (self._period, self._sum / self._count, self._period_min, self._period_max)
+        if self._length < self.size:
+            position = self._length
+            self._length += 1
+        else:
+            position = self._start
+            self._start = (self._start + 1) % self.size
+        for column, v in zip(self._columns, point):
+            column[position] = v
+
+    def _buffers(self):
+        return [column[: self._length] for column in self._columns]
+
+    def close(self):
+        """Release the views on the file"""
+        for column in self._columns:
+            column.release()
 
 
 class GlancesAttribute(object):
-    def __init__(self, name, description='', history_max_size=None):
+    def __init__(self, name, description='', history_max_size=None, history_rollups=None):
         """Init the attribute
 
         :param name: Attribute name (string)
         :param description: Attribute human reading description (string)
         :param history_max_size: Maximum size of the history list (default is no limit)
+        :param history_rollups: List of (resolution, size) rollup tiers (default is no rollup)
 
-        History is stored as a list for tuple: [(date, value), ...]
+        History is stored in a fixed size ring buffer made of two arrays of
+        float: the timestamps (epoch) and the values. If a value is not a
+        number (a list for example), the values are stored in a list instead.
+        The history is returned as a list for tuple: [(date, value), ...]
+
+        Numbers are also consolidated in the rollup tiers (min/mean/max per
+        resolution period) in order to keep long windows at a low memory cost.
         """
         self._name = name
         self._description = description
         self._value = None
-        self._history_max_size = history_max_size
-        self._history = []
+        self._history_max_size = int(history_max_size) if history_max_size else history_max_size
+        self._rollups = sorted(
+            (GlancesAttributeRollup(resolution, size) for resolution, size in history_rollups or []),
+            key=lambda r: r.resolution,
+        )
+        self.history_reset()
 
     def __repr__(self):
         return self.value
@@ -84,50 +316,335 @@ class GlancesAttribute(object):
 
     @property
     def history(self):
-        return self._history
+        return self.history_raw()
 
     @history.setter
     def history(self, new_history):
-        self._history = new_history
+        self.history_reset()
+        for value in new_history:
+            self.history_add(value)
 
     @history.deleter
     def history(self):
-        del self._history
+        self.history_reset()
 
     def history_reset(self):
-        self._history = []
+        # Timestamps (epoch) and values of the history
+        self._timestamps = array('d')
+        self._values = array('d')
+        # Position of the oldest value (once the buffer is full)
+        self._history_start = 0
+        for rollup in self._rollups:
+            rollup.reset()
 
     def history_add(self, value):
         """Add a value in the history"""
         if self._history_max_size:
-            if self.history_len() >= self._history_max_size:
-                self._history.pop(0)
-            self._history.append(value)
+            date, v = value
+            if isinstance(self._values, array):
+                if v is None:
+                    v = float('nan')
+                elif isinstance(v, bool) or not isinstance(v, (int, float)):
+                    # Not a number, switch to a list
+                    self._values = self._history_to_list(self._values)
+                    v = value[1]
+            timestamp = date.timestamp() if isinstance(date, datetime) else date
+            if isinstance(self._values, array):
+                for rollup in self._rollups:
+                    rollup.add(timestamp, v)
+            if len(self._values) < self._history_max_size:
+                self._timestamps.append(timestamp)
+                self._values.append(v)
+            else:
+                # The ring buffer is full, replace the oldest value
+                self._timestamps[self._history_start] = timestamp
+                self._values[self._history_start] = v
+                self._history_start = (self._history_start + 1) % len(self._values)
+
+    def _history_to_list(self, values):
+        """Return the values as a list (NaN are replaced by None)."""
+        if isinstance(values, list):
+            return list(values)
+        return [None if isnan(v) else v for v in values]
+
+    def _history_slice(self, buffer, nb=0):
+        """Return the last nb items of the buffer (all if nb=0), oldest first."""
+        return ring_slice(buffer, self._history_start, self._history_max_size, nb=nb)
+
+    def _history_rollup(self, resolution=0):
+        """Return the coarsest rollup tier with a resolution lower or equal to the given one.
+
+        Return None for the raw history.
+        """
+        ret = None
+        if resolution:
+            for rollup in self._rollups:
+                if rollup.resolution <= resolution:
+                    ret = rollup
+        return ret
+
+    def history_arrays(self, nb=0):
+        """Return the last nb timestamps (epoch) and values (all if nb=0).
+
+        Return: tuple of two sequences of float (or a list for not number values)
+        The sequences can be views on the history buffers: they are valid until the next add.
+        """
+        return self._history_slice(self._timestamps, nb=nb), self._history_slice(self._values, nb=nb)
 
     def history_size(self):
         """Return the history size (maximum number of value in the history)"""
-        return len(self._history)
+        return len(self._values)
 
     def history_len(self):
         """Return the current history length"""
-        return len(self._history)
+        return len(self._values)
 
     def history_value(self, pos=1):
         """Return the value in position pos in the history.
 
         Default is to return the latest value added to the history.
         """
-        return self._history[-pos]
+        return self.history_raw(nb=pos)[0]
 
-    def history_raw(self, nb=0):
-        """Return the history in ISO JSON format"""
-        return self._history[-nb:]
+    def history_raw(self, nb=0, resolution=0):
+        """Return the history: [(date, value), ...]
 
-    def history_json(self, nb=0):
+        If resolution (in seconds) is given, the history is read from the
+        coarsest rollup tier with a resolution lower or equal to it (raw
+        history if there is no such tier): [(date, mean, min, max), ...]
+        """
+        rollup = self._history_rollup(resolution)
+        if rollup is not None:
+            return [(datetime.fromtimestamp(p[0]),) + p[1:] for p in rollup.get(nb=nb)]
+        timestamps, values = self.history_arrays(nb=nb)
+        return list(zip([datetime.fromtimestamp(t) for t in timestamps], self._history_to_list(values)))
+
+    def history_json(self, nb=0, resolution=0):
         """Return the history in ISO JSON format"""
-        return [(i[0].isoformat(), i[1]) for i in self._history[-nb:]]
+        rollup = self._history_rollup(resolution)
+        if rollup is not None:
+            return [(datetime.fromtimestamp(p[0]).isoformat(),) + p[1:] for p in rollup.get(nb=nb)]
+        # Directly from the history buffers (no intermediate list of datetime)
+        timestamps, values = self.history_arrays(nb=nb)
+        return [
+            (datetime.fromtimestamp(t).isoformat(), v) for t, v in zip(timestamps, self._history_to_list(values))
+        ]
+
+    def close(self):
+        """Release the history resources"""
+        pass
 
     def history_mean(self, nb=5):
         """Return the mean on the <nb> values in the history."""
-        _, v = zip(*self._history)
-        return sum(v[-nb:]) / float(v[-1] - v[-nb])
+        return self.history_stats(nb=nb)['mean']
+
+    def history_stats(self, window=0, agg=('mean',), nb=0, now=None):
+        """Return statistics on the history values.
+
+        :param window: only use the values of the last window seconds (all the history if window=0)
+        :param agg: list of aggregations: min, max, mean, sum, count, last, rate (per second)
+                    or pXX (XXth percentile, for example p95)
+        :param nb: only use the last nb values (all if nb=0)
+        :param now: end of the window (epoch, default is now)
+
+        Missing values (None) are ignored.
+        Return: dict {aggregation: value} (value is None if there is no value)
+        Raise ValueError if an aggregation is unknown or if the values are not numbers
+        """
+        percentiles = {}
+        for a in agg:
+            match = re.match(r'^p(\d+(\.\d+)?)$', a)
+            if match and 0 < float(match.group(1)) <= 100:
+                percentiles[a] = float(match.group(1))
+            elif a not in history_aggregations:
+                raise ValueError(
+                    "Unknown aggregation {} (available: {}, pXX)".format(a, ', '.join(history_aggregations))
+                )
+
+        timestamps, values = self.history_arrays(nb=nb)
+        if isinstance(values, list):
+            raise ValueError("History of {} is not a number history".format(self._name))
+        if window:
+            # Timestamps are sorted: find the beginning of the window
+            first = bisect_left(timestamps, (time() if now is None else now) - window)
+            timestamps, values = timestamps[first:], values[first:]
+
+        # The loops are done by the builtins (C) on the history buffers
+        valid = list(filterfalse(isnan, values))
+        ordered = sorted(valid) if percentiles else None
+        ret = {}
+        for a in agg:
+            if a == 'count':
+                ret[a] = len(valid)
+            elif not valid:
+                ret[a] = None
+            elif a in percentiles:
+                ret[a] = ordered[int(ceil(percentiles[a] / 100 * len(ordered))) - 1]
+            elif a == 'min':
+                ret[a] = min(valid)
+            elif a == 'max':
+                ret[a] = max(valid)
+            elif a == 'mean':
+                ret[a] = fsum(valid) / len(valid)
+            elif a == 'sum':
+                ret[a] = fsum(valid)
+            elif a == 'last':
+                ret[a] = valid[-1]
+            elif a == 'rate':
+                ret[a] = self._history_rate(timestamps, values)
+        return ret
+
+    def _history_rate(self, timestamps, values):
+        """Return the rate (per second) between the first and the last values (None if not available)."""
+        first = next((i for i in range(len(values)) if not isnan(values[i])), None)
+        last = next((i for i in range(len(values) - 1, -1, -1) if not isnan(values[i])), None)
+        if first is None or timestamps[last] == timestamps[first]:
+            return None
+        return (values[last] - values[first]) / (timestamps[last] - timestamps[first])
+
+
+class GlancesAttributeMmap(GlancesAttribute):
+    # File header: magic, history max size, position of the oldest value, history length
+    header = struct.Struct('<8sQQQ')
+    magic = b'GLHIST02'
+
+    def __init__(self, name, description='', history_max_size=None, history_rollups=None, history_file=None):
+        """Init the attribute with a persistent history
+
+        :param history_file: Path of the history file
+
+        History is stored in a memory-mapped file: a header followed by two
+        fixed size columns of float (the timestamps and the values), then
+        the rollup tiers (see GlancesAttributeRollupMmap), so it survives a
+        Glances restart and does not live on the Python heap.
+        Values which are not a number are stored as NaN (None).
+        The history file is reset if the history max size or the rollup
+        tiers change. The file is locked while it is used: raise OSError
+        (BlockingIOError) if it is already used by another Glances instance.
+        """
+        self._history_file = history_file
+        self._file = None
+        self._mmap = None
+        super(GlancesAttributeMmap, self).__init__(
+            name, description=description, history_max_size=history_max_size, history_rollups=history_rollups
+        )
+
+    def history_reset(self):
+        if self._mmap is None:
+            # First call, open the history file (and keep the stored history)
+            self._history_open()
+            return
+        self._history_start = 0
+        self._history_count = 0
+        self._history_write_header()
+        for rollup in self._rollups:
+            rollup.reset()
+
+    def _history_open(self):
+        """Open (and create if needed) the history file."""
+        size = self._history_max_size
+        # Offsets of the rollup tiers (after the header and the history columns)
+        offsets = []
+        length = self.header.size + 2 * 8 * size
+        for rollup in self._rollups:
+            offsets.append(length)
+            length += GlancesAttributeRollupMmap.length(rollup.size)
+        safe_makedirs(os.path.dirname(self._history_file))
+        with open(self._history_file, 'ab'):
+            pass
+        # The file stays open while the history is used: it holds the lock
+        f = open(self._history_file, 'r+b')
+        try:
+            if fcntl is not None:
+                # Only one Glances instance can use a history file (raise BlockingIOError if it is locked)
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            magic, max_size, start, count = self.header.unpack(f.read(self.header.size).ljust(self.header.size, b'\0'))
+            self._mmap = mmap.mmap(f.fileno(), 0) if os.fstat(f.fileno()).st_size == length else None
+            stored = (
+                magic == self.magic
+                and max_size == size
+                and count <= size
+                and self._mmap is not None
+                and all(
+                    GlancesAttributeRollupMmap.stored_tier(self._mmap, offset) == (rollup.resolution, rollup.size)
+                    for rollup, offset in zip(self._rollups, offsets)
+                )
+            )
+            if not stored:
+                logger.debug("Init history file {}".format(self._history_file))
+                if self._mmap is not None:
+                    self._mmap.close()
+                f.truncate(0)
+                f.truncate(length)
+                start = count = 0
+                self._mmap = mmap.mmap(f.fileno(), length)
+        except Exception:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            f.close()
+            raise
+        self._file = f
+        self._history_start = start
+        self._history_count = count
+        self._history_write_header()
+        view = memoryview(self._mmap)
+        self._timestamps = view[self.header.size : self.header.size + 8 * size].cast('d')
+        self._values = view[self.header.size + 8 * size : self.header.size + 16 * size].cast('d')
+        self._rollups = [
+            GlancesAttributeRollupMmap(rollup.resolution, rollup.size, self._mmap, offset, load=stored)
+            for rollup, offset in zip(self._rollups, offsets)
+        ]
+
+    def _history_write_header(self):
+        self.header.pack_into(
+            self._mmap, 0, self.magic, self._history_max_size, self._history_start, self._history_count
+        )
+
+    def history_add(self, value):
+        """Add a value in the history"""
+        date, v = value
+        if v is None or isinstance(v, bool) or not isinstance(v, (int, float)):
+            v = float('nan')
+        timestamp = date.timestamp() if isinstance(date, datetime) else date
+        for rollup in self._rollups:
+            rollup.add(timestamp, v)
+        if self._history_count < self._history_max_size:
+            position = self._history_count
+            self._history_count += 1
+        else:
+            # The ring buffer is full, replace the oldest value
+            position = self._history_start
+            self._history_start = (self._history_start + 1) % self._history_max_size
+        self._timestamps[position] = timestamp
+        self._values[position] = v
+        self._history_write_header()
+
+    def _history_slice(self, buffer, nb=0):
+        """Return the last nb items of the buffer (all if nb=0), oldest first."""
+        return ring_slice(buffer[: self._history_count], self._history_start, self._history_max_size, nb=nb)
+
+    def history_size(self):
+        """Return the history size (maximum number of value in the history)"""
+        return self._history_count
+
+    def history_len(self):
+        """Return the current history length"""
+        return self._history_count
+
+    def close(self):
+        """Release the history resources"""
+        if self._mmap is None:
+            return
+        self._timestamps.release()
+        self._values.release()
+        for rollup in self._rollups:
+            rollup.close()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # A view on the history is still used, let the garbage collector close the file
+            pass
+        self._mmap = None
+        # Release the lock
+        self._file.close()
@@ -11,11 +11,12 @@
 
 import ujson
 import socket
+import zlib
 import sys
 import time
 
 from glances import __version__
-from glances.globals import Fault, ProtocolError, ServerProxy, Transport
+from glances.globals import Fault, ProtocolError, ServerProxy, Transport, msgpack, msgpack_loads
 from glances.logger import logger
 from glances.stats_client import GlancesStatsClient
 from glances.outputs.glances_curses import GlancesCursesClient
@@ -45,6 +46,9 @@ class GlancesClient(object):
         # Default client mode
         self._client_mode = 'glances'
 
+        # Get the stats in the MessagePack format (if the client and the server support it)
+        self.packed = msgpack is not None
+
         # Return to browser or exit
         self.return_to_browser = return_to_browser
 
@@ -198,7 +202,10 @@ class GlancesClient(object):
         """
         # Update the stats
         try:
-            server_stats = ujson.loads(self.client.getAll())
+            if self.packed:
+                server_stats = self._get_all_packed()
+            else:
+                server_stats = ujson.loads(self.client.getAll())
         except socket.error:
             # Client cannot get server stats
             return "Disconnected"
@@ -210,6 +217,19 @@ class GlancesClient(object):
             self.stats.update(server_stats)
             return "Connected"
 
+    def _get_all_packed(self):
+        """Get all the stats in the MessagePack format.
+
+        Fallback to JSON if the server does not support it (msgpack module
+        not installed or old server).
+        """
+        try:
+            return msgpack_loads(zlib.decompress(self.client.getAllPacked().data))
+        except Fault as e:
+            logger.info("Server does not support the MessagePack format, use JSON ({})".format(e.faultString))
+            self.packed = False
+            return ujson.loads(self.client.getAll())
+
     def update_snmp(self):
         """Get stats from SNMP server.
 
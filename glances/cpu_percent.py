@@ -9,6 +9,8 @@
 
 """CPU percent stats shared between CPU and Quicklook plugins."""
 
+import threading
+
 from glances.logger import logger
 from glances.timer import Timer
 
@@ -20,6 +22,9 @@ class CpuPercent(object):
     """Get and store the CPU percent."""
 
     def __init__(self, cached_timer_cpu=3):
+        # The instance is shared by plugins which can be updated in parallel
+        # (see the update_workers option)
+        self._lock = threading.Lock()
         self.cpu_info = {'cpu_name': None, 'cpu_hz_current': None, 'cpu_hz': None}
         self.cpu_percent = 0
         self.percpu_percent = []
@@ -45,13 +50,18 @@ class CpuPercent(object):
     def get(self, percpu=False):
         """Update and/or return the CPU using the psutil library.
         If percpu, return the percpu stats"""
-        if percpu:
-            return self.__get_percpu()
-        else:
-            return self.__get_cpu()
+        with self._lock:
+            if percpu:
+                return self.__get_percpu()
+            else:
+                return self.__get_cpu()
 
     def get_info(self):
         """Get additional information about the CPU"""
+        with self._lock:
+            return self.__get_info()
+
+    def __get_info(self):
         # Never update more than 1 time per cached_timer_cpu_info
         if self.timer_cpu_info.finished() and hasattr(psutil, 'cpu_freq'):
             # Get the CPU freq current/max
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Glances.
+#
+# SPDX-FileCopyrightText: 2022 Nicolas Hennion <nicolas@nicolargo.com>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+#
+
+"""Manage the stats delta (JSON Patch) between two update cycles."""
+
+import threading
+from collections import OrderedDict
+
+from glances.globals import json_dumps
+
+
+def escape_pointer(key):
+    """Escape a key for a JSON Pointer (RFC 6901)."""
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def unescape_pointer(token):
+    """Unescape a JSON Pointer (RFC 6901) token."""
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def json_patch(old, new, path=''):
+    """Return the JSON Patch (RFC 6902) to transform the old document into the new one (list of operations).
+
+    Dicts are compared key by key and lists item by item (index based):
+    items added or removed at the end of a list are added or removed,
+    other changes are replaced. If the patch of a dict or a list is bigger
+    than its new value (for example a sorted list whose order changed),
+    the whole dict or list is replaced.
+    """
+    ret = _json_patch(old, new, path)
+    if len(ret) > 1 and isinstance(new, (dict, list)) and len(json_dumps(ret)) > len(json_dumps(new)) + len(path):
+        return [{'op': 'replace', 'path': path, 'value': new}]
+    return ret
+
+
+def _json_patch(old, new, path):
+    """Return the JSON Patch to transform the old document into the new one (see json_patch)."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ret = [{'op': 'remove', 'path': path + '/' + escape_pointer(k)} for k in old if k not in new]
+        for k, v in new.items():
+            if k not in old:
+                ret.append({'op': 'add', 'path': path + '/' + escape_pointer(k), 'value': v})
+            else:
+                ret.extend(json_patch(old[k], v, path=path + '/' + escape_pointer(k)))
+        return ret
+    if isinstance(old, list) and isinstance(new, list):
+        ret = []
+        common = min(len(old), len(new))
+        for i in range(common):
+            ret.extend(json_patch(old[i], new[i], path='{}/{}'.format(path, i)))
+        # Remove the lasts items (from the end to keep the indexes valid)
+        ret.extend({'op': 'remove', 'path': '{}/{}'.format(path, i)} for i in range(len(old) - 1, common - 1, -1))
+        ret.extend({'op': 'add', 'path': '{}/-'.format(path), 'value': v} for v in new[common:])
+        return ret
+    if type(old) is not type(new) or old != new:
+        return [{'op': 'replace', 'path': path, 'value': new}]
+    return []
+
+
+def json_patch_apply(document, patch):
+    """Apply the JSON Patch (add, remove and replace operations) to the document.
+
+    The document is modified in place (except if the whole document is replaced).
+    Return the patched document.
+    """
+    for operation in patch:
+        if operation['path'] == '':
+            # Replace the whole document
+            document = operation['value']
+            continue
+        tokens = [unescape_pointer(t) for t in operation['path'].split('/')[1:]]
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            if operation['op'] == 'add':
+                if last == '-':
+                    parent.append(operation['value'])
+                else:
+                    parent.insert(int(last), operation['value'])
+            elif operation['op'] == 'remove':
+                del parent[int(last)]
+            else:
+                parent[int(last)] = operation['value']
+        else:
+            if operation['op'] == 'remove':
+                del parent[last]
+            else:
+                parent[last] = operation['value']
+    return document
+
+
+class GlancesDelta(object):
+
+    """This class keeps the stats documents (snapshots) of the last update cycles.
+
+    It returns the JSON Patch between a previous cycle and the current one.
+    It is thread safe (shared by the Web server workers).
+    """
+
+    def __init__(self, size=10):
+        """Init the delta manager (keep the documents of the last size cycles)."""
+        self.size = size
+        # Documents of the last cycles (key: cycle id)
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, cycle):
+        with self._lock:
+            return cycle in self._snapshots
+
+    def __len__(self):
+        with self._lock:
+            return len(self._snapshots)
+
+    def add(self, cycle, document):
+        """Add the document of the given cycle (the document should not be modified afterward).
+
+        Nothing is done if the cycle is already known.
+        """
+        with self._lock:
+            if cycle in self._snapshots:
+                return
+            self._snapshots[cycle] = document
+            while len(self._snapshots) > self.size:
+                self._snapshots.popitem(last=False)
+
+    def get(self, since, cycle):
+        """Return the JSON Patch from the since cycle to the given cycle.
+
+        If the since cycle is not known (too old or never seen), the patch
+        replaces the whole document.
+        """
+        with self._lock:
+            old = self._snapshots.get(since)
+            new = self._snapshots[cycle]
+        if old is None:
+            return [{'op': 'replace', 'path': '', 'value': new}]
+        return json_patch(old, new)
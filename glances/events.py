@@ -180,7 +180,7 @@ class GlancesEvents(object):
             if event_state == "CRITICAL":
                 events_sort_key = self.get_event_sort_key(event_type)
                 # Sort the current process list to retrieve the TOP 3 processes
-                self.events_list[event_index][9] = sort_stats(proc_list, events_sort_key)[0:3]
+                self.events_list[event_index][9] = sort_stats(list(proc_list), events_sort_key, limit=3)[0:3]
                 self.events_list[event_index][11] = events_sort_key
 
             # MONITORED PROCESSES DESC
@@ -31,7 +31,9 @@ class Export(GlancesExport):
         super(Export, self).__init__(config=config, args=args)
 
         # Load the Graph configuration file section (is exists)
-        self.export_enable = self.load_conf('graph', options=['path', 'generate_every', 'width', 'height', 'style'])
+        self.export_enable = self.load_conf(
+            'graph', options=['path', 'generate_every', 'width', 'height', 'style', 'resolution']
+        )
 
         # Manage options (command line arguments overwrite configuration file)
         self.path = args.export_graph_path or self.path
@@ -39,6 +41,8 @@ class Export(GlancesExport):
         self.width = int(getattr(self, 'width', 800))
         self.height = int(getattr(self, 'height', 600))
         self.style = getattr(pygal.style, getattr(self, 'style', 'DarkStyle'), pygal.style.DarkStyle)
+        # History resolution (in seconds) of the graphs (0 for the raw history)
+        self.resolution = float(getattr(self, 'resolution', 0))
 
         # Create export folder
         try:
@@ -83,7 +87,7 @@ class Export(GlancesExport):
         for plugin_name in plugins:
             plugin = stats._plugins[plugin_name]
             if plugin_name in self.plugins_to_export(stats):
-                self.export(plugin_name, plugin.get_export_history())
+                self.export(plugin_name, plugin.get_export_history(resolution=self.resolution))
 
         logger.info("Graphs created in {}".format(self.path))
         self.args.generate_graph = False
@@ -120,6 +124,7 @@ class Export(GlancesExport):
             x_value_formatter=lambda dt: dt.strftime('%Y/%m/%d %H:%M:%S'),
         )
         for k, v in iteritems(time_serie_subsample(data, self.width)):
-            chart.add(k, v)
+            # Only keep the (date, mean) of the history rollups points
+            chart.add(k, [p[:2] for p in v])
         chart.render_to_file(os.path.join(self.path, title + '.svg'))
         return True
@@ -29,7 +29,7 @@ import base64
 import queue
 from configparser import ConfigParser, NoOptionError, NoSectionError
 from statistics import mean
-from xmlrpc.client import Fault, ProtocolError, ServerProxy, Transport, Server
+from xmlrpc.client import Binary, Fault, ProtocolError, ServerProxy, Transport, Server
 from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
 from urllib.request import urlopen, Request
 from urllib.error import HTTPError, URLError
@@ -40,6 +40,12 @@ from defusedxml.xmlrpc import monkey_patch
 
 monkey_patch()
 
+# MessagePack is optional (binary encoding of the stats, JSON is used if not installed)
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 ##############
 # GLOBALS VARS
 ##############
@@ -315,6 +321,27 @@ def json_dumps(data):
         return ujson.dumps(data, ensure_ascii=False)
 
 
+def msgpack_dumps(data):
+    """Return the object data in the MessagePack format (bytes).
+
+    Raise ImportError if the msgpack module is not installed.
+    """
+    if msgpack is None:
+        raise ImportError('msgpack module not found')
+    return msgpack.packb(data)
+
+
+def msgpack_loads(data):
+    """Return the object of the MessagePack data (bytes).
+
+    Raise ImportError if the msgpack module is not installed.
+    """
+    if msgpack is None:
+        raise ImportError('msgpack module not found')
+    # The stats dicts may have non string keys
+    return msgpack.unpackb(data, strict_map_key=False)
+
+
 def json_dumps_dictlist(data, item):
     if isinstance(data, dict):
         try:
@@ -333,6 +360,38 @@ def json_dumps_dictlist(data, item):
         return None
 
 
+def json_dumps_dictlist_value(data, item, value, index=None):
+    """Return the dicts of the data list whose item is equal to value ({value: [...]}) in JSON format.
+
+    If index is given (the dictlist_index of data on item), use it instead of scanning data.
+    Return None if data is not a list.
+    Raise KeyError if item is not a key of the dicts.
+    """
+    if not isinstance(data, list):
+        return None
+    if not isinstance(value, int) and value.isdigit():
+        value = int(value)
+    if index is None:
+        return json_dumps({value: [i for i in data if i[item] == value]})
+    return json_dumps({value: index.get(value, [])})
+
+
+def dictlist_index(data, item):
+    """Return the index of the list of dict data on item: {value: [dict, ...]}.
+
+    The dicts keep their order in data. Unhashable values (lists...) are not indexed.
+    Raise KeyError if item is not a key of the dicts.
+    """
+    ret = {}
+    for i in data:
+        try:
+            ret.setdefault(i[item], []).append(i)
+        except TypeError:
+            # Unhashable value
+            pass
+    return ret
+
+
 def string_value_to_float(s):
     """Convert a string with a value and an unit to a float.
     Example:
@@ -9,7 +9,11 @@
 
 """Manage stats history"""
 
-from glances.attribute import GlancesAttribute
+import os
+from urllib.parse import quote
+
+from glances.attribute import GlancesAttribute, GlancesAttributeMmap
+from glances.logger import logger
 
 
 class GlancesHistory(object):
@@ -24,10 +28,32 @@ class GlancesHistory(object):
         """
         self.stats_history = {}
 
-    def add(self, key, value, description='', history_max_size=None):
-        """Add an new item (key, value) to the current history."""
+    def add(self, key, value, description='', history_max_size=None, history_rollups=None, history_path=None):
+        """Add an new item (key, value) to the current history.
+
+        If history_path (folder) is given, the item history is stored in a memory-mapped file
+        (in memory if the file can not be used).
+        """
         if key not in self.stats_history:
-            self.stats_history[key] = GlancesAttribute(key, description=description, history_max_size=history_max_size)
+            attribute = None
+            if history_path and history_max_size:
+                history_file = os.path.join(history_path, quote(key, safe='') + '.hist')
+                try:
+                    attribute = GlancesAttributeMmap(
+                        key,
+                        description=description,
+                        history_max_size=history_max_size,
+                        history_rollups=history_rollups,
+                        history_file=history_file,
+                    )
+                except OSError as e:
+                    # For example, the file is used (locked) by another Glances instance
+                    logger.warning("Cannot use the history file {}, keep it in memory ({})".format(history_file, e))
+            if attribute is None:
+                attribute = GlancesAttribute(
+                    key, description=description, history_max_size=history_max_size, history_rollups=history_rollups
+                )
+            self.stats_history[key] = attribute
         self.stats_history[key].value = value
 
     def reset(self):
@@ -35,10 +61,27 @@ class GlancesHistory(object):
         for a in self.stats_history:
             self.stats_history[a].history_reset()
 
-    def get(self, nb=0):
+    def close(self):
+        """Release the stats history resources (history files)"""
+        for a in self.stats_history:
+            self.stats_history[a].close()
+
+    def get(self, nb=0, resolution=0):
         """Get the history as a dict of list"""
-        return {i: self.stats_history[i].history_raw(nb=nb) for i in self.stats_history}
+        return {i: self.stats_history[i].history_raw(nb=nb, resolution=resolution) for i in self.stats_history}
+
+    def get_item(self, key, nb=0, resolution=0):
+        """Get the history of the given item as a list (None if the item is not in the history)"""
+        if key not in self.stats_history:
+            return None
+        return self.stats_history[key].history_raw(nb=nb, resolution=resolution)
+
+    def get_item_stats(self, key, window=0, agg=('mean',)):
+        """Get statistics on the history of the given item (None if the item is not in the history)"""
+        if key not in self.stats_history:
+            return None
+        return self.stats_history[key].history_stats(window=window, agg=agg)
 
-    def get_json(self, nb=0):
+    def get_json(self, nb=0, resolution=0):
         """Get the history as a dict of list (with list JSON compliant)"""
-        return {i: self.stats_history[i].history_json(nb=nb) for i in self.stats_history}
+        return {i: self.stats_history[i].history_json(nb=nb, resolution=resolution) for i in self.stats_history}
@@ -118,6 +118,13 @@ Examples of use:
             dest='modules_list',
             help='display modules (plugins & exports) list and exit',
         )
+        parser.add_argument(
+            '--startup-profile',
+            action='store_true',
+            default=False,
+            dest='startup_profile',
+            help='display the import and init duration of the modules loaded by the first display (on stderr, at exit)',
+        )
         parser.add_argument(
             '--disable-plugin',
             '--disable-plugins',
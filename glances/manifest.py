@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Glances.
+#
+# SPDX-FileCopyrightText: 2022 Nicolas Hennion <nicolas@nicolargo.com>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+#
+
+"""Manage the Glances modules (plugins and exporters) manifest."""
+
+import ast
+import json
+import os
+
+from glances import __version__
+from glances.globals import exports_path, plugins_path, safe_makedirs
+from glances.config import user_cache_dir
+from glances.logger import logger
+
+
+# Version of the manifest content (the cache is rebuilt if it changes)
+manifest_format = 2
+
+
+class GlancesManifest(object):
+
+    """This class provides the list of the available plugins and exporters modules.
+
+    The list is built by scanning the plugins and exports folders and it is
+    cached in the user cache folder. The cache is rebuilt if the Glances
+    version, one of the folders or one of the plugins model.py modification
+    time changes.
+    """
+
+    def __init__(self):
+        """Init the manifest."""
+        self.cache_dir = user_cache_dir()
+        self.cache_file = os.path.join(self.cache_dir, 'glances-manifest.json')
+
+        self.data = self._load_cache()
+        if not self.data:
+            self.data = self._build()
+            self._save_cache()
+
+    @property
+    def plugins(self):
+        """Return the plugins modules list (folders names)."""
+        return self.data['plugins']
+
+    @property
+    def init_values(self):
+        """Return the stats values of the plugins before their first update (dict)."""
+        return self.data['init_values']
+
+    @property
+    def exports(self):
+        """Return the exporters modules list (folders names)."""
+        return self.data['exports']
+
+    def _signature(self):
+        """Return the signature of the installed modules."""
+        return {
+            'format': manifest_format,
+            'version': __version__,
+            'plugins_path': plugins_path,
+            'plugins_mtime': os.path.getmtime(plugins_path),
+            'exports_path': exports_path,
+            'exports_mtime': os.path.getmtime(exports_path),
+            # The plugins init values are read from their model.py source
+            'models_mtime': self._models_mtime(),
+        }
+
+    def _models_mtime(self):
+        """Return the modification time of the plugins model.py files (dict)."""
+        ret = {}
+        for item in os.listdir(plugins_path):
+            try:
+                ret[item] = os.path.getmtime(os.path.join(plugins_path, item, 'model.py'))
+            except OSError:
+                continue
+        return ret
+
+    def _build(self):
+        """Scan the plugins and exports folders and return the manifest (dict)."""
+        logger.debug("Build the modules manifest")
+        ret = self._signature()
+        ret['plugins'] = sorted(
+            item
+            for item in os.listdir(plugins_path)
+            if os.path.isdir(os.path.join(plugins_path, item)) and not item.startswith('__') and item != 'plugin'
+        )
+        ret['init_values'] = {item: self._plugin_init_value(item) for item in ret['plugins']}
+        ret['exports'] = sorted(
+            item
+            for item in os.listdir(exports_path)
+            if os.path.isdir(os.path.join(exports_path, item)) and not item.startswith('__')
+        )
+        return ret
+
+    def _plugin_init_value(self, plugin):
+        """Return the stats value of the plugin before its first update.
+
+        The model.py source is parsed (not imported), the value is the last
+        literal set by the reset method or by the __init__ method of the plugin
+        model (self.stats or stats_init_value), {} by default.
+        """
+        try:
+            with open(os.path.join(plugins_path, plugin, 'model.py'), 'r') as f:
+                tree = ast.parse(f.read())
+        except Exception as e:
+            logger.debug("Cannot read the {} plugin model ({})".format(plugin, e))
+            return {}
+        methods = {
+            node.name: node
+            for cls in tree.body
+            if isinstance(cls, ast.ClassDef) and cls.name == 'PluginModel'
+            for node in cls.body
+            if isinstance(node, ast.FunctionDef)
+        }
+        for method in ('reset', '__init__'):
+            if method not in methods:
+                continue
+            # reset (if it is defined) is called by the __init__ of the plugins
+            ret = None if method == 'reset' else {}
+            for node in ast.walk(methods[method]):
+                if isinstance(node, ast.Assign) and any(
+                    isinstance(t, ast.Attribute) and t.attr == 'stats' for t in node.targets
+                ):
+                    value = node.value
+                elif isinstance(node, ast.keyword) and node.arg == 'stats_init_value':
+                    value = node.value
+                else:
+                    continue
+                try:
+                    ret = ast.literal_eval(value)
+                except ValueError:
+                    # Computed value, keep the previous one
+                    pass
+            return ret
+        return {}
+
+    def _load_cache(self):
+        """Load the manifest from the cache file (return an empty dict if it is outdated)."""
+        cached_data = {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                cached_data = json.load(f)
+        except Exception as e:
+            logger.debug("Cannot read modules manifest from cache file: {} ({})".format(self.cache_file, e))
+            return {}
+
+        signature = self._signature()
+        if any(cached_data.get(k) != signature[k] for k in signature) or not all(
+            isinstance(cached_data.get(k), list) for k in ('plugins', 'exports')
+        ) or not isinstance(cached_data.get('init_values'), dict):
+            # Reset the cache if Glances has been upgraded or if a module has been added/removed
+            logger.debug("Modules manifest cache file is outdated")
+            return {}
+
+        logger.debug("Read modules manifest from cache file")
+        return cached_data
+
+    def _save_cache(self):
+        """Save the manifest to the cache file."""
+        try:
+            # Create the cache directory
+            safe_makedirs(self.cache_dir)
+            # Create/overwrite the cache file
+            with open(self.cache_file, 'w') as f:
+                json.dump(self.data, f)
+        except Exception as e:
+            logger.debug("Cannot write modules manifest to cache file {} ({})".format(self.cache_file, e))
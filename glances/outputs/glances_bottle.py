@@ -9,25 +9,45 @@
 
 """Web interface class."""
 
+import gzip
+import hashlib
+import json
+import math
+import mimetypes
 import os
+import re
 import sys
 import tempfile
+import threading
 from io import open
 import webbrowser
 import zlib
+from time import monotonic, time
 import socket
 from urllib.parse import urljoin
 
-from glances.globals import b, json_dumps
-from glances.timer import Timer
+from glances.delta import GlancesDelta
+from glances.globals import b, dictlist_index, json_dumps, json_dumps_dictlist, json_dumps_dictlist_value
+from glances.globals import msgpack, msgpack_dumps
 from glances.logger import logger
+from glances.password import GlancesAuthCache
+from glances.query import query_stats
+from glances.outputs.glances_wsgiserver import GlancesWSGIRequestHandler, GlancesWSGIServer
 
 try:
     from bottle import Bottle, static_file, abort, response, request, auth_basic, template, TEMPLATE_PATH
+    from bottle import HTTPError
+    from bottle import server_names
 except ImportError:
     logger.critical('Bottle module not found. Glances cannot start in web server mode.')
     sys.exit(2)
 
+try:
+    import brotli
+except ImportError:
+    logger.debug('Brotli module not found. The Web UI static files will only be compressed with gzip.')
+    brotli = None
+
 
 def compress(func):
     """Compress result with deflate algorithm if the client ask for it."""
@@ -42,6 +62,9 @@ def compress(func):
                 ['{}: {}'.format(h, request.headers.get(h)) for h in request.headers.keys()],
             )
         )
+        if 'Content-Encoding' in response.headers:
+            # Already compressed (see GlancesBottle._cached_response)
+            return ret
         if 'deflate' in request.headers.get('Accept-Encoding', ''):
             response.headers['Content-Encoding'] = 'deflate'
             ret = deflate_compress(ret)
@@ -49,17 +72,228 @@ def compress(func):
             response.headers['Content-Encoding'] = 'identity'
         return ret
 
-    def deflate_compress(data, compress_level=6):
-        """Compress given data using the DEFLATE algorithm"""
-        # Init compression
-        zobj = zlib.compressobj(
-            compress_level, zlib.DEFLATED, zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY
-        )
+    return wrapper
 
-        # Return compressed object
-        return zobj.compress(b(data)) + zobj.flush()
 
-    return wrapper
+def deflate_compress(data, compress_level=6):
+    """Compress given data using the DEFLATE algorithm"""
+    # Init compression
+    zobj = zlib.compressobj(compress_level, zlib.DEFLATED, zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY)
+
+    # Return compressed object
+    return zobj.compress(b(data)) + zobj.flush()
+
+
+# Options of the Bottle server adapters for the number of workers and the connections limit
+# (other adapters use their own defaults)
+server_adapters_options = {
+    'waitress': {'workers': 'threads', 'max_connections': 'connection_limit'},
+    'cheroot': {'workers': 'numthreads'},
+}
+
+
+class GlancesStatsSnapshot(object):
+    """The stats of an update cycle, published by the stats refresher.
+
+    A snapshot is never modified after its creation: the stats and views
+    are serialized when the snapshot is created and the dicts returned by
+    the stats and views properties are decoded copies (not the plugins
+    objects). They should be read only.
+    """
+
+    def __init__(self, cycle, stats_json, views_json):
+        self.cycle = cycle
+        self.stats_json = stats_json
+        self.views_json = views_json
+        # Values built for this cycle (responses bodies, decoded stats, indexes...)
+        self._values = {}
+        # Values being built (key: threading.Event set when the build is done)
+        self._building = {}
+        self._lock = threading.Lock()
+        # Number of values built and of callers waiting for a build of another caller
+        self.builds = 0
+        self.coalesced = 0
+
+    def memo(self, key, build):
+        """Return the value built by build() for the key during this cycle.
+
+        The value is built once (single flight): the concurrent callers
+        wait for the first one and share its result. If the build fails,
+        the waiting callers build the value themselves.
+        """
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            done = self._building.get(key)
+            if done is None:
+                done = self._building[key] = threading.Event()
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            done.wait()
+            try:
+                return self._values[key]
+            except KeyError:
+                return build()
+        try:
+            value = build()
+            with self._lock:
+                self._values[key] = value
+                self.builds += 1
+            return value
+        finally:
+            with self._lock:
+                del self._building[key]
+            done.set()
+
+    @property
+    def stats(self):
+        """Return the stats of all the plugins (dict)."""
+        return self.memo('stats', lambda: json.loads(self.stats_json))
+
+    @property
+    def views(self):
+        """Return the views of all the plugins (dict)."""
+        return self.memo('views', lambda: json.loads(self.views_json))
+
+    def index(self, plugin, item):
+        """Return the index of the plugin list stats on item (see dictlist_index).
+
+        The index is built on the first call.
+        Raise KeyError if item is not in the stats.
+        """
+        return self.memo(('index', plugin, item), lambda: dictlist_index(self.stats[plugin], item))
+
+
+class GlancesStaticFiles(object):
+    """The Web UI static files, read and compressed on their first request.
+
+    The files are kept in memory with their gzip (and brotli, if the brotli
+    module is installed) compressed bodies: the next requests cost neither
+    disk reads nor compression. A file is read again if it is modified.
+    The version of a file is a hash of its content.
+    """
+
+    # Compressed media types (the other images are already compressed)
+    compressed_types = (
+        'text/',
+        'application/javascript',
+        'application/json',
+        'image/svg+xml',
+        'image/vnd.microsoft.icon',
+        'image/x-icon',
+    )
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        # key: file path, value: dict (mtime, mimetype, version, compress, bodies)
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def get(self, filepath):
+        """Return the static file (dict) or None if the file is not found in the root directory."""
+        path = os.path.realpath(os.path.join(self.root, filepath))
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return None
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            static = self._files.get(path)
+            if static is None or static['mtime'] != mtime:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+                static = {
+                    'mtime': mtime,
+                    'mimetype': mimetype,
+                    'version': hashlib.sha256(data).hexdigest()[:16],
+                    'compress': mimetype.startswith(self.compressed_types),
+                    # key: content encoding, value: body
+                    'bodies': {'identity': data},
+                }
+                self._files[path] = static
+        return static
+
+    def version(self, filepath):
+        """Return the version of the static file (empty string if not found)."""
+        static = self.get(filepath)
+        return '' if static is None else static['version']
+
+    def body(self, static, encodings):
+        """Return the (content encoding, body) of the static file for the accepted encodings (list)."""
+        encoding = 'identity'
+        if static['compress']:
+            if 'br' in encodings and brotli is not None:
+                encoding = 'br'
+            elif 'gzip' in encodings:
+                encoding = 'gzip'
+        with self._lock:
+            if encoding not in static['bodies']:
+                data = static['bodies']['identity']
+                if encoding == 'br':
+                    static['bodies'][encoding] = brotli.compress(data)
+                else:
+                    static['bodies'][encoding] = gzip.compress(data, compresslevel=9, mtime=0)
+        return encoding, static['bodies'][encoding]
+
+
+def accepted_encodings(accept_encoding):
+    """Return the content encodings (list) of the Accept-Encoding header value (without the q=0 ones)."""
+    ret = []
+    for part in accept_encoding.split(','):
+        encoding, _, params = part.partition(';')
+        try:
+            if params and float(params.strip().partition('=')[2]) == 0:
+                continue
+        except ValueError:
+            pass
+        ret.append(encoding.strip().lower())
+    return ret
+
+
+class GlancesStatsRefresher(threading.Thread):
+    """Thread updating the stats every refresh_time seconds.
+
+    The requests handlers never update the stats: they read the last
+    snapshot published by this thread (see GlancesBottle.refresh).
+    """
+
+    def __init__(self, refresh, refresh_time):
+        """Init the thread (refresh is the function called every refresh_time seconds)."""
+        super(GlancesStatsRefresher, self).__init__(name='GlancesStatsRefresher')
+        # Do not block Glances exit
+        self.daemon = True
+        # Event needed to stop properly the thread
+        self._stopper = threading.Event()
+        self._refresh = refresh
+        # Never refresh more than 10 times per second
+        self.refresh_time = max(refresh_time, 0.1)
+
+    def run(self):
+        """Refresh the stats.
+
+        Infinite loop, should be stopped by calling the stop() method.
+        """
+        while not self.stopped():
+            start = monotonic()
+            try:
+                self._refresh()
+            except Exception as e:
+                logger.error("Cannot refresh the stats ({})".format(e))
+            self._stopper.wait(max(self.refresh_time - (monotonic() - start), 0))
+
+    def stop(self):
+        """Stop the thread."""
+        self._stopper.set()
+
+    def stopped(self):
+        """Return True is the thread is stopped."""
+        return self._stopper.is_set()
 
 
 class GlancesBottle(object):
@@ -75,13 +309,30 @@ class GlancesBottle(object):
         self.args = args
 
         # Init stats
-        # Will be updated within Bottle route
+        # Will be updated by the stats refresher thread
         self.stats = None
 
-        # cached_time is the minimum time interval between stats updates
-        # i.e. HTTP/RESTful calls will not retrieve updated info until the time
-        # since last update is passed (will retrieve old cached info instead)
-        self.timer = Timer(0)
+        # The stats are updated every cached_time seconds by the refresher
+        # thread, the HTTP/RESTful calls read the snapshot of the last update
+        # cycle (they never wait for a stats update), except the history,
+        # limits and timings ones which read the plugins under the update lock
+        self.refresher = None
+        self._update_lock = threading.Lock()
+        # Notified each time a new snapshot is published
+        self._published = threading.Condition()
+
+        # Stats update cycle (incremented by each stats update)
+        self.update_cycle = 0
+        # Last published snapshot (GlancesStatsSnapshot)
+        self.snapshot = None
+        # ETag and cycle id prefix (avoid collisions after a restart)
+        self._etag_prefix = '%x' % int(time())
+        # Documents of the last cycles for the delta requests (/all?since=)
+        # Only filled after the first delta request
+        self.delta = GlancesDelta()
+        # Values built and coalesced builds of the previous snapshots
+        self.builds = 0
+        self.coalesced = 0
 
         # Load configuration file
         self.load_config(config)
@@ -95,14 +346,19 @@ class GlancesBottle(object):
         self._app = Bottle()
         # Enable CORS (issue #479)
         self._app.install(EnableCors())
+        # Requests counters and rate limit (before the password check)
+        self.limiter = GlancesRateLimiter(self.api_rate_limit, self.api_rate_burst)
+        self._app.install(self.limiter)
         # Password
         if args.password != '':
+            self.auth_cache = GlancesAuthCache(config=config)
             self._app.install(auth_basic(self.check_auth))
         # Define routes
         self._route()
 
         # Path where the statics files are stored
         self.STATIC_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'static/public')
+        self.static_files = GlancesStaticFiles(self.STATIC_PATH)
 
         # Paths for templates
         TEMPLATE_PATH.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), 'static/templates'))
@@ -111,17 +367,105 @@ class GlancesBottle(object):
         """Load the outputs section of the configuration file."""
         # Limit the number of processes to display in the WebUI
         self.url_prefix = '/'
+        # Web server backend (threaded is the Python standard library pool of workers)
+        self.server_backend = 'threaded'
+        self.server_workers = 16
+        self.server_max_connections = 100
+        self.server_keepalive_timeout = 5
+        # API requests per second (and burst) allowed for each client (0 is no limit)
+        self.api_rate_limit = 0
+        self.api_rate_burst = 0
         if config is not None and config.has_section('outputs'):
             n = config.get_value('outputs', 'max_processes_display', default=None)
             logger.debug('Number of processes to display in the WebUI: {}'.format(n))
             self.url_prefix = config.get_value('outputs', 'url_prefix', default='/')
             logger.debug('URL prefix: {}'.format(self.url_prefix))
+            self.server_backend = config.get_value('outputs', 'server_backend', default='threaded')
+            self.server_workers = config.get_int_value('outputs', 'server_workers', default=16)
+            self.server_max_connections = config.get_int_value('outputs', 'server_max_connections', default=100)
+            self.server_keepalive_timeout = config.get_float_value('outputs', 'server_keepalive_timeout', default=5)
+            self.api_rate_limit = config.get_float_value('outputs', 'api_rate_limit', default=0)
+            self.api_rate_burst = config.get_int_value('outputs', 'api_rate_burst', default=0)
+        if self.server_backend != 'threaded' and self.server_backend not in server_names:
+            logger.warning(
+                'Unknown Web server backend {} (available: threaded, {})'.format(
+                    self.server_backend, ', '.join(server_names)
+                )
+            )
+            self.server_backend = 'threaded'
+        logger.debug('Web server backend: {}'.format(self.server_backend))
 
-    def __update__(self):
-        # Never update more than 1 time per cached_time
-        if self.timer.finished():
+    def refresh(self):
+        """Update the stats and publish the snapshot of the new update cycle."""
+        with self._update_lock:
             self.stats.update()
-            self.timer = Timer(self.args.cached_time)
+            self.update_cycle += 1
+            snapshot = GlancesStatsSnapshot(
+                self.update_cycle,
+                json_dumps(self.stats.getAllAsDict()),
+                json_dumps(self.stats.getAllViewsAsDict()),
+            )
+        with self._published:
+            if self.snapshot is not None:
+                self.builds += self.snapshot.builds
+                self.coalesced += self.snapshot.coalesced
+            self.snapshot = snapshot
+            self._published.notify_all()
+
+    def _cycle_id(self, snapshot):
+        """Return the id of the snapshot update cycle (string)."""
+        return '{}-{}'.format(self._etag_prefix, snapshot.cycle)
+
+    def _cached_response(self, snapshot, key, build, data=None, variant=None):
+        """Return the body of the key route response for the snapshot update cycle.
+
+        The body is built (serialized) once per update cycle, whatever the
+        number of requests, and deflated once per update cycle if a client
+        asks for it. The ETag is based on the update cycle (and on the
+        variant string, if the same route returns several bodies per cycle):
+        if the client already has the body of the current cycle, return HTTP/304.
+        If data (function returning the object serialized by build) is given
+        and the client accepts it, the body is in the MessagePack format.
+        """
+        suffix = ''
+        if data is not None and self._accept_msgpack():
+            response.content_type = 'application/msgpack'
+            suffix = '-msgpack'
+            key = key + '/msgpack'
+
+            def build():
+                return msgpack_dumps(data())
+
+        deflate = 'deflate' in request.headers.get('Accept-Encoding', '')
+        if deflate:
+            suffix += '-deflate'
+        if variant is not None:
+            suffix = '-' + hashlib.sha256(variant.encode('utf-8')).hexdigest()[:8] + suffix
+        etag = '"{}{}"'.format(self._cycle_id(snapshot), suffix)
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Vary'] = 'Accept, Accept-Encoding'
+        response.headers['Content-Encoding'] = 'deflate' if deflate else 'identity'
+        if etag in [e.strip() for e in request.headers.get('If-None-Match', '').split(',')]:
+            response.status = 304
+            return ''
+
+        return self._cached_body(snapshot, key, build, deflate=deflate)
+
+    def _accept_msgpack(self):
+        """Return True if the client accepts the MessagePack format (and if the msgpack module is installed)."""
+        if msgpack is None:
+            return False
+        accept = request.headers.get('Accept', '')
+        return 'application/msgpack' in accept or 'application/x-msgpack' in accept
+
+    def _cached_body(self, snapshot, key, build, deflate=False):
+        """Return the body built by build() for the key during the snapshot update cycle."""
+        if deflate:
+            return snapshot.memo(
+                ('body', key, True), lambda: deflate_compress(self._cached_body(snapshot, key, build))
+            )
+        return snapshot.memo(('body', key, False), build)
 
     def app(self):
         return self._app()
@@ -129,13 +473,18 @@ class GlancesBottle(object):
     def check_auth(self, username, password):
         """Check if a username/password combination is valid."""
         if username == self.args.username:
-            from glances.password import GlancesPassword
-
-            pwd = GlancesPassword(username=username, config=self.config)
-            return pwd.check_password(self.args.password, pwd.get_hash(password))
+            # The valid credentials are cached (the password check is slow)
+            return self.auth_cache.check(username, password, self._check_password)
         else:
             return False
 
+    def _check_password(self, username, password):
+        """Check the password (without the cache)."""
+        from glances.password import GlancesPassword
+
+        pwd = GlancesPassword(username=username, config=self.config)
+        return pwd.check_password(self.args.password, pwd.get_hash(password))
+
     def _route(self):
         """Define route."""
         # REST API
@@ -149,6 +498,13 @@ class GlancesBottle(object):
         self._app.route('/api/%s/all' % self.API_VERSION, method="GET", callback=self._api_all)
         self._app.route('/api/%s/all/limits' % self.API_VERSION, method="GET", callback=self._api_all_limits)
         self._app.route('/api/%s/all/views' % self.API_VERSION, method="GET", callback=self._api_all_views)
+        self._app.route(
+            '/api/%s/internal/timings' % self.API_VERSION, method="GET", callback=self._api_internal_timings
+        )
+        self._app.route(
+            '/api/%s/internal/requests' % self.API_VERSION, method="GET", callback=self._api_internal_requests
+        )
+        self._app.route('/api/%s/stream' % self.API_VERSION, method="GET", callback=self._api_stream)
         self._app.route('/api/%s/<plugin>' % self.API_VERSION, method="GET", callback=self._api)
         self._app.route('/api/%s/<plugin>/history' % self.API_VERSION, method="GET", callback=self._api_history)
         self._app.route(
@@ -163,6 +519,11 @@ class GlancesBottle(object):
         self._app.route(
             '/api/%s/<plugin>/<item>/history/<nb:int>' % self.API_VERSION, method="GET", callback=self._api_item_history
         )
+        self._app.route(
+            '/api/%s/<plugin>/<item>/history/stats' % self.API_VERSION,
+            method="GET",
+            callback=self._api_item_history_stats,
+        )
         self._app.route('/api/%s/<plugin>/<item>/<value>' % self.API_VERSION, method="GET", callback=self._api_value)
         self._app.route(
             '/api/%s/<plugin>/<item>/<value:path>' % self.API_VERSION, method="GET", callback=self._api_value
@@ -190,6 +551,11 @@ class GlancesBottle(object):
         # Init plugin list
         self.plugins_list = self.stats.getPluginsList()
 
+        # Publish the first snapshot and start the stats refresher
+        self.refresh()
+        self.refresher = GlancesStatsRefresher(self.refresh, self.args.cached_time)
+        self.refresher.start()
+
         # Bind the Bottle TCP address/port
         if self.args.open_web_browser:
             # Implementation of the issue #946
@@ -203,23 +569,44 @@ class GlancesBottle(object):
             # Create an outer Bottle class instance to manage url_prefix
             self.main_app = Bottle()
             self.main_app.mount(self.url_prefix, self._app)
-            try:
-                self.main_app.run(host=self.args.bind_address,
-                                  port=self.args.port,
-                                  quiet=not self.args.debug)
-            except socket.error as e:
-                logger.critical('Error: Can not ran Glances Web server ({})'.format(e))
+            self._run(self.main_app)
         else:
-            try:
-                self._app.run(host=self.args.bind_address,
-                              port=self.args.port,
-                              quiet=not self.args.debug)
-            except socket.error as e:
-                logger.critical('Error: Can not ran Glances Web server ({})'.format(e))
+            self._run(self._app)
+
+    def _run(self, app, server_backend=None):
+        """Run the Bottle application with the Web server backend."""
+        server_backend = server_backend or self.server_backend
+        options = {}
+        if server_backend == 'threaded':
+            server = 'wsgiref'
+            options['server_class'] = GlancesWSGIServer.configure(
+                workers=self.server_workers,
+                max_connections=self.server_max_connections,
+                keepalive_timeout=self.server_keepalive_timeout,
+                quiet=not self.args.debug,
+            )
+            options['handler_class'] = GlancesWSGIRequestHandler
+        else:
+            server = server_backend
+            for option, value in server_adapters_options.get(server_backend, {}).items():
+                options[value] = getattr(self, 'server_' + option)
+        try:
+            app.run(
+                host=self.args.bind_address, port=self.args.port, quiet=not self.args.debug, server=server, **options
+            )
+        except ImportError as e:
+            logger.warning('Can not use the {} Web server backend ({}), use threaded'.format(server_backend, e))
+            self._run(app, server_backend='threaded')
+        except socket.error as e:
+            logger.critical('Error: Can not ran Glances Web server ({})'.format(e))
 
     def end(self):
         """End the bottle."""
         logger.info("Close the Web server")
+        if self.refresher is not None:
+            self.refresher.stop()
+            # Wait for the end of the current stats update
+            self.refresher.join()
         self._app.close()
         if self.url_prefix != '/':
             self.main_app.close()
@@ -230,16 +617,43 @@ class GlancesBottle(object):
         if refresh_time is None or refresh_time < 1:
             refresh_time = int(self.args.time)
 
-        # Update the stat
-        self.__update__()
-
         # Display
-        return template("index.html", refresh_time=refresh_time)
+        return template(
+            "index.html", refresh_time=refresh_time, glances_js_version=self.static_files.version('glances.js')
+        )
+
+    # Files named by webpack with the hash of their content
+    hashed_resource = re.compile(r'^[0-9a-f]{16,}\.\w+$')
 
     def _resource(self, filepath):
-        """Bottle callback for resources files."""
-        # Return the static file
-        return static_file(filepath, root=self.STATIC_PATH)
+        """Bottle callback for resources files.
+
+        The files are served from memory, compressed if the client accepts it.
+        The versioned (?v=<version>, see _index) and hashed files URLs are
+        cached by the browsers for a year, the other ones are revalidated with
+        their ETag.
+        """
+        static = self.static_files.get(filepath)
+        if static is None:
+            # Return the static file (HTTP/404 or HTTP/403)
+            return static_file(filepath, root=self.STATIC_PATH)
+
+        encoding, body = self.static_files.body(static, accepted_encodings(request.headers.get('Accept-Encoding', '')))
+        response.content_type = static['mimetype']
+        if static['mimetype'].startswith('text/') or static['mimetype'] == 'application/javascript':
+            response.content_type += '; charset=utf-8'
+        etag = '"{}-{}"'.format(static['version'], encoding)
+        response.headers['ETag'] = etag
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Content-Encoding'] = encoding
+        if request.query.get('v') == static['version'] or self.hashed_resource.match(os.path.basename(filepath)):
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        if etag in [e.strip() for e in request.headers.get('If-None-Match', '').split(',')]:
+            response.status = 304
+            return ''
+        return body
 
     @compress
     def _api_status(self):
@@ -299,9 +713,6 @@ class GlancesBottle(object):
         """
         response.content_type = 'application/json; charset=utf-8'
 
-        # Update the stat
-        self.__update__()
-
         try:
             plist = json_dumps(self.plugins_list)
         except Exception as e:
@@ -313,6 +724,10 @@ class GlancesBottle(object):
         """Glances API RESTful implementation.
 
         Return the JSON representation of all the plugins
+        If the since query parameter (cycle id) is given, return the JSON Patch
+        (RFC 6902) from the since cycle to the current one:
+        {"cycle": <current cycle id>, "since": <since>, "patch": [...]}
+        The current cycle id is given by the X-Glances-Cycle header.
         HTTP/200 if OK
         HTTP/400 if plugin is not found
         HTTP/404 if others error
@@ -327,16 +742,23 @@ class GlancesBottle(object):
             except IOError:
                 logger.debug("Debug file (%s) not found" % fname)
 
-        # Update the stat
-        self.__update__()
+        snapshot = self.snapshot
+        cycle = self._cycle_id(snapshot)
+        response.headers['X-Glances-Cycle'] = cycle
+        since = request.query.get('since')
+        if since is None:
+            body = self._cached_response(snapshot, 'all', lambda: snapshot.stats_json, data=lambda: snapshot.stats)
+            if self.delta:
+                # Keep the document of the cycle for the next delta requests
+                self.delta.add(cycle, snapshot.stats)
+            return body
 
-        try:
-            # Get the JSON value of the stat ID
-            statval = json_dumps(self.stats.getAllAsDict())
-        except Exception as e:
-            abort(404, "Cannot get stats (%s)" % str(e))
+        def build_delta():
+            self.delta.add(cycle, snapshot.stats)
+            return json_dumps({'cycle': cycle, 'since': since, 'patch': self.delta.get(since, cycle)})
 
-        return statval
+        # The delta depends on the since cycle
+        return self._cached_response(snapshot, 'all/since/' + since, build_delta, variant='since=' + since)
 
     @compress
     def _api_all_limits(self):
@@ -349,12 +771,19 @@ class GlancesBottle(object):
         """
         response.content_type = 'application/json; charset=utf-8'
 
-        try:
-            # Get the JSON value of the stat limits
-            limits = json_dumps(self.stats.getAllLimitsAsDict())
-        except Exception as e:
-            abort(404, "Cannot get limits (%s)" % (str(e)))
-        return limits
+        def limits():
+            # The limits are updated by the refresher thread
+            with self._update_lock:
+                return self.stats.getAllLimitsAsDict()
+
+        def build():
+            try:
+                # Get the JSON value of the stat limits
+                return json_dumps(limits())
+            except Exception as e:
+                abort(404, "Cannot get limits (%s)" % (str(e)))
+
+        return self._cached_response(self.snapshot, 'all/limits', build, data=limits)
 
     @compress
     def _api_all_views(self):
@@ -367,20 +796,106 @@ class GlancesBottle(object):
         """
         response.content_type = 'application/json; charset=utf-8'
 
+        snapshot = self.snapshot
+        return self._cached_response(snapshot, 'all/views', lambda: snapshot.views_json, data=lambda: snapshot.views)
+
+    @compress
+    def _api_internal_timings(self):
+        """Glances API RESTful implementation.
+
+        Return the JSON representation of the plugins update, history and views
+        durations (last, mean and p95 in seconds) and skipped updates counters
+        HTTP/200 if OK
+        HTTP/404 if others error
+        """
+        response.content_type = 'application/json; charset=utf-8'
+
         try:
-            # Get the JSON value of the stat view
-            limits = json_dumps(self.stats.getAllViewsAsDict())
+            # Get the JSON value of the plugins timings
+            with self._update_lock:
+                timings = json_dumps(self.stats.getAllTimingsAsDict())
         except Exception as e:
-            abort(404, "Cannot get views (%s)" % (str(e)))
-        return limits
+            abort(404, "Cannot get timings (%s)" % (str(e)))
+        return timings
+
+    @compress
+    def _api_internal_requests(self):
+        """Glances API RESTful implementation.
+
+        Return the JSON representation of the API requests counters: requests,
+        rate limited requests (HTTP/429), responses built and requests waiting
+        for a response built by another request (coalesced)
+        HTTP/200 if OK
+        """
+        response.content_type = 'application/json; charset=utf-8'
+
+        snapshot = self.snapshot
+        return json_dumps(
+            {
+                'requests': self.limiter.requests,
+                'rate_limited': self.limiter.limited,
+                'rate_limit': self.limiter.rate,
+                'rate_limit_burst': self.limiter.burst,
+                'clients': len(self.limiter),
+                'builds': self.builds + snapshot.builds,
+                'coalesced': self.coalesced + snapshot.coalesced,
+            }
+        )
+
+    # No compression (the stream is sent event by event)
+    def _api_stream(self):
+        """Glances API RESTful implementation.
+
+        Stream the stats of the plugins given by the plugins query parameter
+        (comma separated list, default is all the plugins) as Server-Sent Events.
+        One event is sent per stats update cycle.
+        HTTP/200 if OK
+        HTTP/400 if a plugin is not found
+        """
+        plugins = request.query.get('plugins')
+        plugins = plugins.split(',') if plugins else self.plugins_list
+        for plugin in plugins:
+            if plugin not in self.plugins_list:
+                abort(400, "Unknown plugin %s (available plugins: %s)" % (plugin, self.plugins_list))
+
+        response.content_type = 'text/event-stream; charset=utf-8'
+        response.headers['Cache-Control'] = 'no-cache'
+        # Disable the buffering of the reverse proxies (Nginx)
+        response.headers['X-Accel-Buffering'] = 'no'
+
+        return self._stream(sorted(set(plugins)))
+
+    def _stream(self, plugins):
+        """Generate one Server-Sent Event per stats update cycle.
+
+        The event of a cycle is serialized once and shared by all the
+        subscribers of the same plugins list. The event id is the cycle id
+        (the X-Glances-Cycle header, usable as since parameter of /all).
+        """
+        key = 'stream/' + ','.join(plugins)
+
+        def build(snapshot):
+            stats = {p: snapshot.stats.get(p) for p in plugins}
+            return 'id: {}\nevent: stats\ndata: {}\n\n'.format(self._cycle_id(snapshot), json_dumps(stats))
+
+        snapshot = self.snapshot
+        while True:
+            yield self._cached_body(snapshot, key, lambda: build(snapshot))
+            # Wait for the next snapshot
+            with self._published:
+                self._published.wait_for(lambda: self.snapshot is not snapshot)
+                snapshot = self.snapshot
 
     @compress
     def _api(self, plugin):
         """Glances API RESTful implementation.
 
         Return the JSON representation of a given plugin
+        The stats of the list plugins can be filtered, sorted, limited and
+        projected with the where, sort, limit and fields query parameters
+        (see _stats_query)
         HTTP/200 if OK
-        HTTP/400 if plugin is not found
+        HTTP/400 if plugin is not found or if the query is not valid
         HTTP/404 if others error
         """
         response.content_type = 'application/json; charset=utf-8'
@@ -388,16 +903,60 @@ class GlancesBottle(object):
         if plugin not in self.plugins_list:
             abort(400, "Unknown plugin %s (available plugins: %s)" % (plugin, self.plugins_list))
 
-        # Update the stat
-        self.__update__()
+        snapshot = self.snapshot
+        query = self._stats_query()
 
-        try:
+        def data():
+            try:
+                stats = snapshot.stats[plugin]
+            except Exception as e:
+                abort(404, "Cannot get plugin %s (%s)" % (plugin, str(e)))
+            if query:
+                stats = self._query_stats(plugin, stats, query)
+            return stats
+
+        def build():
             # Get the JSON value of the stat ID
-            statval = self.stats.get_plugin(plugin).get_stats()
-        except Exception as e:
-            abort(404, "Cannot get plugin %s (%s)" % (plugin, str(e)))
+            return json_dumps(data())
 
-        return statval
+        if query:
+            return self._cached_response(snapshot, '{}?{}'.format(plugin, request.query_string), build, data=data)
+        return self._cached_response(snapshot, plugin, build, data=data)
+
+    def _stats_query(self):
+        """Return the stats query given by the request query parameters (dict, empty if no query).
+
+        - fields: comma separated list of fields to return
+        - sort: field to sort on (prefixed by - for the descending order)
+        - limit: maximum number of items
+        - where: condition (<field><operator><value>, several where parameters are allowed)
+        HTTP/400 if the limit is not a positive integer
+        """
+        query = {}
+        if 'fields' in request.query:
+            query['fields'] = [f for f in request.query.get('fields').split(',') if f]
+        if 'sort' in request.query:
+            query['sort'] = request.query.get('sort')
+        if 'limit' in request.query:
+            try:
+                query['limit'] = int(request.query.get('limit'))
+            except ValueError:
+                query['limit'] = -1
+            if query['limit'] < 0:
+                abort(400, "Invalid limit %s (should be a positive integer)" % request.query.get('limit'))
+        if request.query.getall('where'):
+            query['where'] = request.query.getall('where')
+        return query
+
+    def _query_stats(self, plugin, stats, query):
+        """Return the plugin stats matching the query (see _stats_query).
+
+        HTTP/400 if the query is not valid
+        """
+        try:
+            return query_stats(stats, **query)
+        except ValueError as e:
+            abort(400, "Invalid query for plugin %s (%s)" % (plugin, str(e)))
 
     @compress
     def _api_history(self, plugin, nb=0):
@@ -405,6 +964,7 @@ class GlancesBottle(object):
 
         Return the JSON representation of a given plugin history
         Limit to the last nb items (all if nb=0)
+        Read from the rollup tiers if the resolution (in seconds) query parameter is given
         HTTP/200 if OK
         HTTP/400 if plugin is not found
         HTTP/404 if others error
@@ -414,15 +974,33 @@ class GlancesBottle(object):
         if plugin not in self.plugins_list:
             abort(400, "Unknown plugin %s (available plugins: %s)" % (plugin, self.plugins_list))
 
-        # Update the stat
-        self.__update__()
+        resolution = self._history_resolution()
+
+        def build():
+            try:
+                # Get the JSON value of the stat ID
+                # (the history is updated by the refresher thread)
+                with self._update_lock:
+                    return self.stats.get_plugin(plugin).get_stats_history(nb=int(nb), resolution=resolution)
+            except Exception as e:
+                abort(404, "Cannot get plugin history %s (%s)" % (plugin, str(e)))
+
+        return self._cached_response(self.snapshot, '{}/history/{}/{}'.format(plugin, nb, resolution), build)
 
+    def _history_resolution(self):
+        """Return the history resolution (in seconds) given in the request query (0 for the raw history).
+
+        HTTP/400 if the resolution is not a positive number
+        """
         try:
-            # Get the JSON value of the stat ID
-            statval = self.stats.get_plugin(plugin).get_stats_history(nb=int(nb))
-        except Exception as e:
-            abort(404, "Cannot get plugin history %s (%s)" % (plugin, str(e)))
-        return statval
+            resolution = float(request.query.get('resolution', 0))
+        except ValueError:
+            resolution = -1
+        if resolution < 0:
+            abort(
+                400, "Invalid history resolution %s (should be a number of seconds)" % request.query.get('resolution')
+            )
+        return resolution
 
     @compress
     def _api_limits(self, plugin):
@@ -438,12 +1016,10 @@ class GlancesBottle(object):
         if plugin not in self.plugins_list:
             abort(400, "Unknown plugin %s (available plugins: %s)" % (plugin, self.plugins_list))
 
-        # Update the stat
-        # self.__update__()
-
         try:
             # Get the JSON value of the stat limits
-            ret = self.stats.get_plugin(plugin).limits
+            with self._update_lock:
+                ret = json_dumps(self.stats.get_plugin(plugin).limits)
         except Exception as e:
             abort(404, "Cannot get limits for plugin %s (%s)" % (plugin, str(e)))
         return ret
@@ -462,12 +1038,9 @@ class GlancesBottle(object):
         if plugin not in self.plugins_list:
             abort(400, "Unknown plugin %s (available plugins: %s)" % (plugin, self.plugins_list))
 
-        # Update the stat
-        # self.__update__()
-
         try:
             # Get the JSON value of the stat views
-            ret = self.stats.get_plugin(plugin).get_views()
+            ret = self.snapshot.views[plugin]
         except Exception as e:
             abort(404, "Cannot get views for plugin %s (%s)" % (plugin, str(e)))
         return ret
@@ -481,14 +1054,19 @@ class GlancesBottle(object):
         if plugin not in self.plugins_list:
             abort(400, "Unknown plugin %s (available plugins: %s)" % (plugin, self.plugins_list))
 
-        # Update the stat
-        self.__update__()
+        resolution = self._history_resolution() if history else 0
 
+        snapshot = self.snapshot
+        stats = snapshot.stats.get(plugin)
         if value is None:
             if history:
-                ret = self.stats.get_plugin(plugin).get_stats_history(item, nb=int(nb))
+                with self._update_lock:
+                    ret = self.stats.get_plugin(plugin).get_stats_history(item, nb=int(nb), resolution=resolution)
             else:
-                ret = self.stats.get_plugin(plugin).get_stats_item(item)
+                query = self._stats_query()
+                if query:
+                    stats = self._query_stats(plugin, stats, query)
+                ret = json_dumps_dictlist(stats, item)
 
             if ret is None:
                 abort(404, "Cannot get item %s%s in plugin %s" % (item, 'history ' if history else '', plugin))
@@ -497,7 +1075,11 @@ class GlancesBottle(object):
                 # Not available
                 ret = None
             else:
-                ret = self.stats.get_plugin(plugin).get_stats_value(item, value)
+                try:
+                    index = snapshot.index(plugin, item) if isinstance(stats, list) else None
+                    ret = json_dumps_dictlist_value(stats, item, value, index=index)
+                except (KeyError, ValueError):
+                    ret = None
 
             if ret is None:
                 abort(
@@ -511,8 +1093,10 @@ class GlancesBottle(object):
         """Glances API RESTful implementation.
 
         Return the JSON representation of the couple plugin/item
+        The where, sort and limit query parameters are available for the
+        list plugins (see _stats_query)
         HTTP/200 if OK
-        HTTP/400 if plugin is not found
+        HTTP/400 if plugin is not found or if the query is not valid
         HTTP/404 if others error
 
         """
@@ -530,6 +1114,40 @@ class GlancesBottle(object):
         """
         return self._api_itemvalue(plugin, item, history=True, nb=int(nb))
 
+    @compress
+    def _api_item_history_stats(self, plugin, item):
+        """Glances API RESTful implementation.
+
+        Return the JSON representation of statistics on the history of item
+        Query parameters:
+        - window: only use the history of the last window seconds (default is all the history)
+        - agg: comma separated list of aggregations (default is mean)
+        HTTP/200 if OK
+        HTTP/400 if plugin is not found or if a parameter is not valid
+        HTTP/404 if others error
+        """
+        response.content_type = 'application/json; charset=utf-8'
+
+        if plugin not in self.plugins_list:
+            abort(400, "Unknown plugin %s (available plugins: %s)" % (plugin, self.plugins_list))
+
+        try:
+            window = float(request.query.get('window', 0))
+        except ValueError:
+            window = -1
+        if window < 0:
+            abort(400, "Invalid history window %s (should be a number of seconds)" % request.query.get('window'))
+        agg = request.query.get('agg', 'mean').split(',')
+
+        try:
+            with self._update_lock:
+                ret = self.stats.get_plugin(plugin).get_stats_history_stats(item, window=window, agg=agg)
+        except ValueError as e:
+            abort(400, "Cannot get item %s history stats in plugin %s (%s)" % (item, plugin, str(e)))
+        if ret is None:
+            abort(404, "Cannot get item %s history stats in plugin %s" % (item, plugin))
+        return ret
+
     @compress
     def _api_value(self, plugin, item, value):
         """Glances API RESTful implementation.
@@ -627,17 +1245,102 @@ class EnableCors(object):
     name = 'enable_cors'
     api = 2
 
+    # CORS headers (also set by the errors raised before the response, see GlancesRateLimiter)
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
+        'Access-Control-Allow-Headers': 'Origin, Accept, Content-Type, X-Requested-With, X-CSRF-Token',
+        # The cycle id is needed by the cross-origin clients of the delta API (since parameter)
+        'Access-Control-Expose-Headers': 'ETag, X-Glances-Cycle',
+    }
+
     def apply(self, fn, context):
         def _enable_cors(*args, **kwargs):
             # set CORS headers
-            response.headers['Access-Control-Allow-Origin'] = '*'
-            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, OPTIONS'
-            response.headers[
-                'Access-Control-Allow-Headers'
-            ] = 'Origin, Accept, Content-Type, X-Requested-With, X-CSRF-Token'
+            for header, value in self.headers.items():
+                response.headers[header] = value
 
             if request.method != 'OPTIONS':
                 # actual request; reply with the actual response
                 return fn(*args, **kwargs)
 
         return _enable_cors
+
+
+class GlancesRateLimiter(object):
+    """Bottle plugin counting the API requests and limiting their rate per client.
+
+    Each client (IP address of the connection) has a bucket of burst
+    tokens, refilled at rate tokens per second. An API request takes a
+    token, if the bucket is empty the response is HTTP/429 (with a
+    Retry-After header). A rate of 0 disables the limit.
+    """
+
+    name = 'rate_limiter'
+    api = 2
+
+    # Maximum number of buckets (the buckets of the idle clients are removed)
+    max_clients = 4096
+
+    def __init__(self, rate=0, burst=0):
+        self.rate = max(rate, 0)
+        # Default burst: one second of requests
+        self.burst = burst if burst > 0 else max(int(math.ceil(self.rate)), 1)
+        # Client buckets, key: client, value: [tokens, last refill time]
+        self._buckets = {}
+        self._lock = threading.Lock()
+        # Counters
+        self.requests = 0
+        self.limited = 0
+
+    def __len__(self):
+        """Return the number of clients with a bucket."""
+        return len(self._buckets)
+
+    def acquire(self, client, now=None):
+        """Take a token from the client bucket.
+
+        Return 0 if the request is allowed, else the number of seconds before the next token.
+        """
+        with self._lock:
+            self.requests += 1
+            if self.rate <= 0:
+                return 0
+            if now is None:
+                now = monotonic()
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._evict(now)
+                bucket = self._buckets[client] = [self.burst, now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            self.limited += 1
+            return (1 - bucket[0]) / self.rate
+
+    def _evict(self, now):
+        """Remove the buckets of the idle clients (full buckets)."""
+        for client, (tokens, last) in list(self._buckets.items()):
+            if tokens + (now - last) * self.rate >= self.burst:
+                del self._buckets[client]
+
+    def apply(self, fn, context):
+        if not context.rule.startswith('/api/'):
+            # Web UI and static files
+            return fn
+
+        def _rate_limit(*args, **kwargs):
+            # Connection address (not the X-Forwarded-For header set by the client)
+            wait = self.acquire(request.environ.get('REMOTE_ADDR'))
+            if wait:
+                # The error replaces the response: set the CORS headers (a browser would report a CORS error)
+                headers = dict(EnableCors.headers)
+                headers['Retry-After'] = str(int(math.ceil(wait)))
+                raise HTTPError(429, "Too many requests", headers=headers)
+            return fn(*args, **kwargs)
+
+        return _rate_limit
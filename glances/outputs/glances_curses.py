@@ -138,6 +138,9 @@ class _GlancesCurses(object):
         self.space_between_column = 3
         self.space_between_line = 2
 
+        # Number of lines of the processes list area (set by the last display)
+        self._processlist_lines = None
+
         # Init the curses screen
         self.screen = curses.initscr()
         if not self.screen:
@@ -625,6 +628,12 @@ class _GlancesCurses(object):
             - (0 if 'amps' not in __stat_display else self.get_stats_display_height(__stat_display["amps"]))
             - (0 if 'alert' not in __stat_display else self.get_stats_display_height(__stat_display["alert"]))
         )
+        # The processes list area of the last display (the screen height before the first one)
+        # can be larger than the estimation
+        max_processes_displayed = max(
+            max_processes_displayed,
+            self.term_window.getmaxyx()[0] if self._processlist_lines is None else self._processlist_lines,
+        )
 
         try:
             if self.args.enable_process_extended:
@@ -911,13 +920,14 @@ class _GlancesCurses(object):
                     continue
                 self.new_line()
                 if p == 'processlist':
+                    max_y = self.term_window.getmaxyx()[0] - self.get_stats_display_height(stat_display['alert']) - 2
+                    # Header on the first line, then one process per line
+                    self._processlist_lines = max(max_y - self.line, 0)
                     self.display_plugin(
                         stat_display['processlist'],
                         display_optional=(self.term_window.getmaxyx()[1] > 102),
                         display_additional=(not MACOS),
-                        max_y=(
-                            self.term_window.getmaxyx()[0] - self.get_stats_display_height(stat_display['alert']) - 2
-                        ),
+                        max_y=max_y,
                     )
                 else:
                     self.display_plugin(stat_display[p])
@@ -49,6 +49,50 @@ For example:
 will change the root API URL to ``http://localhost:61208/glances/api/3`` and the Web UI URL to
 ``http://localhost:61208/glances/``
 
+API cache
+---------
+
+The stats are updated every ``--cached-time`` seconds by a background thread. Requests
+never wait for a stats update: they read the stats of the last update. The responses of the
+``/all``, ``/all/limits``, ``/all/views``, ``/<plugin>`` and ``/<plugin>/history`` entry points
+are serialized (and deflated) only once per stats update and returned with an ``ETag`` header.
+A client sending this ETag in the ``If-None-Match`` header gets an empty HTTP/304 response
+until the next stats update::
+
+    # curl -H 'If-None-Match: "6a9ec0a1-42"' -I http://localhost:61208/api/3/cpu
+    HTTP/1.0 304 Not Modified
+
+The responses of the requests arriving during the serialization of the same response wait for
+it and share it (they are counted as coalesced).
+
+API encoding
+------------
+
+If the msgpack Python module is installed, the ``/all``, ``/all/limits``, ``/all/views`` and
+``/<plugin>`` entry points return the stats in the MessagePack format when the client sends the
+``Accept: application/msgpack`` header (JSON otherwise)::
+
+    # curl -H 'Accept: application/msgpack' -o cpu.msgpack http://localhost:61208/api/3/cpu
+
+The XML-RPC ``getAllPacked()`` method returns all the stats in the deflated MessagePack format.
+The Glances client uses it if msgpack is installed on both the client and the server.
+
+API rate limit
+--------------
+
+The API requests rate of each client (IP address of the connection) can be limited in the
+``[outputs]`` section of the configuration file (token bucket of ``api_rate_burst`` requests,
+refilled at ``api_rate_limit`` requests per second)::
+
+    [outputs]
+    api_rate_limit = 10
+    api_rate_burst = 20
+
+A client exceeding the limit gets an HTTP/429 response with a ``Retry-After`` header.
+The Web UI static files are not limited. Behind a reverse proxy, all the clients share the
+proxy address (and its limit). The requests counters are available with
+``/api/3/internal/requests``.
+
 """
 
 
@@ -161,6 +205,76 @@ def print_all():
     print('    # curl {}/all'.format(API_URL))
     print('    Return a very big dictionnary (avoid using this request, performances will be poor)...')
     print('')
+    print('Get only the stats changed since a previous update cycle (JSON Patch, RFC 6902).')
+    print('The current cycle id is returned in the ``X-Glances-Cycle`` header and in the ``cycle`` field.')
+    print('If the given cycle is unknown (too old, or empty to initialize the client), the patch replaces')
+    print('the whole stats::')
+    print('')
+    print('    # curl {}/all?since='.format(API_URL))
+    print('    {"cycle": "6ad3151a-12", "since": "", "patch": [{"op": "replace", "path": "", "value": {...}}]}')
+    print('')
+    print('    # curl {}/all?since=6ad3151a-12'.format(API_URL))
+    print('    {"cycle": "6ad3151a-13",')
+    print('     "since": "6ad3151a-12",')
+    print('     "patch": [{"op": "replace", "path": "/cpu/total", "value": 3.2},')
+    print('               {"op": "replace", "path": "/mem/used", "value": 3874402304},')
+    print('               ...]}')
+    print('')
+    print('The same delta is available through the XML-RPC ``getAllSince(<cycle>)`` method.')
+    print('')
+
+
+def print_stream():
+    sub_title = 'GET stats stream'
+    print(sub_title)
+    print('-' * len(sub_title))
+    print('')
+    print('Stream the stats of a list of plugins (default is all the plugins) as Server-Sent Events.')
+    print('One event is pushed after each stats update (see ``--cached-time``)::')
+    print('')
+    print('    # curl -N {}/stream?plugins=cpu,mem'.format(API_URL))
+    print('    id: 1')
+    print('    event: stats')
+    print('    data: {"cpu": {"total": 2.4, "user": 1.8, ...}, "mem": {"total": 7837949952, ...}}')
+    print('')
+    print('    id: 2')
+    print('    event: stats')
+    print('    data: {"cpu": {"total": 3.1, "user": 2.2, ...}, "mem": {"total": 7837949952, ...}}')
+    print('')
+    print('In a Web browser::')
+    print('')
+    print("    const source = new EventSource('/api/3/stream?plugins=cpu,mem');")
+    print("    source.addEventListener('stats', (e) => console.log(JSON.parse(e.data)));")
+    print('')
+
+
+def print_query():
+    sub_title = 'GET list plugins stats query'
+    print(sub_title)
+    print('-' * len(sub_title))
+    print('')
+    print('The stats of the list plugins (processlist, network, fs, diskio, containers, sensors...) can be')
+    print('filtered, sorted, limited and projected on the server side with the following query parameters:')
+    print('')
+    print('- ``where``: condition ``<field><operator><value>`` with the ``=``, ``!=``, ``>``, ``>=``, ``<``, ``<=``')
+    print('  or ``~`` (regular expression search) operator. Several ``where`` parameters can be given (all of them')
+    print('  should match)')
+    print('- ``sort``: field to sort on (prefixed by ``-`` for the descending order)')
+    print('- ``limit``: maximum number of items (with ``sort``, only the top items are sorted)')
+    print('- ``fields``: comma separated list of the fields to return')
+    print('')
+    print('Top 3 processes by CPU consumption::')
+    print('')
+    print("    # curl '{}/processlist?fields=pid,name,cpu_percent&sort=-cpu_percent&limit=3'".format(API_URL))
+    print('    [{"pid": 2907, "name": "firefox", "cpu_percent": 12.5},')
+    print('     {"pid": 20632, "name": "python", "cpu_percent": 3.1},')
+    print('     {"pid": 123, "name": "Xorg", "cpu_percent": 1.5}]')
+    print('')
+    print('The ``where``, ``sort`` and ``limit`` parameters are also available for a field::')
+    print('')
+    print("    # curl '{}/processlist/pid?where=name~^python&sort=pid'".format(API_URL))
+    print('    {"pid": [123, 20632]}')
+    print('')
 
 
 def print_history(stats):
@@ -192,6 +306,30 @@ def print_history(stats):
     print('    # curl {}/cpu/system/history'.format(API_URL))
     print(indent_stat(json.loads(stats.get_plugin('cpu').get_stats_history('system', nb=2))))
     print('')
+    print('History for a specific field with a 1 minute resolution (date, mean, min, max)::')
+    print('')
+    print('    # curl {}/cpu/system/history/2?resolution=60'.format(API_URL))
+    print(indent_stat(json.loads(stats.get_plugin('cpu').get_stats_history('system', nb=2, resolution=60))))
+    print('')
+    print('The resolution is read from the history_rollups tiers of the [global] configuration section.')
+    print('The coarsest tier with a resolution lower or equal to the given one is used (raw history if none).')
+    print('')
+    print('Statistics on the history of a specific field during the last 10 minutes::')
+    print('')
+    print('    # curl "{}/cpu/system/history/stats?window=600&agg=mean,p95,min,max,rate"'.format(API_URL))
+    print(
+        indent_stat(
+            json.loads(
+                stats.get_plugin('cpu').get_stats_history_stats(
+                    'system', window=600, agg=['mean', 'p95', 'min', 'max', 'rate']
+                )
+            )
+        )
+    )
+    print('')
+    print('Available aggregations: min, max, mean, sum, count, last, rate (per second) and pXX (XXth percentile).')
+    print('Default window is all the history and default aggregation is mean.')
+    print('')
 
 
 def print_limits(stats):
@@ -211,6 +349,43 @@ def print_limits(stats):
     print('')
 
 
+def print_timings(stats):
+    sub_title = 'GET timings (Glances own cost)'
+    print(sub_title)
+    print('-' * len(sub_title))
+    print('')
+    print('Update, history and views durations (in seconds) of the cpu plugin::')
+    print('')
+    print('    # curl {}/internal/timings'.format(API_URL))
+    print(indent_stat(stats.getAllTimingsAsDict(['cpu'])))
+    print('')
+
+
+def print_requests():
+    sub_title = 'GET requests counters'
+    print(sub_title)
+    print('-' * len(sub_title))
+    print('')
+    print('API requests, rate limited requests (HTTP/429), responses serialized and requests sharing the')
+    print('response serialized by another request (coalesced)::')
+    print('')
+    print('    # curl {}/internal/requests'.format(API_URL))
+    print(
+        indent_stat(
+            {
+                'requests': 57,
+                'rate_limited': 0,
+                'rate_limit': 0,
+                'rate_limit_burst': 1,
+                'clients': 1,
+                'builds': 42,
+                'coalesced': 3,
+            }
+        )
+    )
+    print('')
+
+
 class GlancesStdoutApiDoc(object):
 
     """This class manages the fields description display."""
@@ -248,11 +423,23 @@ class GlancesStdoutApiDoc(object):
         # Get all stats
         print_all()
 
+        # Stats stream
+        print_stream()
+
+        # List plugins stats query
+        print_query()
+
         # History
         print_history(stats)
 
         # Limits
         print_limits(stats)
 
+        # Timings
+        print_timings(stats)
+
+        # Requests counters
+        print_requests()
+
         # Return True to exit directly (no refresh)
         return True
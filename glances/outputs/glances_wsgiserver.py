@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Glances.
+#
+# SPDX-FileCopyrightText: 2022 Nicolas Hennion <nicolas@nicolargo.com>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+#
+
+"""Threaded WSGI server (Python standard library only) for the Web server mode."""
+
+import itertools
+import queue
+import select
+import socket
+import threading
+from time import monotonic
+from wsgiref.simple_server import ServerHandler, WSGIRequestHandler, WSGIServer
+
+from glances.logger import logger
+
+
+class GlancesServerHandler(ServerHandler):
+    """WSGI handler closing the connection if the response length is unknown.
+
+    The Server-Sent Events streams are served outside the workers pool
+    (see GlancesWSGIServer.detach_worker).
+    """
+
+    def cleanup_headers(self):
+        """Set the Connection header of the response."""
+        super(GlancesServerHandler, self).cleanup_headers()
+        if 'Content-Length' not in self.headers:
+            # No chunked encoding: the end of the response is the end of the connection
+            self.request_handler.close_connection = True
+        if self.request_handler.close_connection:
+            self.headers['Connection'] = 'close'
+        if self.headers.get('Content-Type', '').startswith('text/event-stream'):
+            # Endless response
+            self.request_handler.server.detach_worker()
+
+
+class GlancesWSGIRequestHandler(WSGIRequestHandler):
+    """WSGI request handler keeping the HTTP/1.1 connections alive.
+
+    The connection is kept alive until the client closes it or until it
+    is idle for more than the server keepalive_timeout. It is closed after
+    the current response if other connections are waiting for a worker.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    # Interval (in seconds) of the waiting connections checks of an idle keep-alive connection
+    idle_check_interval = 0.1
+
+    def setup(self):
+        """Set the idle timeout of the connection."""
+        if self.server.keepalive_timeout > 0:
+            self.timeout = self.server.keepalive_timeout
+        super(GlancesWSGIRequestHandler, self).setup()
+
+    def handle(self):
+        """Handle the HTTP requests of the connection."""
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.wait_next_request():
+            self.handle_one_request()
+
+    def wait_next_request(self):
+        """Wait for the next request of the keep-alive connection.
+
+        Return False if the connection is idle for more than the keepalive
+        timeout or if it is idle while connections wait for a worker.
+        """
+        deadline = monotonic() + self.server.keepalive_timeout
+        while True:
+            # Request already in the read buffer (pipelining)
+            self.connection.settimeout(0)
+            try:
+                if self.rfile.peek(1):
+                    return True
+            except OSError:
+                return True
+            finally:
+                self.connection.settimeout(self.timeout)
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.connection], [], [], min(remaining, self.idle_check_interval))
+            if readable:
+                return True
+            if self.server.waiting():
+                # Release the worker
+                return False
+
+    def handle_one_request(self):
+        """Handle a single HTTP request."""
+        try:
+            self.raw_requestline = self.rfile.readline(65537)
+        except (socket.timeout, ConnectionError):
+            # Idle connection
+            self.close_connection = True
+            return
+        if not self.raw_requestline:
+            # Connection closed by the client
+            self.close_connection = True
+            return
+        if len(self.raw_requestline) > 65536:
+            self.requestline = ''
+            self.request_version = ''
+            self.command = ''
+            self.send_error(414)
+            return
+
+        if not self.parse_request():
+            # An error code has been sent, just exit
+            return
+
+        if (
+            self.server.keepalive_timeout <= 0
+            or self.request_version != 'HTTP/1.1'
+            or self.headers.get('Content-Length', '0') != '0'
+            or 'Transfer-Encoding' in self.headers
+            or self.server.waiting()
+        ):
+            # Keep-alive disabled, HTTP/1.0 client, request body (maybe not read by the application)
+            # or connections waiting for a worker
+            self.close_connection = True
+
+        handler = GlancesServerHandler(
+            self.rfile,
+            self.wfile,
+            self.get_stderr(),
+            self.get_environ(),
+            multithread=True,
+        )
+        # Backpointer for logging and the Connection header
+        handler.request_handler = self
+        handler.http_version = self.request_version.split('/')[-1]
+        handler.run(self.server.get_app())
+
+    def address_string(self):
+        """Return the client address (no reverse DNS lookup)."""
+        return self.client_address[0]
+
+    def log_request(self, *args, **kwargs):
+        """Log the request (only if the server is not quiet)."""
+        if not self.server.quiet:
+            super(GlancesWSGIRequestHandler, self).log_request(*args, **kwargs)
+
+
+class GlancesWSGIServer(WSGIServer):
+    """WSGI server handling the connections with a pool of worker threads.
+
+    Accepted connections wait in a queue until a worker is available. If
+    the number of connections (handled and waiting) reaches max_connections,
+    the new connections get an HTTP/503 response.
+
+    Use the configure class method to set the number of workers and the
+    connections limit (Bottle instantiates the server class).
+
+    A worker serving an endless response (Server-Sent Events stream) is
+    detached from the pool and replaced by a new worker, so the streams
+    never block the other requests (they still count in max_connections).
+    """
+
+    workers = 16
+    max_connections = 100
+    keepalive_timeout = 5
+    quiet = True
+
+    @classmethod
+    def configure(cls, workers=16, max_connections=100, keepalive_timeout=5, quiet=True):
+        """Return a GlancesWSGIServer class with the given settings."""
+        return type(
+            cls.__name__,
+            (cls,),
+            {
+                'workers': max(workers, 1),
+                'max_connections': max(max_connections, 1),
+                'keepalive_timeout': keepalive_timeout,
+                'quiet': quiet,
+            },
+        )
+
+    def server_activate(self):
+        """Listen and start the workers."""
+        super(GlancesWSGIServer, self).server_activate()
+        # Accepted connections waiting for a worker
+        self._connections = queue.Queue()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        # Workers of the pool (the detached ones are removed)
+        self._workers = set()
+        self._workers_lock = threading.Lock()
+        self._worker_state = threading.local()
+        self._worker_ids = itertools.count()
+        for _ in range(self.workers):
+            self._start_worker()
+        logger.debug(
+            "Web server started with {} workers (max {} connections, keep-alive timeout {}s)".format(
+                self.workers, self.max_connections, self.keepalive_timeout
+            )
+        )
+
+    def _start_worker(self):
+        """Start a new worker of the pool."""
+        with self._workers_lock:
+            worker = threading.Thread(target=self._work, name='GlancesWSGIWorker-{}'.format(next(self._worker_ids)))
+            worker.daemon = True
+            self._workers.add(worker)
+        worker.start()
+
+    def detach_worker(self):
+        """Detach the current worker from the pool (endless response) and start a new one.
+
+        The detached worker thread ends with its connection.
+        """
+        if getattr(self._worker_state, 'detached', True):
+            # Not a worker of the pool (or already detached)
+            return
+        self._worker_state.detached = True
+        with self._workers_lock:
+            self._workers.discard(threading.current_thread())
+        self._start_worker()
+        logger.debug("Web server worker detached for an endless response")
+
+    def waiting(self):
+        """Return True if connections are waiting for a worker."""
+        return not self._connections.empty()
+
+    def process_request(self, request, client_address):
+        """Queue the connection (or reject it if the connections limit is reached)."""
+        if not self._slots.acquire(blocking=False):
+            logger.debug("Web server connections limit ({}) reached".format(self.max_connections))
+            try:
+                request.sendall(
+                    b'HTTP/1.1 503 Service Unavailable\r\n'
+                    b'Content-Length: 0\r\nConnection: close\r\nRetry-After: 1\r\n\r\n'
+                )
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self._connections.put((request, client_address))
+
+    def _work(self):
+        """Handle the queued connections (worker thread)."""
+        self._worker_state.detached = False
+        while not self._worker_state.detached:
+            connection = self._connections.get()
+            if connection is None:
+                # Server closed
+                return
+            request, client_address = connection
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                self._slots.release()
+
+    def handle_error(self, request, client_address):
+        """Log the error (a client closing its connection is not an error)."""
+        logger.debug("Web server error with client {}".format(client_address[0]), exc_info=True)
+
+    def server_close(self):
+        """Close the server and stop the workers."""
+        super(GlancesWSGIServer, self).server_close()
+        with self._workers_lock:
+            workers = len(self._workers)
+        for _ in range(workers):
+            self._connections.put(None)
@@ -12,7 +12,7 @@
         'refresh-time': '{{ refresh_time }}'
       }
     </script>
-    <script src="glances.js" defer></script>
+    <script src="glances.js?v={{ glances_js_version }}" defer></script>
 
 </head>
 
@@ -11,10 +11,14 @@
 
 import getpass
 import hashlib
+import hmac
 import os
 import sys
+import threading
 import uuid
+from collections import OrderedDict
 from io import open
+from time import monotonic
 
 from glances.globals import b, safe_makedirs
 from glances.config import user_config_dir
@@ -121,3 +125,51 @@ class GlancesPassword(object):
             hashed_password = file_pwd.read()
 
         return hashed_password
+
+
+class GlancesAuthCache(object):
+
+    """This class caches the successfully checked credentials of the servers.
+
+    The password check (PBKDF2) is done once per ttl seconds for each user:
+    the cache keeps a digest (HMAC-SHA256 keyed by a random secret of the
+    process) of the last valid credentials of each user, compared in
+    constant time. The failed checks are not cached.
+    """
+
+    def __init__(self, config=None, size=64):
+        # Time to live of the cached credentials (in seconds), 0 to disable the cache
+        self.ttl = 300
+        if config is not None:
+            self.ttl = config.get_float_value('passwords', 'auth_cache_ttl', default=300)
+        self.size = size
+        self._secret = os.urandom(32)
+        # key: username, value: (digest, expiration time)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, username, password):
+        return hmac.new(self._secret, (username + '\0' + password).encode(), hashlib.sha256).digest()
+
+    def check(self, username, password, verify):
+        """Return True if the username/password credentials are valid.
+
+        verify(username, password) checks the credentials if they are not
+        in the cache (or expired).
+        """
+        if self.ttl <= 0:
+            return verify(username, password)
+        digest = self._digest(username, password)
+        now = monotonic()
+        with self._lock:
+            cached = self._cache.get(username)
+        if cached is not None and cached[1] > now and hmac.compare_digest(cached[0], digest):
+            return True
+        if not verify(username, password):
+            return False
+        with self._lock:
+            self._cache[username] = (digest, now + self.ttl)
+            self._cache.move_to_end(username)
+            while len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+        return True
@@ -26,6 +26,9 @@ class PluginModel(GlancesPluginModel):
         # We want to display the stat in the curse interface
         self.display_curse = True
 
+        # AMPs use the processes list grabbed by the processcount plugin
+        self.depends_on = 'processcount'
+
         # Init the list of AMP (classes define in the glances/amps_list.py script)
         self.glances_amps = glancesAmpsList(self.args, self.config)
 
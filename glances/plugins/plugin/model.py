@@ -13,16 +13,20 @@ I am your father...
 ...of all Glances model plugins.
 """
 
+import os
 import re
 import copy
+import threading
+from time import perf_counter
 
 from glances.globals import iterkeys, itervalues, listkeys, mean, nativestr, json_dumps, json_dumps_dictlist
+from glances.globals import dictlist_index, json_dumps_dictlist_value
 from glances.actions import GlancesActions
 from glances.history import GlancesHistory
 from glances.logger import logger
 from glances.events import glances_events
 from glances.thresholds import glances_thresholds
-from glances.timer import Counter, Timer
+from glances.timer import Counter, GlancesTimings, Timer, plugins_timings
 from glances.outputs.glances_unicode import unicode_message
 
 
@@ -108,6 +112,18 @@ class GlancesPluginModel(object):
 
         # Set the initial refresh time to display stats the first time
         self.refresh_timer = Timer(0)
+        # If True, the refresh rate is managed by the stats scheduler (see glances/scheduler.py)
+        # and the refresh_timer is not checked by the update method
+        self.refresh_scheduled = False
+
+        # Name of the plugin which should be updated before this one
+        # (only used by the parallel update, see GlancesStats.update_parallel)
+        self.depends_on = None
+
+        # Durations of the update, update_stats_history and update_views methods
+        # (set by the update decorator and by the stats manager)
+        self.timings = GlancesTimings()
+        plugins_timings[self.plugin_name] = self.timings
 
         # Init stats description
         self.fields_description = fields_description
@@ -117,6 +133,47 @@ class GlancesPluginModel(object):
         self.stats = None
         self.reset()
 
+        # Indexes of the list stats (see get_stats_index), reset by each stats update
+        self._stats_index = {}
+        self._stats_index_of = None
+
+    # Thread running a deferred update (see update_deferred)
+    _update_thread = None
+
+    @property
+    def stats(self):
+        """Return the stats (the not committed ones in the thread running a deferred update)."""
+        if self._update_thread is not None and self._update_thread == threading.get_ident():
+            return self._update_stats
+        return self._stats
+
+    @stats.setter
+    def stats(self, value):
+        if self._update_thread is not None and self._update_thread == threading.get_ident():
+            self._update_stats = value
+        else:
+            self._stats = value
+
+    def update_deferred(self):
+        """Update the stats without publishing them and return the new stats.
+
+        Used by the parallel update: the other threads keep the current stats
+        until the new ones are committed (see commit_update).
+        """
+        self._update_stats = self._stats
+        self._update_thread = threading.get_ident()
+        try:
+            self.update()
+            return self.stats
+        finally:
+            self._update_thread = None
+            self._update_stats = None
+
+    def commit_update(self, stats):
+        """Publish the stats returned by update_deferred."""
+        self._stats = stats
+        self._stats_index_of = None
+
     def __repr__(self):
         """Return the raw stats."""
         return self.stats
@@ -139,6 +196,7 @@ class GlancesPluginModel(object):
     def exit(self):
         """Just log an event when Glances exit."""
         logger.debug("Stop the {} plugin".format(self.plugin_name))
+        self.stats_history.close()
 
     def get_key(self):
         """Return the key of the list."""
@@ -194,6 +252,8 @@ class GlancesPluginModel(object):
                             l_export[i['name']],
                             description=i['description'],
                             history_max_size=self._limits['history_size'],
+                            history_rollups=self._limits['history_rollups'],
+                            history_path=self.history_path(),
                         )
                 else:
                     # Stats is not a list
@@ -203,37 +263,43 @@ class GlancesPluginModel(object):
                         self.get_export()[i['name']],
                         description=i['description'],
                         history_max_size=self._limits['history_size'],
+                        history_rollups=self._limits['history_rollups'],
+                        history_path=self.history_path(),
                     )
 
+    def history_path(self):
+        """Return the folder of the plugin history files (None if the history is not persistent)."""
+        if not self._limits['history_path']:
+            return None
+        return os.path.join(self._limits['history_path'], self.plugin_name)
+
     def get_items_history_list(self):
         """Return the items history list."""
         return self.items_history_list
 
-    def get_raw_history(self, item=None, nb=0):
+    def get_raw_history(self, item=None, nb=0, resolution=0):
         """Return the history (RAW format).
 
         - the stats history (dict of list) if item is None
         - the stats history for the given item (list) instead
         - None if item did not exist in the history
+        Read from the rollup tiers if resolution (in seconds) is given
         """
-        s = self.stats_history.get(nb=nb)
         if item is None:
-            return s
+            return self.stats_history.get(nb=nb, resolution=resolution)
         else:
-            if item in s:
-                return s[item]
-            else:
-                return None
+            return self.stats_history.get_item(item, nb=nb, resolution=resolution)
 
-    def get_json_history(self, item=None, nb=0):
+    def get_json_history(self, item=None, nb=0, resolution=0):
         """Return the history (JSON format).
 
         - the stats history (dict of list) if item is None
         - the stats history for the given item (list) instead
         - None if item did not exist in the history
         Limit to lasts nb items (all if nb=0)
+        Read from the rollup tiers if resolution (in seconds) is given
         """
-        s = self.stats_history.get_json(nb=nb)
+        s = self.stats_history.get_json(nb=nb, resolution=resolution)
         if item is None:
             return s
         else:
@@ -242,19 +308,34 @@ class GlancesPluginModel(object):
             else:
                 return None
 
-    def get_export_history(self, item=None):
+    def get_export_history(self, item=None, resolution=0):
         """Return the stats history object to export."""
-        return self.get_raw_history(item=item)
+        return self.get_raw_history(item=item, resolution=resolution)
 
-    def get_stats_history(self, item=None, nb=0):
+    def get_stats_history(self, item=None, nb=0, resolution=0):
         """Return the stats history (JSON format)."""
-        s = self.get_json_history(nb=nb)
+        s = self.get_json_history(nb=nb, resolution=resolution)
 
         if item is None:
             return json_dumps(s)
 
         return json_dumps_dictlist(s, item)
 
+    def get_history_stats(self, item, window=0, agg=('mean',)):
+        """Return statistics (dict) on the item history of the last window seconds.
+
+        - None if item did not exist in the history
+        See GlancesAttribute.history_stats for the available aggregations
+        """
+        return self.stats_history.get_item_stats(item, window=window, agg=agg)
+
+    def get_stats_history_stats(self, item, window=0, agg=('mean',)):
+        """Return statistics on the item history (JSON format)."""
+        s = self.get_history_stats(item, window=window, agg=agg)
+        if s is None:
+            return None
+        return json_dumps({item: s})
+
     def get_trend(self, item, nb=6):
         """Get the trend regarding to the last nb values.
 
@@ -399,21 +480,35 @@ class GlancesPluginModel(object):
         """
         return json_dumps_dictlist(self.stats, item)
 
+    def get_stats_index(self, item=None):
+        """Return the index of the stats on item (default is the key of the list): {value: [stat, ...]}.
+
+        Stats should be a list of dict (processlist, network...), else return None.
+        The index of an item is built on the first call after a stats update.
+        Raise KeyError if item is not in the stats.
+        """
+        if not isinstance(self.stats, list):
+            return None
+        if item is None:
+            item = self.get_key()
+        if self._stats_index_of is not self.stats:
+            # Stats updated (or set)
+            self._stats_index = {}
+            self._stats_index_of = self.stats
+        if item not in self._stats_index:
+            self._stats_index[item] = dictlist_index(self.stats, item)
+        return self._stats_index[item]
+
     def get_stats_value(self, item, value):
         """Return the stats object for a specific item=value in JSON format.
 
         Stats should be a list of dict (processlist, network...)
         """
-        if not isinstance(self.stats, list):
+        try:
+            return json_dumps_dictlist_value(self.stats, item, value, index=self.get_stats_index(item))
+        except (KeyError, ValueError) as e:
+            logger.error("Cannot get item({})=value({}) ({})".format(item, value, e))
             return None
-        else:
-            if not isinstance(value, int) and value.isdigit():
-                value = int(value)
-            try:
-                return json_dumps({value: [i for i in self.stats if i[item] == value]})
-            except (KeyError, ValueError) as e:
-                logger.error("Cannot get item({})=value({}) ({})".format(item, value, e))
-                return None
 
     def update_views_hidden(self):
         """Update the hidden views
@@ -543,6 +638,10 @@ class GlancesPluginModel(object):
         """Load limits from the configuration file, if it exists."""
         # By default set the history length to 3 points per second during one day
         self._limits['history_size'] = 28800
+        # By default, no history rollup
+        self._limits['history_rollups'] = []
+        # By default, the history is not persistent
+        self._limits['history_path'] = ''
 
         if not hasattr(config, 'has_section'):
             return False
@@ -552,6 +651,12 @@ class GlancesPluginModel(object):
         if config.has_section('global'):
             self._limits['history_size'] = config.get_float_value('global', 'history_size', default=28800)
             logger.debug("Load configuration key: {} = {}".format('history_size', self._limits['history_size']))
+            self._limits['history_rollups'] = self.load_history_rollups(
+                config.get_value('global', 'history_rollups', default='')
+            )
+            logger.debug("Load configuration key: {} = {}".format('history_rollups', self._limits['history_rollups']))
+            self._limits['history_path'] = os.path.expanduser(config.get_value('global', 'history_path', default=''))
+            logger.debug("Load configuration key: {} = {}".format('history_path', self._limits['history_path']))
 
         # Read the plugin specific section
         if config.has_section(self.plugin_name):
@@ -566,6 +671,27 @@ class GlancesPluginModel(object):
 
         return True
 
+    def load_history_rollups(self, value):
+        """Return the history rollup tiers from a configuration value.
+
+        The value is a comma separated list of <resolution>:<size> (resolution in seconds).
+        The invalid tiers (not positive resolution or size) are ignored.
+        Example: 60:1440,900:2880 (1 minute during 1 day and 15 minutes during 30 days)
+        """
+        ret = []
+        for tier in value.split(','):
+            if not tier.strip():
+                continue
+            try:
+                resolution, size = tier.split(':')
+                resolution, size = float(resolution), int(size)
+                if not 0 < resolution < float('inf') or size <= 0:
+                    raise ValueError
+                ret.append([resolution, size])
+            except ValueError:
+                logger.error("Invalid history rollup {} (should be <resolution>:<size>, both positive)".format(tier))
+        return ret
+
     @property
     def limits(self):
         """Return the limits object."""
@@ -722,10 +848,13 @@ class GlancesPluginModel(object):
                 # If the stats are stored in a list of dict (fs plugin for example)
                 # Return the dict for the current header
                 mustache_dict = {}
-                for item in self.get_stats_action():
-                    if item[self.get_key()] == action_key:
-                        mustache_dict = item
-                        break
+                if self.get_stats_action() is self.stats:
+                    mustache_dict = self.get_stats_index().get(action_key, [{}])[0]
+                else:
+                    for item in self.get_stats_action():
+                        if item[self.get_key()] == action_key:
+                            mustache_dict = item
+                            break
             else:
                 # Use the stats dict
                 mustache_dict = self.get_stats_action()
@@ -1104,13 +1233,21 @@ class GlancesPluginModel(object):
 
         It checks:
         - if the plugin is enabled.
-        - if the refresh_timer is finished
+        - if the refresh_timer is finished (except if the refresh is scheduled by the stats manager)
+
+        The runs skipped by the scheduler are counted by the stats manager.
         """
 
         def wrapper(self, *args, **kw):
-            if self.is_enabled() and (self.refresh_timer.finished() or self.stats == self.get_init_value):
+            if self.is_enabled() and (
+                self.refresh_scheduled or self.refresh_timer.finished() or self.stats == self.get_init_value
+            ):
                 # Run the method
+                start = perf_counter()
                 ret = fct(self, *args, **kw)
+                self.timings.add('update', perf_counter() - start)
+                # The stats may have been updated in place, rebuild the indexes
+                self._stats_index_of = None
                 # Reset the timer
                 self.refresh_timer.set(self.get_refresh())
                 self.refresh_timer.reset()
@@ -1118,6 +1255,8 @@ class GlancesPluginModel(object):
                 # No need to call the method
                 # Return the last result available
                 ret = self.stats
+                if self.is_enabled():
+                    self.timings.skip('update')
             return ret
 
         return wrapper
@@ -35,6 +35,8 @@ class PluginModel(GlancesPluginModel):
         self.display_curse = True
 
         # Note: 'glances_processes' is already init in the glances_processes.py script
+        # Load its configuration before the first processes scan (done by this plugin)
+        glances_processes.load_config(config, args)
 
     def enable_extended(self):
         """Enable extended stats."""
@@ -99,6 +99,9 @@ class PluginModel(GlancesPluginModel):
         # We want to display the stat in the curse interface
         self.display_curse = True
 
+        # The processes list is grabbed by the processcount plugin
+        self.depends_on = 'processcount'
+
         # Trying to display proc time
         self.tag_proc_time = True
 
@@ -115,21 +118,9 @@ class PluginModel(GlancesPluginModel):
         # Use to optimize space (see https://github.com/nicolargo/glances/issues/959)
         self.pid_max = glances_processes.pid_max
 
-        # Set the default sort key if it is defined in the configuration file
-        if config is not None:
-            if 'processlist' in config.as_dict() and 'sort_key' in config.as_dict()['processlist']:
-                logger.debug(
-                    'Configuration overwrites processes sort key by {}'.format(
-                        config.as_dict()['processlist']['sort_key']
-                    )
-                )
-                glances_processes.set_sort_key(config.as_dict()['processlist']['sort_key'], False)
-
-        # The default sort key could also be overwrite by command line (see #1903)
-        if args.sort_processes_key is not None:
-            glances_processes.set_sort_key(args.sort_processes_key, False)
-
         # Note: 'glances_processes' is already init in the processes.py script
+        # and its configuration (sort key, backend and columnar table) is loaded
+        # by the processcount plugin, before the first processes scan
 
     def get_key(self):
         """Return the key of the list."""
@@ -821,8 +812,16 @@ class PluginModel(GlancesPluginModel):
         return ret
 
     def __sort_stats(self, sorted_by=None):
-        """Return the stats (dict) sorted by (sorted_by)."""
-        return sort_stats(self.stats, sorted_by, reverse=glances_processes.sort_reverse)
+        """Return the stats (dict) sorted by (sorted_by).
+
+        Only the showed processes are sorted if the others are not displayed (see is_two_phase_update).
+        """
+        return sort_stats(
+            self.stats,
+            sorted_by,
+            reverse=glances_processes.sort_reverse,
+            limit=glances_processes.max_processes if glances_processes.is_two_phase_update() else None,
+        )
 
     def __max_pid_size(self):
         """Return the maximum PID size in number of char."""
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Glances.
+#
+# SPDX-FileCopyrightText: 2022 Nicolas Hennion <nicolas@nicolargo.com>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+#
+
+"""Timings plugin."""
+
+from glances.plugins.plugin.model import GlancesPluginModel
+from glances.timer import plugins_timings
+
+# Measured operations of the plugins
+operations = {
+    'update': 'stats update',
+    'update_stats_history': 'history update',
+    'update_views': 'views update',
+}
+
+# Fields description
+fields_description = {
+    'plugin': {'description': 'Plugin name.', 'unit': 'string'},
+}
+for operation, description in operations.items():
+    fields_description.update(
+        {
+            operation + '_last': {'description': 'Last {} duration.'.format(description), 'unit': 'second'},
+            operation + '_mean': {'description': 'Mean {} duration.'.format(description), 'unit': 'second'},
+            operation
+            + '_p95': {
+                'description': '95th percentile of the last {} durations.'.format(description),
+                'unit': 'second',
+            },
+            operation + '_count': {'description': 'Number of {}.'.format(description), 'unit': 'number'},
+            operation
+            + '_skipped': {
+                'description': 'Number of {} skipped (refresh time not reached).'.format(description),
+                'unit': 'number',
+            },
+        }
+    )
+
+
+class PluginModel(GlancesPluginModel):
+    """Glances timings plugin.
+
+    Durations of the update, update_stats_history and update_views methods
+    of the plugins (Glances own cost).
+
+    stats is a list of dict (one dict per plugin)
+    """
+
+    def __init__(self, args=None, config=None):
+        """Init the plugin."""
+        super(PluginModel, self).__init__(
+            args=args, config=config, stats_init_value=[], fields_description=fields_description
+        )
+
+        # We do not want to display the stat in the curse interface
+        self.display_curse = False
+
+    def get_key(self):
+        """Return the key of the list."""
+        return 'plugin'
+
+    @GlancesPluginModel._check_decorator
+    @GlancesPluginModel._log_result_decorator
+    def update(self):
+        """Update the timings stats."""
+        # Init new stats
+        stats = self.get_init_value()
+
+        if self.input_method == 'local':
+            for plugin in sorted(plugins_timings):
+                timings = plugins_timings[plugin].get()
+                if not timings:
+                    # Never updated
+                    continue
+                stat = {'plugin': plugin, 'key': self.get_key()}
+                for operation in operations:
+                    for field, value in timings.get(operation, {}).items():
+                        stat['{}_{}'.format(operation, field)] = value
+                stats.append(stat)
+        else:
+            # Timings are only available in local
+            pass
+
+        # Update the stats
+        self.stats = stats
+
+        return self.stats
+
+    def msg_curse(self, args=None, max_width=None):
+        """Return the dict to display in the curse interface."""
+        # Nothing to display (only available through the API and the exports)
+        return []
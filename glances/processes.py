@@ -7,7 +7,10 @@
 # SPDX-License-Identifier: LGPL-3.0-only
 #
 
+import heapq
 import os
+import sys
+from collections import Counter
 
 from glances.globals import BSD, LINUX, MACOS, WINDOWS, iterkeys
 from glances.timer import Timer, getTimeSinceLastUpdate
@@ -20,6 +23,10 @@ import psutil
 # This constant defines the list of available processes sort key
 sort_processes_key_list = ['cpu_percent', 'memory_percent', 'username', 'cpu_times', 'io_counters', 'name']
 
+# Sort keys with their final values before the processes post-processing (IO rates, cached values)
+# The showed processes can only be selected before it with these keys (see is_two_phase_update)
+two_phase_sort_keys = ['cpu_percent', 'memory_percent', 'cpu_times', 'name']
+
 # Sort dictionary for human
 sort_for_human = {
     'io_counters': 'disk IO',
@@ -32,6 +39,63 @@ sort_for_human = {
 }
 
 
+class GlancesProcessesCache(object):
+    """Cache of per process values, the key is (pid, create_time).
+
+    The create_time is in the key so a reused pid never gets the values
+    of the previous process. The entries of the processes not seen
+    (get or set) during the current scan are evicted by end_scan.
+    """
+
+    def __init__(self):
+        # key = (pid, create_time), value = [generation, cached value]
+        self._entries = {}
+        # Current scan generation
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Return the cached value of the process (and mark it as seen during the current scan)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        entry[0] = self._generation
+        return entry[1]
+
+    def set(self, key, value):
+        """Set the cached value of the process."""
+        self._entries[key] = [self._generation, value]
+
+    def end_scan(self):
+        """Evict the processes not seen during the current scan and start a new one.
+
+        Return the number of evicted processes.
+        """
+        evicted = [k for k, v in self._entries.items() if v[0] != self._generation]
+        for k in evicted:
+            del self._entries[k]
+        self._generation += 1
+        return len(evicted)
+
+    def clear(self):
+        """Remove all the entries."""
+        self._entries.clear()
+
+    def memory_size(self):
+        """Return the approximate memory size (in bytes) of the cache."""
+        size = sys.getsizeof(self._entries)
+        for key, entry in self._entries.items():
+            size += sys.getsizeof(key) + sys.getsizeof(entry) + sys.getsizeof(entry[1])
+            if isinstance(entry[1], dict):
+                size += sum(sys.getsizeof(v) for v in entry[1].values())
+        return size
+
+
 class GlancesProcesses(object):
     """Get processed stats using the psutil library."""
 
@@ -51,22 +115,24 @@ class GlancesProcesses(object):
         # First iteration, no cache
         self.cache_timer = Timer(0)
 
-        # Init the io_old dict used to compute the IO bitrate
-        # key = pid
+        # Init the io_old cache used to compute the IO bitrate
+        # key = (pid, create_time)
         # value = [ read_bytes_old, write_bytes_old ]
-        self.io_old = {}
+        self.io_old = GlancesProcessesCache()
 
         # Init stats
         self.auto_sort = None
         self._sort_key = None
+        # Display only attributes of the last two phases update (None if not a two phases one)
+        self._showed_attrs = None
         # Default processes sort key is 'auto'
         # Can be overwrite from the configuration file (issue#1536) => See glances_processlist.py init
         self.set_sort_key('auto', auto=True)
         self.processlist = []
         self.reset_processcount()
 
-        # Cache is a dict with key=pid and value = dict of cached value
-        self.processlist_cache = {}
+        # Cache with key=(pid, create_time) and value = dict of cached value
+        self.processlist_cache = GlancesProcessesCache()
 
         # Tag to enable/disable the processes stats (to reduce the Glances CPU consumption)
         # Default is to enable the processes stats
@@ -101,12 +167,26 @@ class GlancesProcesses(object):
         # Maximum number of processes showed in the UI (None if no limit)
         self._max_processes = None
 
+        # If False and if the number of processes showed in the UI is limited,
+        # the display only attributes are only grabbed for the showed processes
+        # (see is_two_phase_update). Set it to True to grab all the attributes
+        # of all the processes (API).
+        self.full_stats = False
+
         # Process filter is a regular expression
         self._filter = GlancesFilter()
 
         # Whether or not to hide kernel threads
         self.no_kernel_threads = False
 
+        # Processes collector backend (see set_backend)
+        # None is psutil.process_iter, else the /proc scanner (Linux only)
+        self.scanner = None
+
+        # Columnar view of the processes list built by each update (see set_columnar)
+        self.columnar = False
+        self.processtable = None
+
         # Store maximums values in a dict
         # Used in the UI to highlight the maximum value
         self._max_values_list = ('cpu_percent', 'memory_percent')
@@ -118,6 +198,62 @@ class GlancesProcesses(object):
         """Set args."""
         self.args = args
 
+    def load_config(self, config, args=None):
+        """Load the processes configuration (processlist section) and the sort key command line option.
+
+        Should be called before the first update.
+        """
+        if config is not None:
+            # Set the default sort key if it is defined in the configuration file
+            if 'processlist' in config.as_dict() and 'sort_key' in config.as_dict()['processlist']:
+                logger.debug(
+                    'Configuration overwrites processes sort key by {}'.format(
+                        config.as_dict()['processlist']['sort_key']
+                    )
+                )
+                self.set_sort_key(config.as_dict()['processlist']['sort_key'], False)
+            # Set the processes collector backend (psutil or proc) and the columnar table
+            self.set_backend(config.get_value('processlist', 'backend', default='psutil'))
+            self.set_columnar(config.get_bool_value('processlist', 'columnar', default=False))
+
+        # The default sort key could also be overwrite by command line (see #1903)
+        if args is not None and args.sort_processes_key is not None:
+            self.set_sort_key(args.sort_processes_key, False)
+
+    def set_backend(self, backend):
+        """Set the processes collector backend.
+
+        - psutil: psutil.process_iter (default, all the operating systems)
+        - proc: GlancesProcScanner, direct reads of the /proc files (Linux only)
+        """
+        if backend == 'proc':
+            if not LINUX or not os.path.isdir('/proc'):
+                logger.warning('The proc processes backend is only available on Linux, use psutil')
+                self.scanner = None
+                return
+            from glances.procscan import GlancesProcScanner
+
+            self.scanner = GlancesProcScanner()
+        elif backend == 'psutil':
+            self.scanner = None
+        else:
+            logger.warning('Unknown processes backend {} (should be psutil or proc), use psutil'.format(backend))
+            self.scanner = None
+            return
+        logger.debug('Processes backend: {}'.format(backend))
+
+    def set_columnar(self, enable):
+        """Enable or disable the columnar (NumPy arrays) processes table."""
+        if enable:
+            from glances.proctable import numpy_tag
+
+            if not numpy_tag:
+                logger.warning('Missing Python Lib (numpy), the columnar processes table is disabled')
+                enable = False
+        self.columnar = enable
+        self.processtable = None
+        logger.debug('Columnar processes table: {}'.format(enable))
+
     def reset_processcount(self):
         """Reset the global process count"""
         self.processcount = {'total': 0, 'running': 0, 'sleeping': 0, 'thread': 0, 'pid_max': None}
@@ -126,12 +262,19 @@ class GlancesProcesses(object):
         """Update the global process count from the current processes list"""
         # Update the maximum process ID (pid) number
         self.processcount['pid_max'] = self.pid_max
+        if self.processtable is not None and len(self.processtable) == len(plist):
+            # Columnar view of the processes list (see update)
+            status_count = self.processtable.status_count()
+            threads = self.processtable.threads()
+        else:
+            status_count = Counter(p['status'] for p in plist)
+            threads = sum(i['num_threads'] for i in plist if i['num_threads'] is not None)
         # For each key in the processcount dict
         # count the number of processes with the same status
         for k in iterkeys(self.processcount):
-            self.processcount[k] = len(list(filter(lambda v: v['status'] is k, plist)))
+            self.processcount[k] = status_count.get(k, 0)
         # Compute thread
-        self.processcount['thread'] = sum(i['num_threads'] for i in plist if i['num_threads'] is not None)
+        self.processcount['thread'] = threads
         # Compute total
         self.processcount['total'] = len(plist)
 
@@ -338,6 +481,33 @@ class GlancesProcesses(object):
             ret['extended_stats'] = True
         return ret
 
+    def is_two_phase_update(self):
+        """Return True if the display only attributes are only grabbed for the showed processes.
+
+        All the attributes are grabbed for all the processes if the full stats
+        are asked, if the number of showed processes is not limited, if a
+        filter is set (sum of the filtered processes), in programs mode, if
+        the stats are exported or if the sort key values are only known after
+        the processes post-processing (IO rates, cached user name).
+        """
+        return (
+            not self.full_stats
+            and self._max_processes is not None
+            and self.sort_key in two_phase_sort_keys
+            and self.process_filter is None
+            and not getattr(self.args, 'programs', False)
+            and not getattr(self.args, 'export', None)
+        )
+
+    def get_process_attrs(self, pid, attrs):
+        """Return the attributes (dict) of the process (None values if the process is terminated)."""
+        try:
+            if self.scanner is not None:
+                return self.scanner.process_info(pid, set(attrs), {})
+            return psutil.Process(pid=pid).as_dict(attrs=attrs, ad_value=None)
+        except (psutil.NoSuchProcess, FileNotFoundError, ProcessLookupError):
+            return dict.fromkeys(attrs)
+
     def is_selected_extended_process(self, position):
         """Return True if the process is the selected one for extended stats."""
         return (
@@ -355,6 +525,7 @@ class GlancesProcesses(object):
         """Update the processes stats."""
         # Reset the stats
         self.processlist = []
+        self.processtable = None
         self.reset_processcount()
 
         # Do not process if disable tag is set
@@ -366,7 +537,8 @@ class GlancesProcesses(object):
 
         # Grab standard stats
         #####################
-        sorted_attrs = ['cpu_percent', 'cpu_times', 'memory_percent', 'name', 'status', 'num_threads']
+        # 'create_time' is used (with the pid) as key of the processes caches
+        sorted_attrs = ['cpu_percent', 'cpu_times', 'create_time', 'memory_percent', 'name', 'status', 'num_threads']
         displayed_attr = ['memory_info', 'nice', 'pid']
         # 'name' can not be cached because it is used for filtering
         cached_attrs = ['cmdline', 'username']
@@ -377,9 +549,17 @@ class GlancesProcesses(object):
         if not self.disable_gids:
             displayed_attr.append('gids')
         # Some stats are not sort key
-        # An optimisation can be done be only grabbed displayed_attr
-        # for displayed processes (but only in standalone mode...)
-        sorted_attrs.extend(displayed_attr)
+        # If the number of showed processes is limited, the displayed_attr are
+        # only grabbed for the showed processes (second phase, after the sort)
+        two_phase = self.is_two_phase_update()
+        if two_phase:
+            # The pid is the key and the gids are used by the kernel threads filter
+            sorted_attrs.append('pid')
+            if self.no_kernel_threads and 'gids' in displayed_attr:
+                sorted_attrs.append('gids')
+            displayed_attr = [a for a in displayed_attr if a not in sorted_attrs]
+        else:
+            sorted_attrs.extend(displayed_attr)
         # Some stats are cached (not necessary to be refreshed every time)
         if self.cache_timer.finished():
             sorted_attrs += cached_attrs
@@ -391,24 +571,49 @@ class GlancesProcesses(object):
 
         # Build the processes stats list (it is why we need psutil>=5.3.0)
         # This is one of the main bottleneck of Glances (see flame graph)
+        if self.scanner is not None:
+            processes = self.scanner.process_iter(attrs=sorted_attrs)
+        else:
+            # Only get the info key
+            processes = (p.info for p in psutil.process_iter(attrs=sorted_attrs, ad_value=None))
         # Filter processes
         self.processlist = list(
             filter(
-                lambda p: not (BSD and p.info['name'] == 'idle')
-                and not (WINDOWS and p.info['name'] == 'System Idle Process')
-                and not (MACOS and p.info['name'] == 'kernel_task')
-                and not (self.no_kernel_threads and LINUX and p.info['gids'].real == 0),
-                psutil.process_iter(attrs=sorted_attrs, ad_value=None),
+                lambda p: not (BSD and p['name'] == 'idle')
+                and not (WINDOWS and p['name'] == 'System Idle Process')
+                and not (MACOS and p['name'] == 'kernel_task')
+                and not (self.no_kernel_threads and LINUX and p['gids'].real == 0),
+                processes,
             )
         )
-        # Only get the info key
-        self.processlist = [p.info for p in self.processlist]
+        # Columnar view of the processes list (see set_columnar)
+        if self.columnar:
+            from glances.proctable import GlancesProcessTable
+
+            self.processtable = GlancesProcessTable(self.processlist)
+
         # Sort the processes list by the current sort_key
-        self.processlist = sort_stats(self.processlist, sorted_by=self.sort_key, reverse=True)
+        if self.processtable is not None and self.sort_key in self.processtable.float_columns:
+            # Vectorized sort (descending order, as the UI one for these keys)
+            self.processlist = self.processtable.sort(self.sort_key, limit=self._max_processes if two_phase else None)
+        elif two_phase:
+            # Only the showed processes are sorted (in the UI order)
+            self.processlist = sort_stats(
+                self.processlist, sorted_by=self.sort_key, reverse=self.sort_reverse, limit=self._max_processes
+            )
+        else:
+            self.processlist = sort_stats(self.processlist, sorted_by=self.sort_key, reverse=True)
 
         # Update the processcount
         self.update_processcount(self.processlist)
 
+        # Second phase: grab the displayed_attr of the showed processes
+        if two_phase:
+            self._update_showed_processes(displayed_attr)
+            self._showed_attrs = displayed_attr
+        else:
+            self._showed_attrs = None
+
         # Loop over processes and :
         # - add extended stats for selected process
         # - add metadata
@@ -442,18 +647,21 @@ class GlancesProcesses(object):
             # [read_bytes, write_bytes, read_bytes_old, write_bytes_old, io_tag]
             # If io_tag = 0 > Access denied or first time (display "?")
             # If io_tag = 1 > No access denied (display the IO rate)
+            # The create_time is in the caches key (the pid could be reused by a new process)
+            cache_key = (proc['pid'], proc['create_time'])
             if 'io_counters' in proc and proc['io_counters'] is not None:
                 io_new = [proc['io_counters'].read_bytes, proc['io_counters'].write_bytes]
                 # For IO rate computation
                 # Append saved IO r/w bytes
-                try:
-                    proc['io_counters'] = io_new + self.io_old[proc['pid']]
+                io_old = self.io_old.get(cache_key)
+                if io_old is not None:
+                    proc['io_counters'] = io_new + io_old
                     io_tag = 1
-                except KeyError:
+                else:
                     proc['io_counters'] = io_new + [0, 0]
                     io_tag = 0
                 # then save the IO r/w bytes
-                self.io_old[proc['pid']] = io_new
+                self.io_old.set(cache_key, io_new)
             else:
                 proc['io_counters'] = [0, 0] + [0, 0]
                 io_tag = 0
@@ -463,21 +671,19 @@ class GlancesProcesses(object):
             # Manage cached information
             if is_cached:
                 # Grab cached values (in case of a new incoming process)
-                if proc['pid'] not in self.processlist_cache:
-                    try:
-                        self.processlist_cache[proc['pid']] = psutil.Process(pid=proc['pid']).as_dict(
-                            attrs=cached_attrs, ad_value=None
-                        )
-                    except psutil.NoSuchProcess:
-                        pass
+                cached = self.processlist_cache.get(cache_key)
+                if cached is None:
+                    cached = self.get_process_attrs(proc['pid'], cached_attrs)
+                    self.processlist_cache.set(cache_key, cached)
                 # Add cached value to current stat
-                try:
-                    proc.update(self.processlist_cache[proc['pid']])
-                except KeyError:
-                    pass
+                proc.update(cached)
             else:
                 # Save values to cache
-                self.processlist_cache[proc['pid']] = {cached: proc[cached] for cached in cached_attrs}
+                self.processlist_cache.set(cache_key, {cached: proc[cached] for cached in cached_attrs})
+
+        # Evict the terminated processes from the caches
+        self.io_old.end_scan()
+        self.processlist_cache.end_scan()
 
         # Apply user filter
         self.processlist = list(filter(lambda p: not self._filter.is_filtered(p), self.processlist))
@@ -485,10 +691,24 @@ class GlancesProcesses(object):
         # Compute the maximum value for keys in self._max_values_list: CPU, MEM
         # Useful to highlight the processes with maximum values
         for k in self._max_values_list:
+            if self.processtable is not None and self.process_filter is None:
+                # No user filter, the columnar view has the same processes
+                max_value = self.processtable.max(k)
+                if max_value is not None:
+                    self.set_max_values(k, max_value)
+                continue
             values_list = [i[k] for i in self.processlist if i[k] is not None]
             if values_list:
                 self.set_max_values(k, max(values_list))
 
+    def _update_showed_processes(self, attrs):
+        """Grab the attributes of the showed processes (and of the extended stats one)."""
+        showed = self.processlist[: self._max_processes]
+        if self.extended_process is not None:
+            showed = showed + [p for p in self.processlist if p['pid'] == self.extended_process['pid']]
+        for proc in showed:
+            proc.update(self.get_process_attrs(proc['pid'], attrs))
+
     def get_count(self):
         """Get the number of processes."""
         return self.processcount
@@ -509,12 +729,18 @@ class GlancesProcesses(object):
 
     def set_sort_key(self, key, auto=True):
         """Set the current sort key."""
+        previous_key = self._sort_key
         if key == 'auto':
             self.auto_sort = True
             self._sort_key = 'cpu_percent'
         else:
             self.auto_sort = auto
             self._sort_key = key
+        if self._showed_attrs is not None and self._sort_key != previous_key:
+            # The last update only grabbed the display attributes of the processes showed with
+            # the previous key: grab them for the new showed processes (displayed before the next update)
+            sort_stats(self.processlist, sorted_by=self._sort_key, reverse=self.sort_reverse, limit=self._max_processes)
+            self._update_showed_processes(self._showed_attrs)
 
     def nice_decrease(self, pid):
         """Decrease nice level
@@ -585,10 +811,27 @@ def _sort_lambda(sorted_by='cpu_percent', sorted_by_secondary='memory_percent'):
     return ret
 
 
-def sort_stats(stats, sorted_by='cpu_percent', sorted_by_secondary='memory_percent', reverse=True):
+def _sort(stats, key, reverse=True, limit=None):
+    """Sort the stats (in place) with the key function.
+
+    If limit is set, only the limit first stats are selected and sorted
+    (top-N selection with a heap, O(n log limit)), the other ones follow
+    in their original order.
+    """
+    if limit is None or limit >= len(stats):
+        stats.sort(key=key, reverse=reverse)
+        return
+    top = (heapq.nlargest if reverse else heapq.nsmallest)(limit, stats, key=key)
+    top_ids = set(map(id, top))
+    top.extend(s for s in stats if id(s) not in top_ids)
+    stats[:] = top
+
+
+def sort_stats(stats, sorted_by='cpu_percent', sorted_by_secondary='memory_percent', reverse=True, limit=None):
     """Return the stats (dict) sorted by (sorted_by).
 
     Reverse the sort if reverse is True.
+    If limit is set, only the limit first stats are sorted (the others are not ordered).
     """
     if sorted_by is None and sorted_by_secondary is None:
         # No need to sort...
@@ -600,23 +843,32 @@ def sort_stats(stats, sorted_by='cpu_percent', sorted_by_secondary='memory_perce
     if sort_lambda is not None:
         # Specific sort
         try:
-            stats.sort(key=sort_lambda, reverse=reverse)
+            _sort(stats, sort_lambda, reverse=reverse, limit=limit)
         except Exception:
             # If an error is detected, fallback to cpu_percent
-            stats.sort(
-                key=lambda process: (weighted(process['cpu_percent']), weighted(process[sorted_by_secondary])),
+            _sort(
+                stats,
+                lambda process: (weighted(process['cpu_percent']), weighted(process[sorted_by_secondary])),
                 reverse=reverse,
+                limit=limit,
             )
     else:
         # Standard sort
         try:
-            stats.sort(
-                key=lambda process: (weighted(process[sorted_by]), weighted(process[sorted_by_secondary])),
+            _sort(
+                stats,
+                lambda process: (weighted(process[sorted_by]), weighted(process[sorted_by_secondary])),
                 reverse=reverse,
+                limit=limit,
             )
         except (KeyError, TypeError):
             # Fallback to name
-            stats.sort(key=lambda process: process['name'] if process['name'] is not None else '~', reverse=False)
+            _sort(
+                stats,
+                lambda process: process['name'] if process['name'] is not None else '~',
+                reverse=False,
+                limit=limit,
+            )
 
     return stats
 
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Glances.
+#
+# SPDX-FileCopyrightText: 2023 Nicolas Hennion <nicolas@nicolargo.com>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+#
+
+"""Linux processes scanner reading /proc directly (alternative to psutil.process_iter)."""
+
+import os
+import pwd
+from collections import namedtuple
+from time import monotonic
+
+import psutil
+
+# Same fields as the psutil (Linux) named tuples
+pmem = namedtuple('pmem', ['rss', 'vms', 'shared', 'text', 'lib', 'data', 'dirty'])
+pcputimes = namedtuple('pcputimes', ['user', 'system', 'children_user', 'children_system', 'iowait'])
+pio = namedtuple('pio', ['read_count', 'write_count', 'read_bytes', 'write_bytes', 'read_chars', 'write_chars'])
+pgids = namedtuple('pgids', ['real', 'effective', 'saved'])
+
+# /proc/<pid>/stat state => psutil status
+proc_statuses = {
+    'R': psutil.STATUS_RUNNING,
+    'S': psutil.STATUS_SLEEPING,
+    'D': psutil.STATUS_DISK_SLEEP,
+    'T': psutil.STATUS_STOPPED,
+    't': psutil.STATUS_TRACING_STOP,
+    'Z': psutil.STATUS_ZOMBIE,
+    'X': psutil.STATUS_DEAD,
+    'x': psutil.STATUS_DEAD,
+    'K': 'wake-kill',
+    'W': psutil.STATUS_WAKING,
+    'I': psutil.STATUS_IDLE,
+    'P': psutil.STATUS_PARKED,
+}
+
+# Attributes available with the scanner (same values as the psutil ones)
+scanner_attrs = frozenset(
+    [
+        'cmdline',
+        'cpu_percent',
+        'cpu_times',
+        'create_time',
+        'gids',
+        'io_counters',
+        'memory_info',
+        'memory_percent',
+        'name',
+        'nice',
+        'num_threads',
+        'pid',
+        'status',
+        'username',
+    ]
+)
+
+# Size of the /proc files reads (enough for the stat, statm, status and io files)
+read_size = 8192
+
+
+def read_proc_file(path, size=read_size):
+    """Return the content (bytes) of the /proc file (one read system call)."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+
+def read_proc_file_all(path):
+    """Return the whole content (bytes) of the /proc file."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = []
+        while True:
+            chunk = os.read(fd, read_size)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+
+
+def parse_cmdline(data):
+    """Return the command line (list) of the /proc/<pid>/cmdline content (same as psutil)."""
+    data = data.decode('utf-8', 'surrogateescape')
+    if not data:
+        return []
+    sep = '\x00' if data.endswith('\x00') else ' '
+    if data.endswith(sep):
+        data = data[:-1]
+    cmdline = data.split(sep)
+    if sep == '\x00' and len(cmdline) == 1 and ' ' in data:
+        # Some processes change their cmdline after starting (issue #1179 of psutil)
+        cmdline = data.split(' ')
+    return cmdline
+
+
+def parse_ids(data, key):
+    """Return the (real, effective, saved) ids of the key (b'Uid:' or b'Gid:') line of the status content."""
+    start = data.find(key)
+    if start < 0:
+        return None
+    fields = data[start + len(key) : data.find(b'\n', start)].split()
+    return int(fields[0]), int(fields[1]), int(fields[2])
+
+
+class GlancesProcScanner(object):
+    """Linux processes scanner reading the /proc files of each process in a single pass.
+
+    It only reads the files needed by the requested attributes (stat,
+    statm, status, io and cmdline) with raw system calls and parses them
+    as bytes. The values are the same as the psutil ones (including the
+    named tuples fields), cpu_percent is computed from the previous scan.
+    """
+
+    def __init__(self, procfs_path='/proc'):
+        self.procfs_path = procfs_path
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+        self.total_memory = psutil.virtual_memory().total
+        self.boot_time = psutil.boot_time()
+        # CPU times of the previous scan, key: pid, value: (start time, cpu time, timestamp)
+        self._cpu_times = {}
+        # Users names cache, key: uid
+        self._usernames = {}
+
+    def pids(self):
+        """Return the list of the processes ids."""
+        return [int(p) for p in os.listdir(self.procfs_path) if p.isdigit()]
+
+    def process_iter(self, attrs):
+        """Yield the attributes (dict) of each running process.
+
+        attrs is the list of attributes (see scanner_attrs), the
+        unavailable values (access denied) are None (as psutil ad_value).
+        The processes terminated during the scan are skipped.
+        Raise ValueError if an attribute is not available with the scanner.
+        """
+        unknown = set(attrs) - scanner_attrs
+        if unknown:
+            raise ValueError("Attributes not available with the /proc scanner: {}".format(', '.join(sorted(unknown))))
+        attrs = set(attrs)
+        cpu_times = {}
+        for pid in self.pids():
+            try:
+                info = self.process_info(pid, attrs, cpu_times)
+            except (FileNotFoundError, ProcessLookupError):
+                # Terminated process
+                continue
+            yield info
+        self._cpu_times = cpu_times
+
+    def process_info(self, pid, attrs, cpu_times):
+        """Return the attributes (dict) of the process.
+
+        cpu_times is updated with the process CPU time (for the next scan).
+        Raise FileNotFoundError or ProcessLookupError if the process is terminated.
+        """
+        path = '{}/{}/'.format(self.procfs_path, pid)
+        ret = {}
+        if 'pid' in attrs:
+            ret['pid'] = pid
+
+        # /proc/<pid>/stat
+        data = read_proc_file(path + 'stat')
+        name_end = data.rfind(b')')
+        name = data[data.find(b'(') + 1 : name_end].decode('utf-8', 'surrogateescape')
+        # Fields after the name, starting at the state (3rd field of the stat file)
+        stat = data[name_end + 2 :].split()
+        utime = int(stat[11]) / self.clock_ticks
+        stime = int(stat[12]) / self.clock_ticks
+        if 'cpu_percent' in attrs:
+            start_time = stat[19]
+            now = monotonic()
+            cpu_times[pid] = (start_time, utime + stime, now)
+            previous = self._cpu_times.get(pid)
+            if previous is None or previous[0] != start_time or now <= previous[2]:
+                # New process (or same pid reused), same as the first psutil call
+                ret['cpu_percent'] = 0.0
+            else:
+                ret['cpu_percent'] = round((utime + stime - previous[1]) / (now - previous[2]) * 100, 1)
+        if 'create_time' in attrs:
+            ret['create_time'] = int(stat[19]) / self.clock_ticks + self.boot_time
+        if 'cpu_times' in attrs:
+            ret['cpu_times'] = pcputimes(
+                utime,
+                stime,
+                int(stat[13]) / self.clock_ticks,
+                int(stat[14]) / self.clock_ticks,
+                int(stat[39]) / self.clock_ticks if len(stat) > 39 else 0.0,
+            )
+        if 'status' in attrs:
+            ret['status'] = proc_statuses.get(stat[0].decode(), '?')
+        if 'nice' in attrs:
+            ret['nice'] = int(stat[16])
+        if 'num_threads' in attrs:
+            ret['num_threads'] = int(stat[17])
+
+        # /proc/<pid>/statm
+        if 'memory_info' in attrs or 'memory_percent' in attrs:
+            statm = [int(v) * self.page_size for v in read_proc_file(path + 'statm').split()[:7]]
+            if 'memory_info' in attrs:
+                ret['memory_info'] = pmem(statm[1], statm[0], statm[2], statm[3], statm[4], statm[5], statm[6])
+            if 'memory_percent' in attrs:
+                ret['memory_percent'] = statm[1] / self.total_memory * 100 if self.total_memory else 0.0
+
+        # /proc/<pid>/status
+        if 'gids' in attrs or 'username' in attrs:
+            status = read_proc_file(path + 'status')
+            if 'gids' in attrs:
+                gids = parse_ids(status, b'Gid:')
+                ret['gids'] = None if gids is None else pgids(*gids)
+            if 'username' in attrs:
+                uids = parse_ids(status, b'Uid:')
+                ret['username'] = None if uids is None else self.username(uids[0])
+
+        # /proc/<pid>/cmdline
+        cmdline = None
+        if 'cmdline' in attrs or ('name' in attrs and len(name) >= 15):
+            try:
+                cmdline = parse_cmdline(read_proc_file_all(path + 'cmdline'))
+            except PermissionError:
+                cmdline = None
+            if 'cmdline' in attrs:
+                ret['cmdline'] = cmdline
+        if 'name' in attrs:
+            if cmdline and len(name) >= 15:
+                # The name is truncated to 15 characters, use the cmdline one (as psutil)
+                extended_name = os.path.basename(cmdline[0])
+                if extended_name.startswith(name):
+                    name = extended_name
+            ret['name'] = name
+
+        # /proc/<pid>/io (only readable by the process owner)
+        if 'io_counters' in attrs:
+            try:
+                io = dict(line.split(b': ') for line in read_proc_file(path + 'io').splitlines() if b': ' in line)
+                ret['io_counters'] = pio(
+                    int(io[b'syscr']),
+                    int(io[b'syscw']),
+                    int(io[b'read_bytes']),
+                    int(io[b'write_bytes']),
+                    int(io[b'rchar']),
+                    int(io[b'wchar']),
+                )
+            except (PermissionError, KeyError):
+                ret['io_counters'] = None
+
+        return ret
+
+    def username(self, uid):
+        """Return the name of the user (the uid if the user is unknown)."""
+        try:
+            return self._usernames[uid]
+        except KeyError:
+            pass
+        try:
+            name = pwd.getpwuid(uid).pw_name
+        except KeyError:
+            name = str(uid)
+        self._usernames[uid] = name
+        return name
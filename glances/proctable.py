@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Glances.
+#
+# SPDX-FileCopyrightText: 2023 Nicolas Hennion <nicolas@nicolargo.com>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+#
+
+"""Columnar processes table (NumPy arrays) for the processes list computations."""
+
+# Optional import
+try:
+    import numpy as np
+except ImportError:
+    numpy_tag = False
+else:
+    numpy_tag = True
+
+
+class GlancesProcessTable(object):
+    """Columnar view of the processes list (one NumPy array per stat).
+
+    It is built once per scan from the processes stats (list of dict),
+    then the processes count, the maximum values and the sort are
+    computed with vectorized operations. The rows are the processes
+    dicts (not copied).
+
+    The undefined (None) values are -inf in the float columns, as with
+    the weighted function of the processes sort.
+    """
+
+    # Float columns (sort keys and maximum values)
+    float_columns = ('cpu_percent', 'memory_percent')
+
+    def __init__(self, processlist):
+        self.rows = processlist
+        count = len(processlist)
+        self.columns = {
+            k: np.fromiter(
+                (-np.inf if p[k] is None else p[k] for p in processlist),
+                dtype=np.float64,
+                count=count,
+            )
+            for k in self.float_columns
+        }
+        self.num_threads = np.fromiter((p['num_threads'] or 0 for p in processlist), dtype=np.int64, count=count)
+        # Status code = index in the statuses list
+        codes = {}
+        self.status = np.fromiter(
+            (codes.setdefault(p['status'], len(codes)) for p in processlist),
+            dtype=np.int64,
+            count=count,
+        )
+        self.statuses = list(codes)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def status_count(self):
+        """Return the number of processes of each status (dict)."""
+        return dict(zip(self.statuses, np.bincount(self.status, minlength=len(self.statuses)).tolist()))
+
+    def threads(self):
+        """Return the total number of threads."""
+        return int(self.num_threads.sum())
+
+    def max(self, key):
+        """Return the maximum value of the float column key (None if no value is defined)."""
+        if not len(self.rows):
+            return None
+        ret = self.columns[key].max()
+        return None if ret == -np.inf else float(ret)
+
+    def sort(self, key, secondary='memory_percent', limit=None):
+        """Return the rows (list) sorted by the float columns key then secondary, in descending order.
+
+        The order is the sort_stats one (the ties keep the original order).
+        If limit is set, only the limit first rows are selected (partition)
+        and sorted, the other ones follow in their original order.
+        """
+        primary = -self.columns[key]
+        count = len(primary)
+        if limit is not None and limit < count:
+            if limit > 0:
+                # Rows before (or tied with) the limit-th one, in their original order
+                threshold = np.partition(primary, limit - 1)[limit - 1]
+                selected = np.flatnonzero(primary <= threshold)
+                # The last key is the primary one, lexsort is stable
+                top = selected[np.lexsort((-self.columns[secondary][selected], primary[selected]))][:limit]
+            else:
+                top = np.empty(0, dtype=np.intp)
+            others = np.ones(count, dtype=bool)
+            others[top] = False
+            order = np.concatenate((top, np.flatnonzero(others)))
+        else:
+            # The last key is the primary one, lexsort is stable
+            order = np.lexsort((-self.columns[secondary], primary))
+        rows = self.rows
+        return [rows[i] for i in order.tolist()]
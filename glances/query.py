@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Glances.
+#
+# SPDX-FileCopyrightText: 2022 Nicolas Hennion <nicolas@nicolargo.com>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+#
+
+"""Filter, sort, limit and project the stats of the list plugins (processlist, network, fs...)."""
+
+import heapq
+import operator
+import re
+
+# Operators of the where conditions (longest first)
+where_operators = {
+    '>=': operator.ge,
+    '<=': operator.le,
+    '!=': operator.ne,
+    '==': operator.eq,
+    '>': operator.gt,
+    '<': operator.lt,
+    '=': operator.eq,
+    '~': None,
+}
+
+where_regex = re.compile(r'^([\w.]+)({})(.*)$'.format('|'.join(re.escape(o) for o in where_operators)))
+
+
+def parse_where(condition):
+    """Return the (field, operator, value) of the where condition.
+
+    A condition is <field><operator><value>, for example cpu_percent>10 or
+    name~^python (~ is a regular expression search).
+    Raise ValueError if the condition is not valid.
+    """
+    match = where_regex.match(condition)
+    if match is None:
+        raise ValueError("Invalid where condition {} (should be <field><operator><value>)".format(condition))
+    field, op, value = match.groups()
+    if op == '~':
+        try:
+            return field, op, re.compile(value)
+        except re.error as e:
+            raise ValueError("Invalid where regular expression {} ({})".format(value, e))
+    return field, op, value
+
+
+def match_where(stat, where):
+    """Return True if the stat (dict) matches all the where conditions (see parse_where)."""
+    for field, op, value in where:
+        stat_value = stat.get(field)
+        if op == '~':
+            if isinstance(stat_value, (list, tuple)):
+                stat_value = ' '.join(str(v) for v in stat_value)
+            if stat_value is None or value.search(str(stat_value)) is None:
+                return False
+            continue
+        if stat_value is None:
+            # Undefined value, only match the != conditions
+            if op != '!=':
+                return False
+            continue
+        if isinstance(stat_value, (int, float)) and not isinstance(stat_value, bool):
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError("Invalid where value {} (field {} is a number)".format(value, field))
+        else:
+            stat_value = str(stat_value)
+        if not where_operators[op](stat_value, value):
+            return False
+    return True
+
+
+def sort_key(field, reverse=False):
+    """Return the sort key function on field (the undefined values are always the lasts)."""
+    if reverse:
+        return lambda stat: (stat.get(field) is not None, stat.get(field))
+    return lambda stat: (stat.get(field) is None, stat.get(field))
+
+
+def query_stats(stats, fields=None, sort=None, limit=None, where=None):
+    """Return the stats (list of dict) matching the query.
+
+    - where: list of conditions (see parse_where), all of them should match
+    - sort: field name (prefixed by - for the descending order)
+    - limit: maximum number of items (top-N with a partial sort if sort is set)
+    - fields: list of field names to return (all if None)
+
+    The stats are not modified.
+    Raise ValueError if the query is not valid.
+    """
+    if not isinstance(stats, list):
+        if sort is not None or limit is not None or where:
+            raise ValueError("The where, sort and limit parameters are only available for the list plugins")
+        if fields is not None and isinstance(stats, dict):
+            return {f: stats[f] for f in fields if f in stats}
+        return stats
+
+    if where:
+        where = [parse_where(w) for w in where]
+        stats = [s for s in stats if match_where(s, where)]
+
+    if limit is not None and limit < 0:
+        raise ValueError("Invalid limit {} (should be a positive integer)".format(limit))
+
+    if sort is not None:
+        reverse = sort.startswith('-')
+        key = sort_key(sort.lstrip('-'), reverse=reverse)
+        try:
+            if limit is not None and limit < len(stats):
+                # Partial sort
+                stats = (heapq.nlargest if reverse else heapq.nsmallest)(limit, stats, key=key)
+            else:
+                stats = sorted(stats, key=key, reverse=reverse)
+        except TypeError:
+            raise ValueError("Can not sort on field {} (values can not be compared)".format(sort.lstrip('-')))
+    elif limit is not None:
+        stats = stats[:limit]
+
+    if fields is not None:
+        stats = [{f: s[f] for f in fields if f in s} for s in stats]
+
+    return stats
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Glances.
+#
+# SPDX-FileCopyrightText: 2022 Nicolas Hennion <nicolas@nicolargo.com>
+#
+# SPDX-License-Identifier: LGPL-3.0-only
+#
+
+"""The plugins update scheduler."""
+
+import heapq
+from time import monotonic
+
+
+class GlancesScheduler(object):
+
+    """Deadline-driven scheduler.
+
+    Items (plugins names) are stored in a priority queue keyed on their
+    next due time. The refresh rate of an item is given by a function, so
+    a refresh rate changed at runtime is taken into account for the next run.
+
+    The due times are read from the monotonic clock (not affected by the
+    system clock updates).
+    """
+
+    def __init__(self, tolerance=0.05):
+        # Priority queue of (due time, name)
+        self._queue = []
+        # Functions returning the refresh rate (in seconds) of the items
+        self._refresh = {}
+        # Delay (in seconds) between the due time and the last run of the items
+        self._drift = {}
+        # Items due in less than tolerance seconds are considered as due
+        # (avoid a useless wake up just before a deadline)
+        self.tolerance = tolerance
+
+    def add(self, name, refresh, due=None):
+        """Add the item name to the scheduler.
+
+        :param refresh: function returning the item refresh rate (in seconds)
+        :param due: first due time (default is now)
+        """
+        self._refresh[name] = refresh
+        heapq.heappush(self._queue, (monotonic() if due is None else due, name))
+
+    def reset(self):
+        """Make all the items due now."""
+        now = monotonic()
+        self._queue = [(now, name) for name in sorted(self._refresh)]
+
+    def pop_due(self, now=None):
+        """Return the list of due items and schedule their next run."""
+        if now is None:
+            now = monotonic()
+        due_items = []
+        while self._queue and self._queue[0][0] <= now + self.tolerance:
+            due_items.append(heapq.heappop(self._queue))
+
+        ret = []
+        for due, name in due_items:
+            self._drift[name] = now - due
+            refresh = self._refresh[name]()
+            # Next due time is anchored on the previous one (no cumulative drift)
+            # except if one or more runs have been missed
+            next_due = due + refresh
+            if next_due <= now:
+                next_due = now + refresh
+            heapq.heappush(self._queue, (next_due, name))
+            ret.append(name)
+        return ret
+
+    def time_until_next(self, now=None):
+        """Return the time (in seconds) until the next deadline (None if nothing is scheduled)."""
+        if not self._queue:
+            return None
+        if now is None:
+            now = monotonic()
+        return max(0, self._queue[0][0] - now)
+
+    def get_drift(self):
+        """Return the last schedule drift (in seconds) of the items (dict)."""
+        return self._drift
+
+    def get_schedule(self):
+        """Return the next due time of the items (dict)."""
+        return {name: due for due, name in self._queue}
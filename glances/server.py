@@ -10,14 +10,19 @@
 """Manage the Glances server."""
 
 from glances.globals import json_dumps
+import json
+import zlib
 import socket
 import sys
 from base64 import b64decode
+from time import time
 
 from glances import __version__
-from glances.globals import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+from glances.globals import Binary, SimpleXMLRPCRequestHandler, SimpleXMLRPCServer, msgpack_dumps
 from glances.autodiscover import GlancesAutoDiscoverClient
+from glances.delta import GlancesDelta
 from glances.logger import logger
+from glances.password import GlancesAuthCache
 from glances.stats_server import GlancesStatsServer
 from glances.timer import Timer
 
@@ -65,13 +70,17 @@ class GlancesXMLRPCHandler(SimpleXMLRPCRequestHandler, object):
     def check_user(self, username, password):
         # Check username and password in the dictionary
         if username in self.server.user_dict:
-            from glances.password import GlancesPassword
-
-            pwd = GlancesPassword(username=username, config=self.config)
-            return pwd.check_password(self.server.user_dict[username], password)
+            # The valid credentials are cached (the password check is slow)
+            return self.server.auth_cache.check(username, password, self._check_user_password)
         else:
             return False
 
+    def _check_user_password(self, username, password):
+        from glances.password import GlancesPassword
+
+        pwd = GlancesPassword(username=username, config=self.server.config)
+        return pwd.check_password(self.server.user_dict[username], password)
+
     def parse_request(self):
         if SimpleXMLRPCRequestHandler.parse_request(self):
             # Next we authenticate
@@ -133,10 +142,17 @@ class GlancesInstance(object):
         self.timer = Timer(0)
         self.cached_time = args.cached_time
 
+        # Stats update cycle (the prefix avoids collisions after a restart)
+        self.update_cycle = 0
+        self._cycle_prefix = '%x' % int(time())
+        # Documents of the last cycles for the getAllSince method
+        self.delta = GlancesDelta()
+
     def __update__(self):
         # Never update more than 1 time per cached_time
         if self.timer.finished():
             self.stats.update()
+            self.update_cycle += 1
             self.timer = Timer(self.cached_time)
 
     def init(self):
@@ -148,6 +164,27 @@ class GlancesInstance(object):
         self.__update__()
         return json_dumps(self.stats.getAll())
 
+    def getAllPacked(self):
+        # Update and return all the stats in the deflated MessagePack format (binary)
+        # Raise a Fault if the msgpack module is not installed
+        self.__update__()
+        return Binary(zlib.compress(msgpack_dumps(self.stats.getAll()), 1))
+
+    def getAllSince(self, since):
+        # Update and return the JSON Patch (RFC 6902) of all the stats since the given cycle id
+        # {"cycle": <current cycle id>, "since": <since>, "patch": [...]}
+        # If since is unknown (for example an empty string), the patch replaces the whole stats
+        self.__update__()
+        cycle = '{}-{}'.format(self._cycle_prefix, self.update_cycle)
+        if cycle not in self.delta:
+            self.delta.add(cycle, json.loads(json_dumps(self.stats.getAllAsDict())))
+        return json_dumps({'cycle': cycle, 'since': since, 'patch': self.delta.get(since, cycle)})
+
+    def getPluginValue(self, plugin, item, value):
+        # Update and return the stats of the list plugin whose item is equal to value
+        self.__update__()
+        return self.stats.get_plugin(plugin).get_stats_value(item, value) or json_dumps(None)
+
     def getAllPlugins(self):
         # Return the plugins list
         return json_dumps(self.stats.getPluginsList())
@@ -203,6 +240,7 @@ class GlancesServer(object):
         # By default, no auth is needed
         self.server.user_dict = {}
         self.server.isAuth = False
+        self.server.auth_cache = GlancesAuthCache(config=config)
 
         # Register functions
         self.server.register_introspection_functions()
@@ -9,12 +9,14 @@
 
 """Manage the Glances standalone session."""
 
+import copy
 import sys
 import time
 
 from glances.globals import WINDOWS
 from glances.logger import logger
 from glances.processes import glances_processes
+from glances.scheduler import GlancesScheduler
 from glances.stats import GlancesStats
 from glances.outputs.glances_curses import GlancesCursesStandalone
 from glances.outputs.glances_stdout import GlancesStdout
@@ -37,6 +39,11 @@ class GlancesStandalone(object):
         # Quiet mode
         self._quiet = args.quiet
         self.refresh_time = args.time
+        # Refresh cycles (global refresh rate) of the exports and of the --stop-after option
+        # (the plugins can be updated more often, see the stats scheduler)
+        self.cycle_scheduler = GlancesScheduler()
+        self.cycle_scheduler.add('cycle', lambda: self.refresh_time)
+        self.cycles = 0
 
         # Init stats
         start_duration = Counter()
@@ -74,6 +81,9 @@ class GlancesStandalone(object):
         self.stats.update()
         logger.debug("First stats update duration: {} seconds".format(start_duration.get()))
 
+        # Modules import and init durations after the first display (see --startup-profile)
+        self.startup_profile = None
+
         if self.quiet:
             logger.info("Quiet mode is ON, nothing will be displayed")
             # In quiet mode, nothing is displayed
@@ -117,6 +127,30 @@ class GlancesStandalone(object):
         print("Plugins list: {}".format(', '.join(sorted(self.stats.getPluginsList(enable=False)))))
         print("Exporters list: {}".format(', '.join(sorted(self.stats.getExportsList(enable=False)))))
 
+    def display_startup_profile(self):
+        """Display the import and init durations of the loaded modules (on stderr)"""
+        profile = self.startup_profile
+        total = 0
+        print("{:<8} {:<16} {:>10} {:>10}".format('Type', 'Module', 'Import', 'Init'), file=sys.stderr)
+        for module_type in ['plugins', 'exports']:
+            # Slowest modules first
+            for name, durations in sorted(
+                profile[module_type].items(), key=lambda m: -sum(d or 0 for d in m[1].values())
+            ):
+                print(
+                    "{:<8} {:<16} {:>10} {:>10}".format(
+                        module_type[:-1],
+                        name,
+                        '-' if durations['import'] is None else '{:.4f}s'.format(durations['import']),
+                        '-' if durations['init'] is None else '{:.4f}s'.format(durations['init']),
+                    ),
+                    file=sys.stderr,
+                )
+                total += sum(d or 0 for d in durations.values())
+        print(
+            "Total: {:.4f}s ({} plugins not loaded)".format(total, len(self.startup_not_loaded)), file=sys.stderr
+        )
+
     def serve_issue(self):
         """Special mode for the --issue option
 
@@ -137,18 +171,22 @@ class GlancesStandalone(object):
         self.stats.update()
         logger.debug('Stats updated duration: {} seconds'.format(counter.get()))
 
-        # Export stats
-        # Start a counter used to compute the time needed
-        counter_export = Counter()
-        self.stats.export(self.stats)
-        logger.debug('Stats exported duration: {} seconds'.format(counter_export.get()))
+        # Export stats (once per refresh cycle)
+        if self.cycle_scheduler.pop_due():
+            self.cycles += 1
+            # Start a counter used to compute the time needed
+            counter_export = Counter()
+            self.stats.export(self.stats)
+            logger.debug('Stats exported duration: {} seconds'.format(counter_export.get()))
 
-        # Patch for issue1326 to avoid < 0 refresh
-        adapted_refresh = self.refresh_time - counter.get()
-        adapted_refresh = adapted_refresh if adapted_refresh > 0 else 0
+        # Wait until the next plugin update deadline (see the stats scheduler) or the next refresh cycle
+        adapted_refresh = self.cycle_scheduler.time_until_next()
+        next_update = self.stats.time_until_next_update()
+        if next_update is not None:
+            adapted_refresh = min(adapted_refresh, next_update)
 
         # Display stats
-        # and wait refresh_time - counter
+        # and wait until the next deadline
         if not self.quiet:
             # The update function return True if an exit key 'q' or 'ESC'
             # has been pressed.
@@ -159,24 +197,30 @@ class GlancesStandalone(object):
             time.sleep(adapted_refresh)
             ret = True
 
+        # Plugins are imported on first use, so the profile is complete after the first display
+        # (it is displayed at the end, the screen is used by the curses interface)
+        if self.args.startup_profile and self.startup_profile is None:
+            self.startup_profile = copy.deepcopy(self.stats.get_startup_profile())
+            self.startup_not_loaded = [
+                p for p in self.stats.getPluginsList(enable=False) if p not in self.startup_profile['plugins']
+            ]
+
         return ret
 
     def serve_forever(self):
         """Wrapper to the serve_forever function."""
         if self.args.stop_after:
-            for _ in range(self.args.stop_after):
-                if not self.__serve_once():
-                    break
+            self.serve_n(self.args.stop_after)
         else:
             while self.__serve_once():
                 pass
         # self.end()
 
     def serve_n(self, n=1):
-        """Serve n time."""
-        for _ in range(n):
-            if not self.__serve_once():
-                break
+        """Serve n refresh cycles."""
+        end = self.cycles + n
+        while self.cycles < end and self.__serve_once():
+            pass
         # self.end()
 
     def end(self):
@@ -184,6 +228,9 @@ class GlancesStandalone(object):
         if not self.quiet:
             self.screen.end()
 
+        if self.startup_profile is not None:
+            self.display_startup_profile()
+
         # Exit from export modules
         self.stats.end()
 
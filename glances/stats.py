@@ -10,17 +10,186 @@
 """The stats manager."""
 
 import collections
-import os
+import copy
 import sys
 import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
 from importlib import import_module
+from time import perf_counter
 
 from glances.logger import logger
-from glances.globals import exports_path, plugins_path, sys_path
+from glances.globals import json_dumps, sys_path
+from glances.manifest import GlancesManifest
+from glances.plugins.plugin.model import GlancesPluginModel
+from glances.scheduler import GlancesScheduler
 from glances.timer import Counter
 
 
+class GlancesLazyPlugin(object):
+
+    """Proxy to a plugin which is imported and initialized on first use.
+
+    The enable/disable status and the refresh rate of the plugin are
+    available without importing it, as well as its stats, views and display
+    before its first update (init values, see the modules manifest). Any
+    other attribute access loads the plugin. Attributes set before the load
+    are applied to the plugin instance once it is loaded.
+    """
+
+    def __init__(self, plugin_path, args=None, config=None, profile=None, init_value={}):
+        # Internal attributes are stored directly in the instance dict
+        # (see __setattr__)
+        object.__setattr__(self, '_plugin_path', plugin_path)
+        object.__setattr__(self, '_args', args)
+        object.__setattr__(self, '_config', config)
+        object.__setattr__(self, '_profile', profile if profile is not None else {})
+        object.__setattr__(self, '_plugin', None)
+        object.__setattr__(self, '_pending', {})
+        object.__setattr__(self, '_init_value', init_value)
+        if plugin_path.startswith('glances_'):
+            # Avoid circular loop when Glances plugin uses lib with same name
+            # Example: docker should be named to glances_docker
+            object.__setattr__(self, 'plugin_name', plugin_path.split('glances_')[1])
+        else:
+            object.__setattr__(self, 'plugin_name', plugin_path)
+
+    def __getattr__(self, item):
+        """Load the plugin (if needed) and return its attribute."""
+        if item.startswith('__'):
+            raise AttributeError(item)
+        if self._plugin is None and item in self._pending:
+            return self._pending[item]
+        return getattr(self.load(), item)
+
+    def __setattr__(self, item, value):
+        """Set the attribute of the plugin (or keep it until the plugin is loaded)."""
+        if self._plugin is None:
+            self._pending[item] = value
+        else:
+            setattr(self._plugin, item, value)
+
+    def __repr__(self):
+        return self.load().__repr__()
+
+    def __str__(self):
+        return str(self.load())
+
+    def is_loaded(self):
+        """Return True if the plugin has been imported and initialized."""
+        return self._plugin is not None
+
+    def is_enabled(self, plugin_name=None):
+        """Return true if plugin is enabled."""
+        return GlancesPluginModel.is_enabled(self, plugin_name=plugin_name)
+
+    def is_disabled(self, plugin_name=None):
+        """Return true if plugin is disabled."""
+        return not self.is_enabled(plugin_name=plugin_name)
+
+    @property
+    def args(self):
+        if self._plugin is None:
+            return self._args
+        return self._plugin.args
+
+    def get_refresh(self):
+        """Return the plugin refresh time"""
+        if self._plugin is not None:
+            return self._plugin.get_refresh()
+        ret = self._args.time
+        if self._config is not None and self._config.has_section(self.plugin_name):
+            ret = self._config.get_float_value(self.plugin_name, 'refresh', default=ret)
+        return ret
+
+    def get_refresh_time(self):
+        """Return the plugin refresh time"""
+        return self.get_refresh()
+
+    def get_raw(self):
+        """Return the stats object (the init value if the plugin is not loaded)."""
+        if self._plugin is None:
+            return copy.copy(self._init_value)
+        return self._plugin.get_raw()
+
+    def get_export(self):
+        """Return the stats object to export (the init value if the plugin is not loaded)."""
+        if self._plugin is None:
+            return self.get_raw()
+        return self._plugin.get_export()
+
+    def get_stats(self):
+        """Return the stats object in JSON format (the init value if the plugin is not loaded)."""
+        if self._plugin is None:
+            return json_dumps(self._init_value)
+        return self._plugin.get_stats()
+
+    def get_views(self, item=None, key=None, option=None):
+        """Return the views object (no views if the plugin is not loaded)."""
+        if self._plugin is None and item is None and key is None:
+            return {}
+        return self.load().get_views(item=item, key=key, option=option)
+
+    def get_json_views(self, item=None, key=None, option=None):
+        """Return the views (in JSON)."""
+        return json_dumps(self.get_views(item, key, option))
+
+    def get_stats_display(self, args=None, max_width=None):
+        """Return the display information of the plugin (nothing to display if the plugin is not loaded)."""
+        if self._plugin is None:
+            return {'display': False, 'msgdict': [], 'align': 'left'}
+        return self._plugin.get_stats_display(args=args, max_width=max_width)
+
+    def load_limits(self, config=None):
+        """Load limits from the configuration file (on next load if the plugin is not loaded)."""
+        if self._plugin is None:
+            object.__setattr__(self, '_config', config)
+            return True
+        return self._plugin.load_limits(config)
+
+    def exit(self):
+        """Exit the plugin (only if it has been loaded)."""
+        if self._plugin is not None:
+            self._plugin.exit()
+
+    def load(self):
+        """Import and init the plugin and return its instance."""
+        if self._plugin is not None:
+            return self._plugin
+
+        name = self.plugin_name
+        profile = {'import': None, 'init': None}
+        duration = Counter()
+        try:
+            # Import the plugin
+            plugin = import_module('glances.plugins.' + self._plugin_path + '.model')
+            profile['import'] = duration.get()
+            # Init the plugin
+            duration.reset()
+            instance = plugin.PluginModel(args=self._args, config=self._config)
+            profile['init'] = duration.get()
+        except Exception as e:
+            # If a plugin can not be loaded, display a critical message
+            # on the console but do not crash
+            logger.critical("Error while initializing the {} plugin ({})".format(name, e))
+            logger.error(traceback.format_exc())
+            # An error occurred, disable the plugin...
+            if self._args is not None:
+                setattr(self._args, 'disable_' + name, True)
+            # ... and replace it by an empty one
+            instance = GlancesPluginModel(args=self._args)
+            instance.plugin_name = name
+        else:
+            logger.debug("Plugin {} loaded in {} seconds".format(name, profile['import'] + profile['init']))
+        self._profile[name] = profile
+
+        for item, value in self._pending.items():
+            setattr(instance, item, value)
+        object.__setattr__(self, '_plugin', instance)
+        self._pending.clear()
+        return instance
+
+
 class GlancesStats(object):
 
     """This class stores, updates and gives stats."""
@@ -39,6 +208,9 @@ class GlancesStats(object):
         self.first_export = True
         self.load_modules(self.args)
 
+        # Init the (optional) parallel plugins update executor
+        self.load_update_executor(config=self.config)
+
     def __getattr__(self, item):
         """Overwrite the getattr method in case of attribute is not found.
 
@@ -76,11 +248,22 @@ class GlancesStats(object):
     def load_modules(self, args):
         """Wrapper to load: plugins and export modules."""
 
+        # Available modules list (cached in the modules manifest)
+        self.manifest = GlancesManifest()
+        # Import and init durations of the modules (see --startup-profile)
+        self._startup_profile = {'plugins': {}, 'exports': {}}
+
         # Init the plugins dict
         # Active plugins dictionary
         self._plugins = collections.defaultdict(dict)
         # Load the plugins
         self.load_plugins(args=args)
+        # Init the plugins update scheduler
+        self.load_scheduler()
+
+        # Restoring system path
+        # (before loading the exporters, the exports folder shadows standard libs as csv or json)
+        sys.path = sys_path
 
         # Init the export modules dict
         # Active exporters dictionary
@@ -90,89 +273,79 @@ class GlancesStats(object):
         # Load the export modules
         self.load_exports(args=args)
 
-        # Restoring system path
-        sys.path = sys_path
-
     def _load_plugin(self, plugin_path, args=None, config=None):
-        """Load the plugin, init it and add to the _plugin dict."""
+        """Add the plugin to the _plugin dict.
+
+        The plugin is not imported here but on its first use
+        (see GlancesLazyPlugin). So disabled plugins are never imported.
+        """
+        plugin = GlancesLazyPlugin(
+            plugin_path,
+            args=args,
+            config=config,
+            profile=self._startup_profile['plugins'],
+            init_value=self.manifest.init_values.get(plugin_path, {}),
+        )
         # The key is the plugin_path
         # except when it starts with glances_xxx
         # generate self._plugins_list["xxx"] = <instance of xxx Plugin>
-        if plugin_path.startswith('glances_'):
-            # Avoid circular loop when Glances plugin uses lib with same name
-            # Example: docker should be named to glances_docker
-            name = plugin_path.split('glances_')[1]
-        else:
-            name = plugin_path
-        # Load the plugin class
-        try:
-            # Import the plugin
-            plugin = import_module('glances.plugins.' + plugin_path + '.model')
-            # Init and add the plugin to the dictionary
-            self._plugins[name] = plugin.PluginModel(args=args, config=config)
-        except Exception as e:
-            # If a plugin can not be loaded, display a critical message
-            # on the console but do not crash
-            logger.critical("Error while initializing the {} plugin ({})".format(name, e))
-            logger.error(traceback.format_exc())
-            # An error occurred, disable the plugin
-            if args is not None:
-                setattr(args, 'disable_' + name, False)
-        else:
-            # Manage the default status of the plugin (enable or disable)
-            if args is not None:
-                # If the all key is set in the disable_plugin option then look in the enable_plugin option
-                if getattr(args, 'disable_all', False):
-                    logger.debug('%s => %s', name, getattr(args, 'enable_' + name, False))
-                    setattr(args, 'disable_' + name, not getattr(args, 'enable_' + name, False))
-                else:
-                    setattr(args, 'disable_' + name, getattr(args, 'disable_' + name, False))
+        name = plugin.plugin_name
+        self._plugins[name] = plugin
+        # Manage the default status of the plugin (enable or disable)
+        if args is not None:
+            # If the all key is set in the disable_plugin option then look in the enable_plugin option
+            if getattr(args, 'disable_all', False):
+                logger.debug('%s => %s', name, getattr(args, 'enable_' + name, False))
+                setattr(args, 'disable_' + name, not getattr(args, 'enable_' + name, False))
+            else:
+                setattr(args, 'disable_' + name, getattr(args, 'disable_' + name, False))
 
     def load_plugins(self, args=None):
-        """Load all plugins in the 'plugins' folder."""
-        start_duration = Counter()
-
-        for item in os.listdir(plugins_path):
-            if os.path.isdir(os.path.join(plugins_path, item)) and not item.startswith('__') and item != 'plugin':
-                # Load the plugin
-                start_duration.reset()
-                self._load_plugin(os.path.basename(item), args=args, config=self.config)
-                logger.debug("Plugin {} started in {} seconds".format(item, start_duration.get()))
+        """Load all plugins listed in the modules manifest."""
+        for item in self.manifest.plugins:
+            # Load the plugin
+            self._load_plugin(item, args=args, config=self.config)
 
         # Log plugins list
         logger.debug("Active plugins list: {}".format(self.getPluginsList()))
 
     def load_exports(self, args=None):
-        """Load all exporters in the 'exports' folder."""
+        """Load all exporters listed in the modules manifest."""
         start_duration = Counter()
 
         if args is None:
             return False
 
-        for item in os.listdir(exports_path):
-            if os.path.isdir(os.path.join(exports_path, item)) and not item.startswith('__'):
-                # Load the exporter
+        for item in self.manifest.exports:
+            # Load the exporter
+            if item.startswith('glances_'):
+                # Avoid circular loop when Glances exporter uses lib with same name
+                # Example: influxdb should be named to glances_influxdb
+                exporter_name = item.split('glances_')[1]
+            else:
+                exporter_name = item
+            # Set the disable_<name> to False by default
+            setattr(self.args, 'export_' + exporter_name, getattr(self.args, 'export_' + exporter_name, False))
+            # We should import the module
+            if getattr(self.args, 'export_' + exporter_name, False):
+                # Import the export module
+                # (full module path to avoid a conflict with the standard lib, ex: csv or json)
+                start_duration.reset()
+                export_module = import_module('glances.exports.' + item)
+                profile = {'import': start_duration.get()}
+                # Add the exporter instance to the active exporters dictionary
                 start_duration.reset()
-                if item.startswith('glances_'):
-                    # Avoid circular loop when Glances exporter uses lib with same name
-                    # Example: influxdb should be named to glances_influxdb
-                    exporter_name = os.path.basename(item).split('glances_')[1]
-                else:
-                    exporter_name = os.path.basename(item)
-                # Set the disable_<name> to False by default
-                setattr(self.args, 'export_' + exporter_name, getattr(self.args, 'export_' + exporter_name, False))
-                # We should import the module
-                if getattr(self.args, 'export_' + exporter_name, False):
-                    # Import the export module
-                    export_module = import_module(item)
-                    # Add the exporter instance to the active exporters dictionary
-                    self._exports[exporter_name] = export_module.Export(args=args, config=self.config)
-                    # Add the exporter instance to the available exporters dictionary
-                    self._exports_all[exporter_name] = self._exports[exporter_name]
-                else:
-                    # Add the exporter name to the available exporters dictionary
-                    self._exports_all[exporter_name] = exporter_name
-                logger.debug("Exporter {} started in {} seconds".format(exporter_name, start_duration.get()))
+                self._exports[exporter_name] = export_module.Export(args=args, config=self.config)
+                profile['init'] = start_duration.get()
+                self._startup_profile['exports'][exporter_name] = profile
+                # Add the exporter instance to the available exporters dictionary
+                self._exports_all[exporter_name] = self._exports[exporter_name]
+                logger.debug(
+                    "Exporter {} started in {} seconds".format(exporter_name, profile['import'] + profile['init'])
+                )
+            else:
+                # Add the exporter name to the available exporters dictionary
+                self._exports_all[exporter_name] = exporter_name
 
         # Log plugins list
         logger.debug("Active exports modules list: {}".format(self.getExportsList()))
@@ -210,21 +383,188 @@ class GlancesStats(object):
         for p in self._plugins:
             self._plugins[p].load_limits(config)
 
+    def get_startup_profile(self):
+        """Return the import and init durations (in seconds) of the loaded modules.
+
+        Return: dict with a plugins and an exports key
+        """
+        return self._startup_profile
+
+    def load_update_executor(self, config=None):
+        """Load the parallel plugins update configuration.
+
+        update_workers (global section) is the size of the thread pool used to
+        update the plugins. Default is 0: plugins are updated one after the other.
+        update_timeout (global section) is the maximum time (in seconds) to wait
+        for a plugin update. Default is 0: no limit.
+        """
+        self._update_executor = None
+        # Running update (future) for each plugin chain (key is the first plugin of the chain)
+        self._update_futures = {}
+        # Updates finished after the update_timeout deadline, committed by the next update
+        self._late_updates = []
+        self.update_workers = 0
+        self.update_timeout = None
+
+        if config is not None and config.has_section('global'):
+            self.update_workers = config.get_int_value('global', 'update_workers', default=0)
+            update_timeout = config.get_float_value('global', 'update_timeout', default=0)
+            if update_timeout > 0:
+                self.update_timeout = update_timeout
+
+        if self.update_workers > 0:
+            logger.info(
+                "Plugins are updated in parallel ({} workers, timeout: {})".format(
+                    self.update_workers, self.update_timeout
+                )
+            )
+            self._update_executor = ThreadPoolExecutor(
+                max_workers=self.update_workers, thread_name_prefix='glances_update'
+            )
+
+    def load_scheduler(self):
+        """Init the plugins update scheduler.
+
+        Each plugin is updated according to its own refresh rate
+        (<plugin>_refresh limit or the global refresh rate).
+        """
+        self.scheduler = GlancesScheduler()
+        for p in self._plugins:
+            # The refresh rate is managed by the scheduler, not by the plugin itself
+            self._plugins[p].refresh_scheduled = True
+            self.scheduler.add(p, self._plugins[p].get_refresh)
+
+    def time_until_next_update(self):
+        """Return the time (in seconds) until the next plugin update deadline."""
+        return self.scheduler.time_until_next()
+
+    def get_schedule_drift(self):
+        """Return the last schedule drift (in seconds) of the plugins (dict)."""
+        return self.scheduler.get_drift()
+
+    def _update_chains(self, plugins=None):
+        """Return the plugins update chains (dict).
+
+        Key is the first plugin of the chain and value is the list of plugins
+        to update one after the other: the plugin itself and the plugins which
+        depends on it (see the depends_on attribute of the plugins).
+
+        Only the enabled plugins of the given list are taken into account
+        (default is all the plugins).
+        """
+        if plugins is None:
+            plugins = self._plugins
+        enabled = [p for p in plugins if self._plugins[p].is_enabled()]
+        children = collections.defaultdict(list)
+        roots = []
+        for p in enabled:
+            if self._plugins[p].depends_on in enabled:
+                children[self._plugins[p].depends_on].append(p)
+            else:
+                roots.append(p)
+
+        ret = {}
+        for root in roots:
+            # Depth first order (iterative: no closure reference cycle at each update)
+            ret[root] = []
+            stack = [root]
+            while stack:
+                p = stack.pop()
+                ret[root].append(p)
+                stack.extend(reversed(children[p]))
+        return ret
+
+    def _update_chain(self, chain):
+        """Update the stats of the given plugins list, one after the other.
+
+        The stats are not published: the new stats of the plugins are
+        returned (dict) and committed by the main thread (see _commit_chain).
+        """
+        return {p: self._plugins[p].update_deferred() for p in chain}
+
+    def _commit_chain(self, p, future):
+        """Commit the stats of the update chain p (future of _update_chain), then update their history and views."""
+        if future.exception() is not None:
+            logger.error("Error while updating the {} plugin ({})".format(p, future.exception()))
+            return
+        for c, stats in future.result().items():
+            self._plugins[c].commit_update(stats)
+            self._update_history_and_views(c)
+
+    def _update_history_and_views(self, p):
+        """Update the history and the views of the plugin p (and record their durations)."""
+        plugin = self._plugins[p]
+        start = perf_counter()
+        plugin.update_stats_history()
+        history_end = perf_counter()
+        plugin.update_views()
+        plugin.timings.add('update_stats_history', history_end - start)
+        plugin.timings.add('update_views', perf_counter() - history_end)
+
+    def update_parallel(self, chains):
+        """Update the plugins stats of the given chains using the update executor.
+
+        Independent plugins are updated concurrently. If a plugin is not
+        updated before the update_timeout deadline, the last stats are kept
+        and a new update is not started until the running one is finished
+        (its stats are committed by the next update).
+        The new stats are committed, then the history and the views are
+        updated, by the calling thread, one plugin at a time.
+        """
+        # Commit the updates finished after the previous deadline
+        late_updates = self._late_updates
+        self._late_updates = []
+        for p, future in late_updates:
+            if future.done():
+                self._commit_chain(p, future)
+            else:
+                self._late_updates.append((p, future))
+
+        # Start the update of all the chains
+        futures = {}
+        for p in chains:
+            if any(c in self._update_futures and not self._update_futures[c].done() for c in chains[p]):
+                logger.debug("Plugin {} update is still running, keep the last stats".format(p))
+                for c in chains[p]:
+                    self._plugins[c].timings.skip('update')
+                continue
+            futures[p] = self._update_executor.submit(self._update_chain, chains[p])
+            for c in chains[p]:
+                self._update_futures[c] = futures[p]
+
+        # Wait the end of the updates (or the deadline)
+        done, _ = wait(futures.values(), timeout=self.update_timeout)
+
+        for p in futures:
+            if futures[p] not in done:
+                logger.warning("Plugin {} update timeout ({} seconds)".format(p, self.update_timeout))
+                self._late_updates.append((p, futures[p]))
+                continue
+            self._commit_chain(p, futures[p])
+
     def update(self):
-        """Wrapper method to update the stats."""
+        """Wrapper method to update the stats.
+
+        Only the plugins with a due refresh deadline are updated.
+        """
         # For standalone and server modes
+        due = self.scheduler.pop_due()
+        # The other plugins are skipped by their refresh timer
+        for p in set(self._plugins) - set(due):
+            if self._plugins[p].is_loaded() and self._plugins[p].is_enabled():
+                self._plugins[p].timings.skip('update')
+        chains = self._update_chains(due)
+
+        if self._update_executor is not None:
+            return self.update_parallel(chains)
+
         # For each plugins, call the update method
-        for p in self._plugins:
-            if self._plugins[p].is_disabled():
-                # If current plugin is disable
-                # then continue to next plugin
-                continue
-            # Update the stats...
-            self._plugins[p].update()
-            # ... the history
-            self._plugins[p].update_stats_history()
-            # ... and the views
-            self._plugins[p].update_views()
+        for p in chains:
+            for c in chains[p]:
+                # Update the stats...
+                self._plugins[c].update()
+                # ... the history and the views
+                self._update_history_and_views(c)
 
     def export(self, input_stats=None):
         """Export all the stats.
@@ -297,6 +637,17 @@ class GlancesStats(object):
             plugin_list = self.getPluginsList()
         return {p: self._plugins[p].limits for p in plugin_list}
 
+    def getAllTimingsAsDict(self, plugin_list=None):
+        """Return the update, history and views durations of the plugins (dict).
+
+        Default behavior is to return the timings of the enabled plugins
+        if plugin_list is provided, only return timings of given plugin (list)
+        The plugins not loaded yet (never updated) have no timings.
+        """
+        if plugin_list is None:
+            plugin_list = [p for p in self._plugins if self._plugins[p].is_enabled()]
+        return {p: self._plugins[p].timings.get() for p in plugin_list if self._plugins[p].is_loaded()}
+
     def getAllViews(self):
         """Return the plugins views."""
         return [self._plugins[p].get_views() for p in self._plugins]
@@ -318,6 +669,9 @@ class GlancesStats(object):
 
     def end(self):
         """End of the Glances stats."""
+        # Stop the update executor (do not wait for blocked plugins)
+        if self._update_executor is not None:
+            self._update_executor.shutdown(wait=False)
         # Close export modules
         for e in self._exports:
             self._exports[e].exit()
@@ -92,8 +92,8 @@ class GlancesStatsClientSNMP(GlancesStats):
 
     def update(self):
         """Update the stats using SNMP."""
-        # For each plugins, call the update method
-        for p in self._plugins:
+        # For each plugins with a due refresh deadline, call the update method
+        for p in self.scheduler.pop_due():
             if self._plugins[p].is_disabled():
                 # If current plugin is disable
                 # then continue to next plugin
@@ -9,12 +9,17 @@
 
 """The timer manager."""
 
+from collections import deque
+from math import ceil
 from time import time
 from datetime import datetime
 
 # Global list to manage the elapsed time
 last_update_times = {}
 
+# Global dict of the plugins timings (key is the plugin name)
+plugins_timings = {}
+
 
 def getTimeSinceLastUpdate(IOType):
     """Return the elapsed time since last update."""
@@ -71,3 +76,56 @@ class Counter(object):
 
     def get(self):
         return (datetime.now() - self.target).total_seconds()
+
+
+class GlancesTimings(object):
+
+    """The timings class. Durations statistics of the operations of a plugin.
+
+    For each operation (update, update_stats_history, update_views...), store
+    the last duration, the mean duration, the 95th percentile of the last
+    durations and the number of runs skipped (the refresh time is not reached).
+    """
+
+    def __init__(self, size=100):
+        # Number of durations used to compute the 95th percentile
+        self.size = size
+        self._timings = {}
+
+    def _get(self, operation):
+        if operation not in self._timings:
+            self._timings[operation] = {
+                'durations': deque(maxlen=self.size),
+                'count': 0,
+                'total': 0.0,
+                'skipped': 0,
+            }
+        return self._timings[operation]
+
+    def add(self, operation, duration):
+        """Add a duration (in seconds) for the given operation."""
+        timing = self._get(operation)
+        timing['durations'].append(duration)
+        timing['count'] += 1
+        timing['total'] += duration
+
+    def skip(self, operation):
+        """Count a skipped run of the given operation."""
+        self._get(operation)['skipped'] += 1
+
+    def get(self):
+        """Return the timings (dict of dict, key is the operation).
+
+        Durations are in seconds.
+        """
+        ret = {}
+        for operation, timing in self._timings.items():
+            durations = sorted(timing['durations'])
+            ret[operation] = {
+                'last': timing['durations'][-1] if durations else None,
+                'mean': timing['total'] / timing['count'] if timing['count'] else None,
+                'p95': durations[int(ceil(0.95 * len(durations))) - 1] if durations else None,
+                'count': timing['count'],
+                'skipped': timing['skipped'],
+            }
+        return ret
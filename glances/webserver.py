@@ -27,6 +27,9 @@ class GlancesWebServer(object):
             # Ignore kernel threads in process list
             glances_processes.disable_kernel_threads()
 
+        # The API gives the stats of all the processes
+        glances_processes.full_stats = True
+
         # Initial system information update
         self.stats.update()
 
@@ -55,6 +55,7 @@ def get_install_extras_require():
         'action': ['chevron'],
         'browser': ['zeroconf>=0.19.1'],
         'cloud': ['requests'],
+        'columnar': ['numpy'],
         'containers': ['docker>=6.1.1', 'python-dateutil', 'six', 'podman', 'packaging'],
         'export': ['bernhard', 'cassandra-driver', 'couchdb', 'elasticsearch',
                    'graphitesender', 'influxdb>=1.0.0', 'influxdb-client', 'pymongo',
@@ -64,6 +65,7 @@ def get_install_extras_require():
         'gpu': ['py3nvml'],
         'graph': ['pygal'],
         'ip': ['netifaces'],
+        'msgpack': ['msgpack>=1.0'],
         'raid': ['pymdstat'],
         'smart': ['pySMART.smartx'],
         'snmp': ['pysnmp'],
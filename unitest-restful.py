@@ -10,15 +10,18 @@
 
 """Glances unitary tests suite for the RESTful API."""
 
+import http.client
 import os
 import shlex
 import subprocess
 import time
+import json
 import numbers
 import unittest
 
 from glances import __version__
-from glances.globals import text_type
+from glances.delta import json_patch_apply
+from glances.globals import msgpack, msgpack_loads, text_type
 
 import requests
 
@@ -112,7 +115,7 @@ class TestGlances(unittest.TestCase):
                 self.assertIsInstance(req.json(), text_type)
             elif p in ('fs', 'percpu', 'sensors', 'alert', 'processlist', 'diskio',
                        'hddtemp', 'batpercent', 'network', 'folders', 'amps', 'ports',
-                       'irq', 'wifi', 'gpu'):
+                       'irq', 'wifi', 'gpu', 'timings'):
                 self.assertIsInstance(req.json(), list)
             elif p in ('psutilversion', 'help'):
                 pass
@@ -211,6 +214,14 @@ class TestGlances(unittest.TestCase):
         self.assertIsInstance(req.json(), dict)
         self.assertIsInstance(req.json()['system'], list)
         self.assertTrue(len(req.json()['system']) > 1)
+        print("HTTP RESTful request: %s/cpu/system/%s?resolution=60" % (URL, method))
+        req = self.http_get("%s/cpu/system/%s?resolution=60" % (URL, method))
+        self.assertIsInstance(req.json(), dict)
+        self.assertIsInstance(req.json()['system'], list)
+        self.assertTrue(len(req.json()['system']) > 0)
+        print("HTTP RESTful request: %s/cpu/system/%s?resolution=foo" % (URL, method))
+        req = self.http_get("%s/cpu/system/%s?resolution=foo" % (URL, method))
+        self.assertEqual(req.status_code, 400)
 
     def test_011_issue1401(self):
         """Check issue #1401."""
@@ -231,6 +242,230 @@ class TestGlances(unittest.TestCase):
         self.assertTrue(req.ok)
         self.assertEqual(req.text, "Active")
 
+    def test_013_internal_timings(self):
+        """Check the plugins timings endpoint."""
+        method = "internal/timings"
+        print('INFO: [TEST_013] Plugins timings')
+        print("HTTP RESTful request: %s/%s" % (URL, method))
+        req = self.http_get("%s/%s" % (URL, method))
+
+        self.assertTrue(req.ok)
+        self.assertIsInstance(req.json(), dict)
+        self.assertIn('cpu', req.json())
+        self.assertIn('p95', req.json()['cpu']['update'])
+
+    def test_014_history_stats(self):
+        """Check the history statistics endpoint."""
+        method = "history/stats"
+        print('INFO: [TEST_014] History statistics')
+        print("HTTP RESTful request: %s/cpu/system/%s?window=600&agg=mean,p95,count" % (URL, method))
+        req = self.http_get("%s/cpu/system/%s?window=600&agg=mean,p95,count" % (URL, method))
+
+        self.assertTrue(req.ok)
+        self.assertIsInstance(req.json(), dict)
+        self.assertEqual(sorted(req.json()['system']), ['count', 'mean', 'p95'])
+        self.assertTrue(req.json()['system']['count'] > 0)
+        print("HTTP RESTful request: %s/cpu/system/%s?agg=foo" % (URL, method))
+        req = self.http_get("%s/cpu/system/%s?agg=foo" % (URL, method))
+        self.assertEqual(req.status_code, 400)
+        print("HTTP RESTful request: %s/cpu/foo/%s" % (URL, method))
+        req = self.http_get("%s/cpu/foo/%s" % (URL, method))
+        self.assertEqual(req.status_code, 404)
+
+    def test_015_etag(self):
+        """Check the ETag of the cached responses."""
+        method = "cpu"
+        print('INFO: [TEST_015] ETag')
+        print("HTTP RESTful request: %s/%s" % (URL, method))
+        req = self.http_get("%s/%s" % (URL, method))
+        self.assertTrue(req.ok)
+        etag = req.headers['ETag']
+        req = requests.get("%s/%s" % (URL, method), headers={'Accept-encoding': 'identity', 'If-None-Match': etag})
+        # HTTP/304 until the next stats update
+        self.assertIn(req.status_code, [200, 304])
+        if req.status_code == 200:
+            self.assertNotEqual(req.headers['ETag'], etag)
+        else:
+            self.assertEqual(req.text, '')
+        req = requests.get("%s/%s" % (URL, method), headers={'Accept-encoding': 'identity', 'If-None-Match': '"foo"'})
+        self.assertEqual(req.status_code, 200)
+        self.assertIsInstance(req.json(), dict)
+
+    def test_016_stream(self):
+        """Check the Server-Sent Events stream."""
+        method = "stream?plugins=cpu,mem"
+        print('INFO: [TEST_016] Stats stream')
+        print("HTTP RESTful request: %s/%s" % (URL, method))
+        req = requests.get("%s/%s" % (URL, method), stream=True, timeout=10)
+        self.assertTrue(req.ok)
+        self.assertTrue(req.headers['Content-Type'].startswith('text/event-stream'))
+        events = []
+        ids = []
+        for line in req.iter_lines(decode_unicode=True):
+            if line.startswith('id: '):
+                ids.append(line[len('id: '):])
+            if line.startswith('data: '):
+                events.append(json.loads(line[len('data: '):]))
+            if len(events) == 2:
+                break
+        req.close()
+        # The event id is the cycle id (since parameter of the delta API)
+        req = self.http_get("%s/all?since=%s" % (URL, ids[-1]))
+        self.assertEqual(req.json()['since'], ids[-1])
+        self.assertEqual(ids[-1].split('-')[0], req.headers['X-Glances-Cycle'].split('-')[0])
+        self.assertEqual(sorted(events[0]), ['cpu', 'mem'])
+        self.assertIsInstance(events[1]['cpu'], dict)
+        # The stream does not block the others requests
+        self.assertTrue(self.http_get("%s/status" % URL).ok)
+        print("HTTP RESTful request: %s/stream?plugins=foo" % URL)
+        req = self.http_get("%s/stream?plugins=foo" % URL)
+        self.assertEqual(req.status_code, 400)
+
+    def test_017_all_since(self):
+        """Check the stats delta."""
+        method = "all"
+        print('INFO: [TEST_017] Stats delta')
+        print("HTTP RESTful request: %s/%s?since=" % (URL, method))
+        req = self.http_get("%s/%s?since=" % (URL, method))
+        self.assertTrue(req.ok)
+        cycle = req.json()['cycle']
+        self.assertEqual(req.headers['X-Glances-Cycle'], cycle)
+        stats = json_patch_apply(None, req.json()['patch'])
+        self.assertIn('cpu', stats)
+        time.sleep(1.5)
+        print("HTTP RESTful request: %s/%s?since=%s" % (URL, method, cycle))
+        req = self.http_get("%s/%s?since=%s" % (URL, method, cycle))
+        self.assertTrue(req.ok)
+        self.assertEqual(req.json()['since'], cycle)
+        self.assertNotEqual(req.json()['cycle'], cycle)
+        stats = json_patch_apply(stats, req.json()['patch'])
+        self.assertIn('cpu', stats)
+        # The cycle id and the ETag are readable by the cross-origin clients
+        self.assertIn('X-Glances-Cycle', req.headers['Access-Control-Expose-Headers'])
+        self.assertIn('ETag', req.headers['Access-Control-Expose-Headers'])
+        # The ETag depends on the since cycle
+        etag = req.headers['ETag']
+        req = self.http_get("%s/%s?since=" % (URL, method))
+        if req.headers['X-Glances-Cycle'] == req.json()['cycle'] and req.json()['cycle'] in etag:
+            self.assertNotEqual(req.headers['ETag'], etag)
+
+    def test_018_background_refresh(self):
+        """Check that the stats are refreshed without request."""
+        method = "all"
+        print('INFO: [TEST_018] Background stats refresh')
+        req = self.http_get("%s/%s" % (URL, method))
+        self.assertTrue(req.ok)
+        cycle = int(req.headers['X-Glances-Cycle'].split('-')[1])
+        # The server cache time is 1 second (default)
+        time.sleep(2.5)
+        req = self.http_get("%s/%s" % (URL, method))
+        self.assertTrue(req.ok)
+        self.assertGreaterEqual(int(req.headers['X-Glances-Cycle'].split('-')[1]), cycle + 2)
+
+    def test_019_keepalive(self):
+        """Check the HTTP/1.1 keep-alive."""
+        print('INFO: [TEST_019] HTTP/1.1 keep-alive')
+        conn = http.client.HTTPConnection('localhost', SERVER_PORT)
+        conn.request('GET', '/api/%s/cpu' % API_VERSION)
+        req = conn.getresponse()
+        self.assertEqual(req.status, 200)
+        self.assertEqual(req.version, 11)
+        req.read()
+        sock = conn.sock
+        # The second request uses the same connection
+        conn.request('GET', '/api/%s/mem' % API_VERSION)
+        req = conn.getresponse()
+        self.assertEqual(req.status, 200)
+        self.assertTrue(isinstance(json.loads(req.read()), dict))
+        self.assertIs(conn.sock, sock)
+        conn.close()
+
+    def test_020_query(self):
+        """Check the list plugins query parameters."""
+        method = "processlist"
+        print('INFO: [TEST_020] Stats query')
+        print("HTTP RESTful request: %s/%s?fields=pid,cpu_percent&sort=-cpu_percent&limit=3" % (URL, method))
+        req = self.http_get("%s/%s?fields=pid,cpu_percent&sort=-cpu_percent&limit=3" % (URL, method))
+        self.assertTrue(req.ok)
+        stats = req.json()
+        self.assertLessEqual(len(stats), 3)
+        for stat in stats:
+            self.assertEqual(set(stat), set(['pid', 'cpu_percent']))
+        cpu = [s['cpu_percent'] for s in stats if s['cpu_percent'] is not None]
+        self.assertEqual(cpu, sorted(cpu, reverse=True))
+        req = self.http_get("%s/%s/pid?where=pid<=1000&sort=pid" % (URL, method))
+        self.assertTrue(req.ok)
+        pids = req.json()['pid']
+        self.assertEqual(pids, sorted(pids))
+        self.assertTrue(all(p <= 1000 for p in pids))
+        req = self.http_get("%s/%s?limit=-1" % (URL, method))
+        self.assertEqual(req.status_code, 400)
+        req = self.http_get("%s/cpu?sort=user" % URL)
+        self.assertEqual(req.status_code, 400)
+
+    def test_021_msgpack(self):
+        """Check the MessagePack content negotiation."""
+        method = "all"
+        print('INFO: [TEST_021] MessagePack format')
+        print("HTTP RESTful request: %s/%s (Accept: application/msgpack)" % (URL, method))
+        req = requests.get("%s/%s" % (URL, method), headers={'Accept': 'application/msgpack'})
+        self.assertTrue(req.ok)
+        if msgpack is None:
+            # Fallback to JSON
+            self.assertTrue(req.headers['Content-Type'].startswith('application/json'))
+            stats = req.json()
+        else:
+            self.assertEqual(req.headers['Content-Type'], 'application/msgpack')
+            stats = msgpack_loads(req.content)
+        self.assertIn('cpu', stats)
+        req = requests.get("%s/cpu" % URL, headers={'Accept': 'application/msgpack'})
+        self.assertTrue(req.ok)
+        self.assertIn('total', req.json() if msgpack is None else msgpack_loads(req.content))
+
+    def test_022_requests_counters(self):
+        """Check the requests counters."""
+        method = "internal/requests"
+        print('INFO: [TEST_022] Requests counters')
+        print("HTTP RESTful request: %s/%s" % (URL, method))
+        req = requests.get("%s/%s" % (URL, method))
+        self.assertTrue(req.ok)
+        counters = req.json()
+        for counter in ['requests', 'rate_limited', 'rate_limit', 'rate_limit_burst', 'clients', 'builds', 'coalesced']:
+            self.assertIn(counter, counters)
+        # Rate limit disabled by default
+        self.assertEqual(counters['rate_limit'], 0)
+        self.assertEqual(counters['rate_limited'], 0)
+        self.assertGreater(counters['requests'], 0)
+        self.assertGreater(counters['builds'], 0)
+        req = requests.get("%s/%s" % (URL, method))
+        self.assertGreater(req.json()['requests'], counters['requests'])
+
+    def test_023_static_files(self):
+        """Check the Web UI static files."""
+        print('INFO: [TEST_023] Web UI static files')
+        root_url = URL.split('/api/')[0]
+        with open('./glances/outputs/static/public/glances.js', 'rb') as f:
+            glances_js = f.read()
+        req = requests.get(root_url + '/')
+        self.assertTrue(req.ok)
+        self.assertIn('glances.js?v=', req.text)
+        version = req.text.split('glances.js?v=')[1].split('"')[0]
+        req = requests.get(root_url + '/glances.js?v=' + version, headers={'Accept-Encoding': 'gzip'})
+        self.assertTrue(req.ok)
+        self.assertEqual(req.headers['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', req.headers['Cache-Control'])
+        self.assertEqual(req.content, glances_js)
+        req = requests.get(root_url + '/glances.js', headers={'Accept-Encoding': 'identity'})
+        self.assertEqual(req.headers['Content-Encoding'], 'identity')
+        self.assertEqual(req.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(req.content, glances_js)
+        req = requests.get(
+            root_url + '/glances.js', headers={'Accept-Encoding': 'identity', 'If-None-Match': req.headers['ETag']}
+        )
+        self.assertEqual(req.status_code, 304)
+        req = requests.get(root_url + '/notfound.js')
+        self.assertEqual(req.status_code, 404)
+
     def test_999_stop_server(self):
         """Stop the Glances Web Server."""
         print('INFO: [TEST_999] Stop the Glances Web Server')
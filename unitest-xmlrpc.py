@@ -12,13 +12,15 @@
 
 import os
 import json
+import zlib
 import shlex
 import subprocess
 import time
 import unittest
 
 from glances import __version__
-from glances.globals import ServerProxy
+from glances.delta import json_patch_apply
+from glances.globals import Fault, ServerProxy, msgpack, msgpack_loads
 
 SERVER_PORT = 61234
 URL = "http://localhost:%s" % SERVER_PORT
@@ -185,6 +187,45 @@ class TestGlances(unittest.TestCase):
         req = json.loads(client.getViewsCpu())
         self.assertIsInstance(req, dict)
 
+    def test_014_all_since(self):
+        """All stats delta."""
+        method = "getAllSince()"
+        print('INFO: [TEST_014] Method: %s' % method)
+
+        req = json.loads(client.getAllSince(''))
+        # Unknown cycle: the whole stats are replaced
+        self.assertEqual(req['patch'][0]['op'], 'replace')
+        self.assertEqual(req['patch'][0]['path'], '')
+        stats = json_patch_apply(None, req['patch'])
+        self.assertIn('cpu', stats)
+        time.sleep(1.5)
+        delta = json.loads(client.getAllSince(req['cycle']))
+        self.assertEqual(delta['since'], req['cycle'])
+        self.assertNotEqual(delta['cycle'], req['cycle'])
+        self.assertIsInstance(delta['patch'], list)
+        stats = json_patch_apply(stats, delta['patch'])
+        self.assertIn('cpu', stats)
+
+    def test_015_plugin_value(self):
+        """Plugin item value."""
+        print('INFO: [TEST_015] Get the processlist stats of a given pid')
+        req = json.loads(client.getPluginValue('processlist', 'pid', str(pid.pid)))
+        self.assertEqual(len(req[str(pid.pid)]), 1)
+        self.assertEqual(req[str(pid.pid)][0]['pid'], pid.pid)
+        self.assertIsNone(json.loads(client.getPluginValue('processlist', 'unknown', 'value')))
+
+    def test_016_all_packed(self):
+        """All in the MessagePack format."""
+        method = "getAllPacked()"
+        print('INFO: [TEST_016] Method: %s' % method)
+        if msgpack is None:
+            self.assertRaises(Fault, client.getAllPacked)
+            return
+        req = msgpack_loads(zlib.decompress(client.getAllPacked().data))
+        # Same stats as getAll()
+        self.assertIsInstance(req, dict)
+        self.assertEqual(sorted(req), sorted(json.loads(client.getAll())))
+
     def test_999_stop_server(self):
         """Stop the Glances Web Server."""
         print('INFO: [TEST_999] Stop the Glances Server')
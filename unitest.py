@@ -10,6 +10,8 @@
 
 """Glances unitary tests suite."""
 
+import json
+import os
 import time
 import unittest
 import sys
@@ -22,7 +24,7 @@ if sys.version_info < (3, 4):
 from glances.main import GlancesMain
 from glances.stats import GlancesStats
 from glances import __version__
-from glances.globals import WINDOWS, LINUX, subsample, string_value_to_float
+from glances.globals import WINDOWS, LINUX, json_dumps, subsample, string_value_to_float
 from glances.outputs.glances_bars import Bar
 from glances.thresholds import GlancesThresholdOk
 from glances.thresholds import GlancesThresholdCareful
@@ -32,6 +34,7 @@ from glances.thresholds import GlancesThresholds
 from glances.plugins.plugin.model import GlancesPluginModel
 from glances.programs import processes_to_programs
 from glances.secure import secure_popen
+from glances.proctable import numpy_tag
 
 # Global variables
 # =================
@@ -295,6 +298,694 @@ class TestGlances(unittest.TestCase):
         self.assertEqual(string_value_to_float('12'), 12)
         self.assertEqual(string_value_to_float('--'), None)
 
+    def test_019_parallel_update(self):
+        """Check the parallel plugins update."""
+        print('INFO: [TEST_019] Check the parallel plugins update')
+        test_config.set_default('global', 'update_workers', '4')
+        stats.load_update_executor(config=test_config)
+        self.assertIsNotNone(stats._update_executor)
+        # processlist should be updated in the same chain than processcount
+        chains = stats._update_chains()
+        self.assertIn('processcount', chains)
+        self.assertNotIn('processlist', chains)
+        self.assertIn('processlist', chains['processcount'])
+        stats.update()
+        stats.update()
+        self.assertTrue(type(stats.get_plugin('processlist').get_raw()) is list)
+        self.assertTrue(type(stats.get_plugin('cpu').get_views()) is dict)
+        # The stats updated by a worker are only published when they are committed
+        plugin = stats.get_plugin('mem')
+        current = plugin.get_raw()
+        new = stats._update_executor.submit(plugin.update_deferred).result()
+        self.assertIsNot(new, current)
+        self.assertIs(plugin.get_raw(), current)
+        plugin.commit_update(new)
+        self.assertIs(plugin.get_raw(), new)
+        # Back to the serial update
+        stats._update_executor.shutdown()
+        test_config.parser.remove_option('global', 'update_workers')
+        stats.load_update_executor(config=test_config)
+        self.assertIsNone(stats._update_executor)
+
+    def test_020_scheduler(self):
+        """Check the plugins update scheduler."""
+        print('INFO: [TEST_020] Check the plugins update scheduler')
+        from glances.scheduler import GlancesScheduler
+        scheduler = GlancesScheduler(tolerance=0)
+        scheduler.add('fast', lambda: 1, due=0)
+        scheduler.add('slow', lambda: 60, due=0)
+        self.assertEqual(scheduler.pop_due(now=100), ['fast', 'slow'])
+        self.assertEqual(scheduler.pop_due(now=100.5), [])
+        self.assertEqual(scheduler.time_until_next(now=100.5), 0.5)
+        self.assertEqual(scheduler.pop_due(now=101.2), ['fast'])
+        self.assertAlmostEqual(scheduler.get_drift()['fast'], 0.2)
+        # Next deadline is anchored on the previous one
+        self.assertEqual(scheduler.get_schedule()['fast'], 102)
+        self.assertEqual(scheduler.get_schedule()['slow'], 160)
+        # The default due time is read from the monotonic clock
+        scheduler.add('now', lambda: 1)
+        self.assertLessEqual(scheduler.get_schedule()['now'], time.monotonic())
+
+    def test_021_lazy_plugin(self):
+        """Check the plugins lazy loading."""
+        print('INFO: [TEST_021] Check the plugins lazy loading')
+        from glances.manifest import GlancesManifest
+        from glances.stats import GlancesLazyPlugin
+        manifest = GlancesManifest()
+        self.assertIn('mem', manifest.plugins)
+        self.assertIn('csv', manifest.exports)
+        profile = {}
+        plugin = GlancesLazyPlugin('mem', args=test_args, config=test_config, profile=profile)
+        plugin.refresh_scheduled = True
+        self.assertFalse(plugin.is_loaded())
+        self.assertTrue(plugin.is_enabled())
+        self.assertEqual(plugin.get_refresh(), test_args.time)
+        self.assertTrue(plugin.refresh_scheduled)
+        self.assertNotIn('mem', profile)
+        # First use imports and inits the plugin
+        plugin.update()
+        self.assertTrue(plugin.is_loaded())
+        self.assertTrue(plugin.load().refresh_scheduled)
+        self.assertIn('total', plugin.get_raw())
+        self.assertIn('mem', profile)
+        self.assertIn('mem', stats.get_startup_profile()['plugins'])
+        # The stats, views and display of a not loaded plugin are available without loading it
+        self.assertEqual(manifest.init_values['sensors'], [])
+        self.assertIsNone(manifest.init_values['psutilversion'])
+        plugin = GlancesLazyPlugin('sensors', args=test_args, config=test_config, init_value=[])
+        self.assertEqual(plugin.get_raw(), [])
+        self.assertEqual(plugin.get_export(), [])
+        self.assertEqual(plugin.get_stats(), '[]')
+        self.assertEqual(plugin.get_views(), {})
+        self.assertEqual(plugin.get_stats_display(args=test_args)['msgdict'], [])
+        self.assertFalse(plugin.is_loaded())
+        # The cache is outdated if a plugin model.py is modified
+        import tempfile
+        manifest.cache_file = os.path.join(tempfile.mkdtemp(), 'glances-manifest.json')
+        manifest._save_cache()
+        self.assertEqual(manifest._load_cache()['init_values'], manifest.init_values)
+        manifest.data['models_mtime']['sensors'] -= 1
+        manifest._save_cache()
+        self.assertEqual(manifest._load_cache(), {})
+        # The processes configuration is loaded before the first scan (by the processcount plugin)
+        import copy
+        from glances.plugins.processcount.model import PluginModel
+        from glances.processes import glances_processes
+        sort_key, auto_sort = glances_processes.sort_key, glances_processes.auto_sort
+        args = copy.copy(test_args)
+        args.sort_processes_key = 'name'
+        PluginModel(args=args, config=test_config)
+        self.assertEqual(glances_processes.sort_key, 'name')
+        glances_processes.set_sort_key('auto' if auto_sort else sort_key, False)
+
+    def test_022_timings(self):
+        """Check the plugins timings."""
+        print('INFO: [TEST_022] Check the plugins timings')
+        from glances.timer import GlancesTimings
+        timings = GlancesTimings(size=20)
+        for i in range(1, 21):
+            timings.add('update', i / 10.0)
+        timings.skip('update')
+        self.assertEqual(timings.get()['update']['last'], 2.0)
+        self.assertAlmostEqual(timings.get()['update']['mean'], 1.05)
+        self.assertEqual(timings.get()['update']['p95'], 1.9)
+        self.assertEqual(timings.get()['update']['count'], 20)
+        self.assertEqual(timings.get()['update']['skipped'], 1)
+        stats.update()
+        all_timings = stats.getAllTimingsAsDict()
+        self.assertIn('cpu', all_timings)
+        self.assertLessEqual(set(all_timings), set(stats.getPluginsList()))
+        for operation in ['update', 'update_stats_history', 'update_views']:
+            self.assertGreater(all_timings['cpu'][operation]['count'], 0)
+            self.assertGreaterEqual(all_timings['cpu'][operation]['last'], 0)
+        # The plugins not due are skipped by the scheduler
+        skipped = all_timings['cpu']['update']['skipped']
+        stats.update()
+        self.assertEqual(stats.getAllTimingsAsDict()['cpu']['update']['skipped'], skipped + 1)
+
+    def test_023_history_ring_buffer(self):
+        """Check the history ring buffer."""
+        print('INFO: [TEST_023] Check the history ring buffer')
+        from glances.attribute import GlancesAttribute
+        a = GlancesAttribute('a', history_max_size=4)
+        for i in range(10):
+            a.value = i
+        self.assertEqual(a.history_len(), 4)
+        self.assertEqual([v for _, v in a.history_raw()], [6, 7, 8, 9])
+        self.assertEqual([v for _, v in a.history_raw(nb=2)], [8, 9])
+        self.assertEqual(a.history_value(pos=4)[1], 6)
+        timestamps, values = a.history_arrays(nb=2)
+        self.assertEqual(list(values), [8, 9])
+        self.assertLessEqual(timestamps[0], timestamps[1])
+        a.value = None
+        self.assertIsNone(a.history_value()[1])
+        # Not a number value
+        a.value = [1, 2]
+        self.assertEqual([v for _, v in a.history_raw()], [8, 9, None, [1, 2]])
+        a.history_reset()
+        self.assertEqual(a.history_len(), 0)
+
+    def test_024_history_rollups(self):
+        """Check the history rollups."""
+        print('INFO: [TEST_024] Check the history rollups')
+        from glances.attribute import GlancesAttribute
+        a = GlancesAttribute('a', history_max_size=4, history_rollups=[(10, 2), (60, 10)])
+        # One value per second during 35 seconds
+        for i in range(35):
+            a.history_add((1000 * 60 + i, float(i)))
+        a.history_add((1000 * 60 + 35, None))
+        # Raw history
+        self.assertEqual(len(a.history_raw()), 4)
+        self.assertEqual(a.history_raw(resolution=5), a.history_raw())
+        # 10 seconds resolution (2 consolidated periods + the current one)
+        rollup = a.history_raw(resolution=10)
+        self.assertEqual(len(rollup), 3)
+        self.assertEqual(rollup[0][1:], (14.5, 10, 19))
+        self.assertEqual(rollup[-1][1:], (32.0, 30, 34))
+        self.assertEqual(len(a.history_raw(nb=1, resolution=30)), 1)
+        # 1 minute resolution
+        rollup = a.history_json(resolution=60)
+        self.assertEqual(len(rollup), 1)
+        self.assertEqual(rollup[0][1:], (17.0, 0, 34))
+        a.history_reset()
+        self.assertEqual(a.history_raw(resolution=60), [])
+
+    def test_024_history_rollups_config(self):
+        """Check the history rollups configuration value."""
+        print('INFO: [TEST_024] Check the history rollups configuration value')
+        plugin = stats.get_plugin('cpu')
+        self.assertEqual(plugin.load_history_rollups('60:1440, 900:2880'), [[60.0, 1440], [900.0, 2880]])
+        # Malformed, null or negative tiers are ignored
+        self.assertEqual(plugin.load_history_rollups('foo,0:10,60:0,-1:5,nan:5,inf:5,60:-1,10:2'), [[10.0, 2]])
+
+    def test_025_history_mmap(self):
+        """Check the persistent (memory-mapped) history."""
+        print('INFO: [TEST_025] Check the persistent history')
+        import os
+        import tempfile
+        from glances.attribute import GlancesAttributeMmap
+        history_file = os.path.join(tempfile.mkdtemp(), 'cpu', 'user.hist')
+        a = GlancesAttributeMmap('user', history_max_size=4, history_rollups=[(60, 2)], history_file=history_file)
+        for i in range(6):
+            a.history_add((1000 * 60 + i, float(i)))
+        a.history_add((1000 * 60 + 6, 'not a number'))
+        self.assertEqual([v for _, v in a.history_raw()], [3, 4, 5, None])
+        a.close()
+        # History and rollups are read back from the file
+        a = GlancesAttributeMmap('user', history_max_size=4, history_rollups=[(60, 2)], history_file=history_file)
+        self.assertEqual(a.history_len(), 4)
+        self.assertEqual([v for _, v in a.history_json(nb=2)], [5, None])
+        self.assertEqual(a.history_raw(resolution=60)[0][1:], (2.5, 0.0, 5.0))
+        for i in range(4):
+            a.history_add((1001 * 60 + i, 10.0))
+        a.close()
+        # The rollups keep the periods older than the raw history
+        a = GlancesAttributeMmap('user', history_max_size=4, history_rollups=[(60, 2)], history_file=history_file)
+        self.assertEqual([p[1:] for p in a.history_raw(resolution=60)], [(2.5, 0.0, 5.0), (10.0, 10.0, 10.0)])
+        a.close()
+        # History file is reset if the rollup tiers change
+        a = GlancesAttributeMmap('user', history_max_size=4, history_rollups=[(60, 3)], history_file=history_file)
+        self.assertEqual(a.history_len(), 0)
+        self.assertEqual(a.history_raw(resolution=60), [])
+        a.history_add((1000 * 60, 1.0))
+        a.history_reset()
+        self.assertEqual(a.history_len(), 0)
+        a.close()
+        # History file is reset if the history size changes
+        a = GlancesAttributeMmap('user', history_max_size=8, history_file=history_file)
+        self.assertEqual(a.history_len(), 0)
+        # The history file is locked: the other instances keep their history in memory
+        from glances.attribute import GlancesAttribute, fcntl
+        from glances.history import GlancesHistory
+        if fcntl is not None:
+            with self.assertRaises(OSError):
+                GlancesAttributeMmap('user', history_max_size=8, history_file=history_file)
+            history = GlancesHistory()
+            history.add('user', 1.0, history_max_size=8, history_path=os.path.dirname(history_file))
+            self.assertIs(type(history.stats_history['user']), GlancesAttribute)
+        a.close()
+        # The lock is released by close
+        a = GlancesAttributeMmap('user', history_max_size=8, history_file=history_file)
+        a.close()
+
+    def test_026_history_stats(self):
+        """Check the statistics on the history."""
+        print('INFO: [TEST_026] Check the statistics on the history')
+        from glances.attribute import GlancesAttribute
+        a = GlancesAttribute('a', history_max_size=100)
+        for i in range(1, 21):
+            a.history_add((1000 + 10 * i, float(i)))
+        a.history_add((1000 + 10 * 21, None))
+        ret = a.history_stats(agg=['min', 'max', 'mean', 'sum', 'count', 'last', 'rate', 'p95', 'p50'])
+        self.assertEqual(ret['min'], 1)
+        self.assertEqual(ret['max'], 20)
+        self.assertEqual(ret['mean'], 10.5)
+        self.assertEqual(ret['sum'], 210)
+        self.assertEqual(ret['count'], 20)
+        self.assertEqual(ret['last'], 20)
+        self.assertEqual(ret['rate'], 0.1)
+        self.assertEqual(ret['p95'], 19)
+        self.assertEqual(ret['p50'], 10)
+        # Last 50 seconds (the last value is None)
+        ret = a.history_stats(window=50, agg=['mean', 'count'], now=1000 + 10 * 21)
+        self.assertEqual(ret, {'mean': 18, 'count': 5})
+        self.assertEqual(a.history_stats(window=5, agg=['max', 'count'], now=2000), {'max': None, 'count': 0})
+        self.assertRaises(ValueError, a.history_stats, agg=['foo'])
+        self.assertRaises(ValueError, a.history_stats, agg=['p101'])
+        self.assertEqual(a.history_mean(nb=3), 19.5)
+
+    def test_027_delta(self):
+        """Check the stats delta (JSON Patch)."""
+        print('INFO: [TEST_027] Check the stats delta')
+        import copy
+        from glances.delta import GlancesDelta, json_patch, json_patch_apply
+        cpu = {'ctx_switches': 123456789, 'interrupts': 123456789, 'soft_interrupts': 123456789, 'syscalls': 0}
+        old = {'cpu': dict(cpu, user=1.0), 'fs': [{'mnt_point': '/'}, {'mnt_point': '/boot'}], 'a/b': 1}
+        new = {'cpu': dict(cpu, user=1.5, idle=3), 'fs': [{'mnt_point': '/'}], 'a/b': 2}
+        old['system'] = new['system'] = {'hostname': 'localhost' * 20}
+        patch = json_patch(old, new)
+        self.assertIn({'op': 'replace', 'path': '/cpu/user', 'value': 1.5}, patch)
+        self.assertIn({'op': 'add', 'path': '/cpu/idle', 'value': 3}, patch)
+        self.assertIn({'op': 'remove', 'path': '/fs/1'}, patch)
+        self.assertIn({'op': 'replace', 'path': '/a~1b', 'value': 2}, patch)
+        self.assertEqual(json_patch_apply(copy.deepcopy(old), patch), new)
+        self.assertEqual(json_patch_apply(copy.deepcopy(new), json_patch(new, old)), old)
+        self.assertEqual(json_patch(new, new), [])
+        # The patch is bigger than the new value: replace it
+        self.assertEqual(
+            json_patch({'l': [1, 2, 3]}, {'l': [3, 2, 1]}), [{'op': 'replace', 'path': '/l', 'value': [3, 2, 1]}]
+        )
+        delta = GlancesDelta(size=2)
+        delta.add(1, old)
+        delta.add(2, new)
+        self.assertEqual(delta.get(1, 2), patch)
+        delta.add(3, new)
+        self.assertNotIn(1, delta)
+        # Unknown cycle: replace the whole document
+        self.assertEqual(delta.get(1, 3), [{'op': 'replace', 'path': '', 'value': new}])
+        # The delta is shared by the Web server workers
+        import threading
+        delta = GlancesDelta(size=1000)
+        errors = []
+
+        def worker(n):
+            try:
+                for cycle in range(n, n + 200):
+                    delta.add(cycle, {'c': cycle})
+                    delta.get(cycle - 1, cycle)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i * 1000,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(delta), 800)
+
+    def test_028_query(self):
+        """Check the list plugins stats query."""
+        print('INFO: [TEST_028] Check the stats query')
+        from glances.query import query_stats
+        stats = [
+            {'pid': 1, 'name': 'init', 'cpu_percent': 0.5, 'cmdline': ['/sbin/init']},
+            {'pid': 2, 'name': 'python', 'cpu_percent': 12.0, 'cmdline': ['python', 'glances']},
+            {'pid': 3, 'name': 'python3', 'cpu_percent': None, 'cmdline': []},
+            {'pid': 4, 'name': 'bash', 'cpu_percent': 3.0, 'cmdline': ['bash']},
+        ]
+        self.assertEqual(query_stats(stats, sort='-cpu_percent', limit=2, fields=['pid']), [{'pid': 2}, {'pid': 4}])
+        self.assertEqual([s['pid'] for s in query_stats(stats, sort='cpu_percent')], [1, 4, 2, 3])
+        self.assertEqual([s['pid'] for s in query_stats(stats, sort='-cpu_percent')], [2, 4, 1, 3])
+        self.assertEqual([s['pid'] for s in query_stats(stats, where=['name~^python'])], [2, 3])
+        self.assertEqual([s['pid'] for s in query_stats(stats, where=['cmdline~glances'])], [2])
+        self.assertEqual([s['pid'] for s in query_stats(stats, where=['cpu_percent>1', 'pid!=2'])], [4])
+        self.assertEqual([s['pid'] for s in query_stats(stats, where=['name=bash'])], [4])
+        self.assertEqual(query_stats(stats, limit=1, fields=['name']), [{'name': 'init'}])
+        self.assertEqual(len(stats), 4)
+        self.assertEqual(query_stats({'user': 1.0, 'system': 2.0}, fields=['user']), {'user': 1.0})
+        self.assertRaises(ValueError, query_stats, {'user': 1.0}, sort='user')
+        self.assertRaises(ValueError, query_stats, stats, where=['cpu_percent>high'])
+        self.assertRaises(ValueError, query_stats, stats, where=['cpu_percent'])
+        self.assertRaises(ValueError, query_stats, [{'value': 1}, {'value': 'a'}], sort='value')
+
+    def test_029_stats_index(self):
+        """Check the list plugins stats index."""
+        print('INFO: [TEST_029] Check the stats index')
+        from glances.globals import dictlist_index
+        data = [{'pid': 1, 'name': 'a', 'cmdline': []}, {'pid': 2, 'name': 'b'}, {'pid': 3, 'name': 'a'}]
+        self.assertEqual(dictlist_index(data, 'name'), {'a': [data[0], data[2]], 'b': [data[1]]})
+        self.assertRaises(KeyError, dictlist_index, data, 'cmdline')
+        plugin = stats.get_plugin('processlist')
+        stats_grab = plugin.get_raw()
+        index = plugin.get_stats_index()
+        self.assertEqual(len(index), len(stats_grab))
+        # The index is built once per stats update
+        self.assertIs(plugin.get_stats_index('pid'), index)
+        pid = stats_grab[0]['pid']
+        self.assertEqual(index[pid], [stats_grab[0]])
+        self.assertEqual([p['pid'] for p in json.loads(plugin.get_stats_value('pid', str(pid)))[str(pid)]], [pid])
+        self.assertIsNone(plugin.get_stats_value('unknown', 'value'))
+        # New stats, new index
+        plugin.set_stats(list(stats_grab))
+        self.assertFalse(plugin.get_stats_index() is index)
+
+    def test_030_msgpack(self):
+        """Check the MessagePack encoding."""
+        print('INFO: [TEST_030] Check the MessagePack encoding')
+        from glances.globals import msgpack, msgpack_dumps, msgpack_loads
+        if msgpack is None:
+            self.assertRaises(ImportError, msgpack_dumps, {})
+            return
+        stats_grab = stats.getAllAsDict()
+        self.assertEqual(msgpack_loads(msgpack_dumps(stats_grab)), json.loads(json_dumps(stats_grab)))
+
+    def test_031_single_flight(self):
+        """Check the single flight build of the Web server responses."""
+        print('INFO: [TEST_031] Check the single flight build of the Web server responses')
+        import threading
+        from glances.outputs.glances_bottle import GlancesStatsSnapshot
+        snapshot = GlancesStatsSnapshot(1, '{"cpu": {"total": 1}}', '{}')
+        started = threading.Event()
+        release = threading.Event()
+        builds = []
+
+        def build():
+            builds.append(1)
+            started.set()
+            release.wait(5)
+            return 'body'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(snapshot.memo('cpu', build))) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for t in threads[1:]:
+            t.start()
+        while snapshot.coalesced < 4:
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, ['body'] * 5)
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(snapshot.builds, 1)
+        self.assertEqual(snapshot.memo('cpu', build), 'body')
+        self.assertEqual(snapshot.stats, {'cpu': {'total': 1}})
+        self.assertIs(snapshot.stats, snapshot.stats)
+
+    def test_032_rate_limit(self):
+        """Check the API rate limiter (token bucket)."""
+        print('INFO: [TEST_032] Check the API rate limiter')
+        from glances.outputs.glances_bottle import GlancesRateLimiter
+        limiter = GlancesRateLimiter(rate=2, burst=3)
+        self.assertEqual([limiter.acquire('a', now=0) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(limiter.acquire('a', now=0), 0.5)
+        # Other client
+        self.assertEqual(limiter.acquire('b', now=0), 0)
+        # Refilled
+        self.assertEqual(limiter.acquire('a', now=0.5), 0)
+        self.assertNotEqual(limiter.acquire('a', now=0.5), 0)
+        self.assertEqual(limiter.requests, 7)
+        self.assertEqual(limiter.limited, 2)
+        # Idle clients are removed
+        limiter.max_clients = 2
+        limiter.acquire('c', now=10)
+        self.assertEqual(len(limiter), 1)
+        # No limit
+        limiter = GlancesRateLimiter()
+        self.assertEqual(sum(limiter.acquire('a') for _ in range(100)), 0)
+        self.assertEqual(limiter.limited, 0)
+        # The HTTP/429 response has the CORS headers
+        from wsgiref.util import setup_testing_defaults
+        from bottle import Bottle
+        from glances.outputs.glances_bottle import EnableCors
+        app = Bottle()
+        app.install(EnableCors())
+        app.install(GlancesRateLimiter(rate=1, burst=1))
+        app.route('/api/3/test', callback=lambda: 'ok')
+        responses = []
+        for _ in range(2):
+            environ = {'PATH_INFO': '/api/3/test'}
+            setup_testing_defaults(environ)
+            b''.join(app(environ, lambda status, headers, exc_info=None: responses.append((status, dict(headers)))))
+        self.assertTrue(responses[0][0].startswith('200'))
+        self.assertTrue(responses[1][0].startswith('429'))
+        self.assertEqual(responses[1][1]['Access-Control-Allow-Origin'], '*')
+        self.assertIn('Retry-After', responses[1][1])
+
+    def test_033_auth_cache(self):
+        """Check the servers credentials cache."""
+        print('INFO: [TEST_033] Check the servers credentials cache')
+        from glances.password import GlancesAuthCache
+        checks = []
+
+        def verify(username, password):
+            checks.append((username, password))
+            return password == 'secret'
+
+        cache = GlancesAuthCache()
+        self.assertTrue(cache.check('glances', 'secret', verify))
+        self.assertTrue(cache.check('glances', 'secret', verify))
+        self.assertEqual(len(checks), 1)
+        # Failed checks are not cached
+        self.assertFalse(cache.check('glances', 'wrong', verify))
+        self.assertFalse(cache.check('glances', 'wrong', verify))
+        self.assertEqual(len(checks), 3)
+        self.assertTrue(cache.check('glances', 'secret', verify))
+        self.assertEqual(len(checks), 3)
+        # Expiration
+        cache.ttl = -1
+        self.assertTrue(cache.check('glances', 'secret', verify))
+        self.assertEqual(len(checks), 4)
+        # Size
+        cache = GlancesAuthCache(size=2)
+        for username in ['a', 'b', 'c']:
+            cache.check(username, 'secret', verify)
+        self.assertEqual(list(cache._cache), ['b', 'c'])
+
+    @unittest.skipIf(not LINUX, "The /proc processes scanner is only available on Linux")
+    def test_034_proc_scanner(self):
+        """Check the /proc processes scanner."""
+        print('INFO: [TEST_034] Check the /proc processes scanner')
+        import os
+        import psutil
+        from glances.processes import GlancesProcesses
+        from glances.procscan import GlancesProcScanner
+        attrs = ['cpu_percent', 'cpu_times', 'memory_percent', 'name', 'status', 'num_threads', 'io_counters',
+                 'memory_info', 'nice', 'pid', 'gids', 'cmdline', 'username']
+        scanner = GlancesProcScanner()
+        scanned = {p['pid']: p for p in scanner.process_iter(attrs)}
+        self.assertIn(os.getpid(), scanned)
+        proc = scanned[os.getpid()]
+        expected = psutil.Process().as_dict(attrs=attrs, ad_value=None)
+        self.assertEqual(sorted(proc), sorted(attrs))
+        for key in ['pid', 'name', 'status', 'nice', 'cmdline', 'username']:
+            self.assertEqual(proc[key], expected[key], msg=key)
+        self.assertEqual(tuple(proc['gids']), tuple(expected['gids']))
+        for key in ['cpu_times', 'memory_info', 'io_counters']:
+            self.assertEqual(proc[key]._fields, expected[key]._fields, msg=key)
+        self.assertAlmostEqual(proc['memory_percent'], expected['memory_percent'], delta=1)
+        self.assertEqual(proc['cpu_percent'], 0.0)
+        scanned = {p['pid']: p for p in scanner.process_iter(['pid', 'cpu_percent'])}
+        self.assertIsInstance(scanned[os.getpid()]['cpu_percent'], float)
+        self.assertRaises(ValueError, lambda: list(scanner.process_iter(['pid', 'connections'])))
+        # Processes list with the /proc backend
+        processes = GlancesProcesses()
+        processes.set_backend('proc')
+        self.assertIsNotNone(processes.scanner)
+        processes.update()
+        processlist = processes.getlist()
+        self.assertGreater(len(processlist), 0)
+        self.assertEqual(processes.get_count()['total'], len(processlist))
+        processes.set_backend('psutil')
+        self.assertIsNone(processes.scanner)
+        processes.update()
+        self.assertEqual(sorted(processes.getlist()[0]), sorted(processlist[0]))
+
+    def test_035_two_phase_processes(self):
+        """Check the processes display attributes only grabbed for the showed processes."""
+        print('INFO: [TEST_035] Check the two phases processes update')
+        from glances.processes import GlancesProcesses
+        processes = GlancesProcesses()
+        processes.update()
+        self.assertFalse(processes.is_two_phase_update())
+        self.assertTrue(all('memory_info' in p for p in processes.getlist()))
+        processes.max_processes = 3
+        self.assertTrue(processes.is_two_phase_update())
+        processes.update()
+        processlist = processes.getlist()
+        self.assertEqual(processes.get_count()['total'], len(processlist))
+        self.assertTrue(all('memory_info' in p and 'nice' in p for p in processlist[:3]))
+        if len(processlist) > 3:
+            self.assertFalse(any('memory_info' in p for p in processlist[3:]))
+        # Full stats (API)
+        processes.full_stats = True
+        self.assertFalse(processes.is_two_phase_update())
+        processes.update()
+        self.assertTrue(all('memory_info' in p for p in processes.getlist()))
+        # Sort key change after a two phases update
+        processes.full_stats = False
+        processes.update()
+        processes.set_sort_key('io_counters', False)
+        self.assertTrue(all('memory_info' in p for p in processes.getlist()[:3]))
+        # No two phases if the sort key is only known after the post-processing
+        self.assertFalse(processes.is_two_phase_update())
+        processes.set_sort_key('username', False)
+        processes.update()
+        self.assertTrue(all('memory_info' in p for p in processes.getlist()))
+        processes.set_sort_key('auto', True)
+        # No two phases if a filter is set
+        processes.process_filter = '.*python.*'
+        self.assertFalse(processes.is_two_phase_update())
+
+    def test_036_processes_cache(self):
+        """Check the processes caches (eviction and pid reuse)."""
+        print('INFO: [TEST_036] Check the processes caches')
+        from glances.processes import GlancesProcesses, GlancesProcessesCache
+        cache = GlancesProcessesCache()
+        cache.set((1, 10.0), [1, 2])
+        cache.set((2, 20.0), [3, 4])
+        self.assertEqual(cache.end_scan(), 0)
+        self.assertEqual(cache.get((1, 10.0)), [1, 2])
+        # Reused pid (other create_time)
+        self.assertIsNone(cache.get((2, 30.0)))
+        self.assertTrue(cache.memory_size() > 0)
+        # The pid 2 was not seen during the scan
+        self.assertEqual(cache.end_scan(), 1)
+        self.assertEqual(len(cache), 1)
+        self.assertNotIn((2, 20.0), cache)
+        # Terminated processes are evicted by the processes update
+        processes = GlancesProcesses()
+        processes.update()
+        processes.io_old.set((-1, 0.0), [0, 0])
+        processes.processlist_cache.set((-1, 0.0), {'cmdline': [], 'username': 'nobody'})
+        # Set values are seen during the current scan, evicted at the end of the next one
+        processes.update()
+        processes.update()
+        self.assertNotIn((-1, 0.0), processes.io_old)
+        self.assertNotIn((-1, 0.0), processes.processlist_cache)
+        self.assertTrue(len(processes.processlist_cache) > 0)
+        self.assertTrue(all(p['create_time'] is not None for p in processes.getlist()))
+
+    def test_037_sort_stats_limit(self):
+        """Check the top-N processes sort."""
+        print('INFO: [TEST_037] Check the top-N processes sort')
+        from glances.processes import sort_stats
+        stats = [
+            {'pid': i, 'name': 'p{}'.format(i % 7), 'cpu_percent': float(i % 11), 'memory_percent': float(i % 5)}
+            for i in range(100)
+        ]
+        full = sort_stats(list(stats), sorted_by='cpu_percent')
+        top = sort_stats(list(stats), sorted_by='cpu_percent', limit=10)
+        self.assertEqual(len(top), len(stats))
+        self.assertEqual(top[:10], full[:10])
+        self.assertEqual(
+            sort_stats(list(stats), sorted_by='name', reverse=False, limit=3)[:3],
+            sort_stats(list(stats), sorted_by='name', reverse=False)[:3],
+        )
+        # Fallback to the name sort (unknown key)
+        self.assertEqual(sort_stats(list(stats), sorted_by='unknown', limit=1)[0]['name'], 'p0')
+
+    @unittest.skipIf(not numpy_tag, "The columnar processes table needs NumPy")
+    def test_038_processes_table(self):
+        """Check the columnar processes table."""
+        print('INFO: [TEST_038] Check the columnar processes table')
+        from glances.processes import GlancesProcesses, sort_stats
+        from glances.proctable import GlancesProcessTable
+        stats = [
+            {
+                'pid': i,
+                'cpu_percent': None if i % 13 == 0 else float(i % 11),
+                'memory_percent': float(i % 5),
+                'num_threads': None if i % 17 == 0 else i % 3 + 1,
+                'status': 'running' if i % 4 == 0 else 'sleeping',
+            }
+            for i in range(100)
+        ]
+        table = GlancesProcessTable(stats)
+        self.assertEqual(len(table), 100)
+        self.assertEqual(table.status_count(), {'running': 25, 'sleeping': 75})
+        self.assertEqual(table.threads(), sum(p['num_threads'] or 0 for p in stats))
+        self.assertEqual(table.max('cpu_percent'), 10.0)
+        self.assertEqual(table.sort('cpu_percent'), sort_stats(list(stats), sorted_by='cpu_percent'))
+        for key in ('cpu_percent', 'memory_percent'):
+            for limit in (1, 7, 10, 50):
+                self.assertEqual(table.sort(key, limit=limit), sort_stats(list(stats), sorted_by=key, limit=limit))
+        self.assertIsNone(GlancesProcessTable([]).max('cpu_percent'))
+        # Same processes stats with and without the columnar table
+        processes = GlancesProcesses()
+        processes.set_columnar(True)
+        processes.update()
+        self.assertIsNotNone(processes.processtable)
+        self.assertEqual(processes.get_count()['total'], len(processes.getlist()))
+        self.assertEqual(processes.get_count()['thread'], sum(p['num_threads'] or 0 for p in processes.getlist()))
+
+    def test_039_wsgi_server_workers(self):
+        """Check that the streams and the idle connections do not hold the Web server workers."""
+        print('INFO: [TEST_039] Check the Web server workers')
+        import http.client
+        import threading
+        from glances.outputs.glances_wsgiserver import GlancesWSGIRequestHandler, GlancesWSGIServer
+        stop = threading.Event()
+
+        def app(environ, start_response):
+            if environ['PATH_INFO'] == '/stream':
+                start_response('200 OK', [('Content-Type', 'text/event-stream')])
+
+                def events():
+                    while not stop.is_set():
+                        yield b'data: {}\n\n'
+                        stop.wait(0.1)
+
+                return events()
+            start_response('200 OK', [('Content-Type', 'text/plain'), ('Content-Length', '2')])
+            return [b'ok']
+
+        server_class = GlancesWSGIServer.configure(workers=1, keepalive_timeout=5)
+        server = server_class(('localhost', 0), GlancesWSGIRequestHandler)
+        server.set_app(app)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        port = server.server_address[1]
+        try:
+            # The stream is served outside the workers pool
+            stream = http.client.HTTPConnection('localhost', port, timeout=3)
+            stream.request('GET', '/stream')
+            self.assertTrue(stream.getresponse().readline().startswith(b'data:'))
+            # The idle keep-alive connection releases its worker
+            idle = http.client.HTTPConnection('localhost', port, timeout=3)
+            idle.request('GET', '/')
+            self.assertEqual(idle.getresponse().read(), b'ok')
+            start = time.time()
+            conn = http.client.HTTPConnection('localhost', port, timeout=3)
+            conn.request('GET', '/')
+            self.assertEqual(conn.getresponse().read(), b'ok')
+            self.assertLess(time.time() - start, 2)
+            for c in (stream, idle, conn):
+                c.close()
+        finally:
+            stop.set()
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+    def test_040_export_modules(self):
+        """Check the exporters import (the exports folder should not shadow the standard libs)."""
+        print('INFO: [TEST_040] Check the exporters import')
+        import copy
+        import tempfile
+        from glances.stats import GlancesStats
+        args = copy.copy(test_args)
+        args.export_csv = True
+        args.export_csv_overwrite = True
+        with tempfile.TemporaryDirectory() as tmp:
+            args.export_csv_file = os.path.join(tmp, 'glances.csv')
+            export_stats = GlancesStats(config=test_config, args=args)
+            self.assertIn('csv', export_stats.getExportsList())
+            self.assertEqual(export_stats._exports['csv'].__module__, 'glances.exports.csv')
+            export_stats.end()
+
     def test_094_thresholds(self):
         """Test thresholds classes"""
         print('INFO: [TEST_094] Thresholds')
@@ -353,7 +1044,7 @@ class TestGlances(unittest.TestCase):
         self.assertEqual(a.history_size(), 3)
         self.assertEqual(a.history_len(), 3)
         self.assertEqual(a.history_value()[1], 4)
-        self.assertEqual(a.history_mean(nb=3), 4.5)
+        self.assertEqual(a.history_mean(nb=3), 3)
 
     def test_098_history(self):
         """Test GlancesHistory classes"""